@@ -0,0 +1,366 @@
+"""
+Answer Cache Module
+Semantic cache for whole agent turns.
+
+Repeated questions ("what's the weather in Prague", "MSFT price") normally
+run the full flow: a completion, a tool call and a second completion. The
+answer cache stores the final answer of such a turn under an embedding of
+the normalized question and answers a similar enough question directly,
+without any LLM call.
+
+- Embeddings are local: hashed word, word-pair and character-trigram
+  features, L2-normalized. No model or network call is involved.
+- VectorIndex is an inverted index over these sparse vectors; a lookup
+  scores only the entries sharing a feature with the question.
+- A hit needs a cosine similarity of at least the threshold, the same
+  tickers and numbers, and the same predicted tool calls (see prefetch.py),
+  so "weather in Paris" never answers "weather in Prague".
+- An answer lives as long as the tool result it was built from
+  (the tool's cache_ttl); answers of tools without caching are not stored.
+  If the tool cache meanwhile holds a different result for the same call,
+  the answer is stale and dropped.
+
+Only the opening question of a conversation is cached; follow-up questions
+depend on the history. Enable with AGENT_ANSWER_CACHE=1; the similarity
+threshold is AGENT_ANSWER_CACHE_THRESHOLD (default 0.9).
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+import zlib
+
+import codec
+import metrics
+from prefetch import predict_calls
+from registry import canonical_json
+
+DEFAULT_THRESHOLD = 0.9
+
+# Lifetime of answers that did not need a tool, in seconds
+NO_TOOL_TTL = 300
+
+# Number of hash buckets of the embedding
+DIMENSIONS = 1 << 20
+
+# Filler words that do not change what is being asked
+STOPWORDS = frozenset(
+    "a about an and are at can could do does for give how i in is it like me my of on please show tell the "
+    "to what what's whats would you".split()
+)
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9.&'-]*")
+_ENTITY = re.compile(r"\b(?:[A-Z]{2,5}|\d+(?:\.\d+)?)\b")
+
+
+def answer_cache_enabled():
+    """
+    Returns:
+        bool: True if AGENT_ANSWER_CACHE enables the answer cache
+    """
+    return os.environ.get("AGENT_ANSWER_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def normalize(text):
+    """
+    Normalize a question: lower case, no punctuation and no filler words.
+
+    Args:
+        text (str): Question
+
+    Returns:
+        list: Remaining words
+    """
+    words = [word.strip(".'-").removesuffix("'s") for word in _WORD.findall(text.lower().replace("’", "'"))]
+    return [word for word in words if word and word not in STOPWORDS]
+
+
+def _feature(name):
+    return zlib.crc32(name.encode("utf-8")) % DIMENSIONS
+
+
+def embed(text):
+    """
+    Embed a question as a sparse, L2-normalized feature vector.
+
+    Words carry most of the weight; character trigrams make the vector
+    tolerant to small spelling and inflection differences, word pairs add
+    some sensitivity to word order.
+
+    Args:
+        text (str): Question
+
+    Returns:
+        dict: Feature index to weight (empty for a question without words)
+    """
+    words = normalize(text)
+    vector = {}
+
+    def add(name, weight):
+        index = _feature(name)
+        vector[index] = vector.get(index, 0.0) + weight
+
+    for word in words:
+        add(f"w:{word}", 1.0)
+        padded = f"<{word}>"
+        for start in range(len(padded) - 2):
+            add(f"c:{padded[start:start + 3]}", 0.25)
+    for first, second in zip(words, words[1:]):
+        add(f"p:{first} {second}", 0.5)
+
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {index: weight / norm for index, weight in vector.items()} if norm else {}
+
+
+class VectorIndex:
+    """
+    Inverted index for cosine similarity search over sparse unit vectors.
+
+    Not thread-safe; AnswerCache serializes access.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._vectors = {}
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def add(self, entry_id, vector):
+        """
+        Args:
+            entry_id: Identifier of the vector
+            vector (dict): Sparse unit vector from embed()
+        """
+        self.remove(entry_id)
+        self._vectors[entry_id] = vector
+        for index, weight in vector.items():
+            self._postings.setdefault(index, {})[entry_id] = weight
+
+    def remove(self, entry_id):
+        """
+        Args:
+            entry_id: Identifier of the vector (missing identifiers are ignored)
+        """
+        vector = self._vectors.pop(entry_id, None)
+        if vector is None:
+            return
+        for index in vector:
+            posting = self._postings[index]
+            del posting[entry_id]
+            if not posting:
+                del self._postings[index]
+
+    def search(self, vector, threshold):
+        """
+        Find the vectors most similar to a query.
+
+        Args:
+            vector (dict): Sparse unit query vector
+            threshold (float): Minimum cosine similarity
+
+        Returns:
+            list: (similarity, entry_id) tuples above the threshold, best first
+        """
+        scores = {}
+        for index, weight in vector.items():
+            for entry_id, entry_weight in self._postings.get(index, {}).items():
+                scores[entry_id] = scores.get(entry_id, 0.0) + weight * entry_weight
+        matches = [(score, entry_id) for entry_id, score in scores.items() if score >= threshold]
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches
+
+
+class CachedAnswer:
+    """
+    Answer returned from the cache, shaped like an OpenAI assistant message.
+    """
+
+    __slots__ = ("content", "similarity", "tool_call")
+
+    role = "assistant"
+    tool_calls = None
+
+    def __init__(self, content, similarity, tool_call):
+        """
+        Args:
+            content (str): Answer text
+            similarity (float): Cosine similarity of the matched question
+            tool_call (tuple): (name, arguments, result JSON) of the tool the answer
+                was built from, or None
+        """
+        self.content = content
+        self.similarity = similarity
+        self.tool_call = tool_call
+
+
+def _field(message, name):
+    return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
+
+
+def opening_question(messages):
+    """
+    Get the question of a conversation that has only just started.
+
+    Args:
+        messages (list): Conversation
+
+    Returns:
+        tuple: (question text, fingerprint of the system prompt), or None if the
+            conversation has more than one user message or an answer already
+    """
+    users = [message for message in messages if _field(message, "role") == "user"]
+    if len(users) != 1 or any(_field(message, "role") in ("assistant", "tool") for message in messages):
+        return None
+    system = "\n".join(_field(message, "content") or "" for message in messages
+                       if _field(message, "role") == "system")
+    return _field(users[0], "content") or "", hashlib.sha1(system.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    Semantic cache of final answers to opening questions.
+    """
+
+    def __init__(self, registry, threshold=None, max_entries=5000):
+        """
+        Args:
+            registry (ToolRegistry): Registry providing the tools' cache TTLs and result cache
+            threshold (float, optional): Minimum cosine similarity of a hit
+                (default AGENT_ANSWER_CACHE_THRESHOLD or DEFAULT_THRESHOLD)
+            max_entries (int): Maximum number of answers; the oldest are dropped first
+        """
+        self.registry = registry
+        self.threshold = threshold if threshold is not None else float(
+            os.environ.get("AGENT_ANSWER_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "stored": 0}
+        self._index = VectorIndex()
+        self._entries = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _signature(self, text, system):
+        """
+        Build what must match exactly besides the embedding: system prompt,
+        tickers and numbers, and the predicted tool calls.
+        """
+        predicted = tuple(sorted(f"{name}:{sorted(arguments.items())}" for name, arguments in predict_calls(text)))
+        return system, frozenset(_ENTITY.findall(text)), predicted
+
+    def _count(self, outcome):
+        self.stats[outcome] += 1
+        metrics.answer_cache_lookups.inc(outcome=outcome)
+
+    def lookup(self, messages):
+        """
+        Find a cached answer to the opening question of a conversation.
+
+        Args:
+            messages (list): Conversation ending with its first user message
+
+        Returns:
+            CachedAnswer: Cached answer, or None
+        """
+        question = opening_question(messages)
+        if question is None:
+            return None
+        text, system = question
+        vector = embed(text)
+        if not vector:
+            return None
+        signature = self._signature(text, system)
+        now = time.time()
+        with self._lock:
+            for similarity, entry_id in self._index.search(vector, self.threshold):
+                entry = self._entries[entry_id]
+                if entry["expires_at"] <= now or not self._fresh(entry):
+                    self._remove(entry_id)
+                    self._count("stale")
+                    continue
+                if entry["signature"] != signature:
+                    continue
+                self._count("hits")
+                return CachedAnswer(entry["content"], similarity, entry["tool_call"])
+            self._count("misses")
+        return None
+
+    def _fresh(self, entry):
+        """
+        Check that the tool cache does not hold a newer result than the answer was built from.
+        """
+        if entry["tool_call"] is None:
+            return True
+        name, arguments, result_json = entry["tool_call"]
+        registered = self.registry.get(name)
+        if registered is None:
+            return False
+        current = self.registry.cache.get(registered.cache_key(arguments))
+        return current is None or canonical_json(current) == result_json
+
+    def store(self, question, messages, content, started_at=None):
+        """
+        Store the final answer of a turn.
+
+        Args:
+            question (tuple): opening_question() of the conversation before the turn
+            messages (list): Conversation after the turn, ending with its tool exchange if it had one
+            content (str): Final answer text
+            started_at (float, optional): Wall-clock start of the turn; the answer expires
+                relative to it, like the tool result it includes
+
+        Returns:
+            bool: True if the answer was stored
+        """
+        if question is None or not content:
+            return False
+        text, system = question
+        vector = embed(text)
+        if not vector:
+            return False
+
+        tool_call = None
+        ttl = NO_TOOL_TTL
+        if messages and _field(messages[-1], "role") == "tool":
+            function = _field(messages[-2], "tool_calls")[0]["function"]
+            registered = self.registry.get(function["name"])
+            result_json = _field(messages[-1], "content")
+            result = codec.loads(result_json)
+            if registered is None or not registered.cache_ttl or (isinstance(result, dict) and "error" in result):
+                return False
+            tool_call = (function["name"], codec.loads(function["arguments"]), result_json)
+            ttl = registered.cache_ttl
+
+        entry = {
+            "content": content,
+            "tool_call": tool_call,
+            "signature": self._signature(text, system),
+            "expires_at": (started_at or time.time()) + ttl,
+        }
+        with self._lock:
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            self._index.add(entry_id, vector)
+            self.stats["stored"] += 1
+        return True
+
+    def _remove(self, entry_id):
+        self._entries.pop(entry_id, None)
+        self._index.remove(entry_id)
+
+    def clear(self):
+        """
+        Remove all answers.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._index = VectorIndex()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Batch Module
+Runs large offline question sets through the agent flow with the OpenAI Batch API.
+
+Nightly jobs (portfolio summaries, report questions) do not need answers in
+seconds. The Batch API runs chat completions within a completion window at
+half the price, and outside the synchronous rate limits. A turn of the
+agent has two completion stages with a tool round in between, so a batch
+job runs:
+
+1. plan: one batch with the first completion of every question
+2. tools: the requested tool calls, run locally through the tool registry
+3. answer: one batch with the synthesis completion of every question that
+   called a tool
+
+Every step is checkpointed in a work directory (state.json plus the JSONL
+files of each stage). An interrupted job resumes where it stopped: a batch
+that was already submitted is polled, not submitted again.
+
+Usage:
+    python batch.py questions.jsonl --output answers.jsonl
+    python batch.py questions.jsonl --work-dir .cache/batch/nightly --poll-interval 30
+    python batch.py questions.jsonl --mock
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import MODEL_PRICES
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Request limit of a single batch
+MAX_BATCH_REQUESTS = 50000
+
+# Batch requests cost half the synchronous price
+BATCH_DISCOUNT = 0.5
+
+# Completion stages of an agent turn, in order
+STAGES = ("plan", "answer")
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+DEFAULT_WORK_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "batch")
+
+
+class BatchError(Exception):
+    """Raised when a batch job cannot continue."""
+
+
+def load_questions(path, system_prompt=SYSTEM_PROMPT):
+    """
+    Load a question set.
+
+    Each line is a JSON object with either a "question" string or a full
+    "messages" list, and optionally an "id" (defaults to the line number).
+
+    Args:
+        path (str): JSONL file
+        system_prompt (str): System prompt put before plain questions
+
+    Returns:
+        list: (id, messages) tuples
+    """
+    questions = []
+    seen = set()
+    with open(path, encoding="utf-8") as questions_file:
+        for number, line in enumerate(questions_file, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question_id = str(record.get("id", number))
+            if question_id in seen:
+                raise BatchError(f"Duplicate question id {question_id!r} on line {number}")
+            seen.add(question_id)
+            messages = record.get("messages") or [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": record["question"]},
+            ]
+            questions.append((question_id, messages))
+    return questions
+
+
+def _write_json_atomic(path, value):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as output_file:
+        json.dump(value, output_file)
+    os.replace(temporary, path)
+
+
+class BatchJob:
+    """
+    A checkpointed batch run of the agent flow over a question set.
+    """
+
+    def __init__(self, work_dir, client=None, model="gpt-4o", poll_interval=5.0, max_poll_interval=60.0,
+                 tool_workers=8, completion_window="24h"):
+        """
+        Args:
+            work_dir (str): Directory for the checkpoint and the stage files
+            client (optional): OpenAI client; defaults to the agent's client
+            model (str): OpenAI model to use
+            poll_interval (float): First delay between status polls in seconds
+            max_poll_interval (float): Longest delay between status polls in seconds
+            tool_workers (int): Tool calls run at the same time during the tool round
+            completion_window (str): Batch completion window
+        """
+        self.work_dir = work_dir
+        self.client = client
+        self.model = model
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.tool_workers = tool_workers
+        self.completion_window = completion_window
+        self.state_path = os.path.join(work_dir, "state.json")
+        self.state = None
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _client(self):
+        if self.client is None:
+            from main import get_llm
+
+            self.client = get_llm().client
+        return self.client
+
+    def _save(self):
+        _write_json_atomic(self.state_path, self.state)
+
+    def _load(self, questions):
+        """
+        Resume from the checkpoint, or start a new job for the questions.
+        """
+        fingerprint = hashlib.sha256(json.dumps(questions, sort_keys=True).encode("utf-8")).hexdigest()
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as state_file:
+                self.state = json.load(state_file)
+            if self.state["fingerprint"] != fingerprint:
+                raise BatchError(f"{self.work_dir} holds a job for a different question set; use another work directory")
+            return
+        if len(questions) > MAX_BATCH_REQUESTS:
+            raise BatchError(f"{len(questions)} questions exceed the batch limit of {MAX_BATCH_REQUESTS}; split the input")
+        self.state = {
+            "fingerprint": fingerprint,
+            "model": self.model,
+            "order": [question_id for question_id, _ in questions],
+            "conversations": {
+                question_id: {"messages": list(messages), "stage": STAGES[0]} for question_id, messages in questions
+            },
+            "stages": {},
+            "usage": {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0},
+        }
+        self._save()
+
+    def run(self, questions):
+        """
+        Run (or resume) the job.
+
+        Args:
+            questions (list): (id, messages) tuples from load_questions()
+
+        Returns:
+            list: Result dictionaries in input order, see results()
+        """
+        self._load(questions)
+        for stage in STAGES:
+            self._run_stage(stage)
+        return self.results()
+
+    def _run_stage(self, stage):
+        """
+        Submit, poll and apply the batch of one completion stage.
+        """
+        info = self.state["stages"].setdefault(stage, {})
+        if info.get("done"):
+            return
+        pending = [question_id for question_id in self.state["order"]
+                   if self.state["conversations"][question_id]["stage"] == stage]
+        if not pending:
+            info["done"] = True
+            self._save()
+            return
+
+        if "batch_id" not in info:
+            from main import build_request
+
+            lines = [json.dumps({
+                "custom_id": question_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": build_request(self.state["conversations"][question_id]["messages"], self.state["model"]),
+            }) + "\n" for question_id in pending]
+            content = "".join(lines).encode("utf-8")
+            with open(os.path.join(self.work_dir, f"{stage}-input.jsonl"), "wb") as input_file:
+                input_file.write(content)
+
+            uploaded = self._client().files.create(file=(f"{stage}-input.jsonl", io.BytesIO(content)), purpose="batch")
+            info["input_file_id"] = uploaded.id
+            self._save()
+            batch = self._client().batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT,
+                                                  completion_window=self.completion_window,
+                                                  metadata={"stage": stage})
+            info["batch_id"] = batch.id
+            self._save()
+            print(f"[{stage}] submitted {len(pending)} requests as {batch.id}")
+
+        batch = self._wait(info["batch_id"], stage)
+        if batch.status == "failed":
+            errors = getattr(batch, "errors", None)
+            raise BatchError(f"Batch {batch.id} ({stage}) failed: {errors}")
+
+        records = {}
+        for file_id, name in ((batch.output_file_id, "output"), (batch.error_file_id, "errors")):
+            if not file_id:
+                continue
+            content = self._client().files.content(file_id).content
+            with open(os.path.join(self.work_dir, f"{stage}-{name}.jsonl"), "wb") as output_file:
+                output_file.write(content)
+            for line in content.decode("utf-8").splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["custom_id"]] = record
+
+        self._apply(stage, pending, records, batch.status)
+        info["done"] = True
+        info["status"] = batch.status
+        self._save()
+
+    def _wait(self, batch_id, stage):
+        """
+        Poll a batch with a growing interval until it reaches a terminal status.
+        """
+        interval = self.poll_interval
+        while True:
+            batch = self._client().batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                return batch
+            counts = batch.request_counts
+            progress = f" ({counts.completed + counts.failed}/{counts.total})" if counts else ""
+            print(f"[{stage}] {batch_id} {batch.status}{progress}, next poll in {interval:.1f} s")
+            time.sleep(interval)
+            interval = min(interval * 1.5, self.max_poll_interval)
+
+    def _apply(self, stage, pending, records, status):
+        """
+        Record the completions of a stage and run the tool round after the plan stage.
+        """
+        from main import NO_TOOL_ANSWER
+
+        tool_rounds = []
+        for question_id in pending:
+            conversation = self.state["conversations"][question_id]
+            record = records.get(question_id)
+            response = (record or {}).get("response") or {}
+            if record is None or record.get("error") or response.get("status_code") != 200:
+                error = (record or {}).get("error") or response.get("body", {}).get("error") or f"batch {status}"
+                conversation.update(stage="failed", error=error.get("message") if isinstance(error, dict) else error)
+                continue
+
+            body = response["body"]
+            self._add_usage(body.get("usage") or {})
+            message = body["choices"][0]["message"]
+            if stage == "plan" and message.get("tool_calls"):
+                tool_rounds.append((question_id, message["tool_calls"][0]))
+            elif stage == "plan":
+                conversation.update(stage="done", answer=NO_TOOL_ANSWER)
+            else:
+                conversation.update(stage="done", answer=message.get("content"))
+
+        if tool_rounds:
+            self._run_tools(tool_rounds)
+
+    def _run_tools(self, tool_rounds):
+        """
+        Run the requested tool calls locally and queue the conversations for the answer stage.
+        """
+        from main import append_tool_exchange, dump_json
+        from tools import registry
+
+        def call(tool_call):
+            function = tool_call["function"]
+            try:
+                arguments = json.loads(function["arguments"])
+            except json.JSONDecodeError as e:
+                return {}, {"error": f"Invalid tool arguments: {str(e)}"}
+            return arguments, registry.dispatch(function["name"], arguments)
+
+        with ThreadPoolExecutor(max_workers=self.tool_workers) as executor:
+            outcomes = list(executor.map(call, [tool_call for _, tool_call in tool_rounds]))
+        for (question_id, tool_call), (arguments, result) in zip(tool_rounds, outcomes):
+            conversation = self.state["conversations"][question_id]
+            name = tool_call["function"]["name"]
+            append_tool_exchange(conversation["messages"], tool_call["id"], name, arguments, dump_json(result))
+            conversation.update(stage="answer", tool_call={"name": name, "arguments": arguments})
+        print(f"[tools] ran {len(tool_rounds)} tool calls")
+
+    def _add_usage(self, usage):
+        totals = self.state["usage"]
+        totals["requests"] += 1
+        totals["prompt_tokens"] += usage.get("prompt_tokens") or 0
+        totals["cached_tokens"] += (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        totals["completion_tokens"] += usage.get("completion_tokens") or 0
+
+    def results(self):
+        """
+        Returns:
+            list: One dictionary per question, in input order, with "id", "status"
+                ("done" or "failed", or the stage still pending), "answer",
+                "tool_call" and "error"
+        """
+        results = []
+        for question_id in self.state["order"]:
+            conversation = self.state["conversations"][question_id]
+            results.append({
+                "id": question_id,
+                "status": conversation["stage"],
+                "answer": conversation.get("answer"),
+                "tool_call": conversation.get("tool_call"),
+                "error": conversation.get("error"),
+            })
+        return results
+
+    def usage(self):
+        """
+        Returns:
+            dict: Token totals of all stages and the estimated cost in USD at batch prices
+                (None for models without a known price)
+        """
+        usage = dict(self.state["usage"])
+        prices = MODEL_PRICES.get(self.state["model"])
+        usage["estimated_cost_usd"] = None
+        if prices:
+            input_price, cached_price, output_price = prices
+            cost = ((usage["prompt_tokens"] - usage["cached_tokens"]) * input_price
+                    + usage["cached_tokens"] * cached_price + usage["completion_tokens"] * output_price) / 1_000_000
+            usage["estimated_cost_usd"] = round(cost * BATCH_DISCOUNT, 6)
+        return usage
+
+
+def main():
+    """
+    Run a batch job from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Answer a question set with the OpenAI Batch API")
+    parser.add_argument("questions", help="JSONL file with one question per line")
+    parser.add_argument("--output", help="answers JSONL (default: answers.jsonl in the work directory)")
+    parser.add_argument("--work-dir", help="checkpoint directory (default: .cache/batch/<input name>)")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--system", default=SYSTEM_PROMPT, help="system prompt for plain questions")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="first delay between status polls")
+    parser.add_argument("--max-poll-interval", type=float, default=60.0)
+    parser.add_argument("--tool-workers", type=int, default=8, help="tool calls run at once in the tool round")
+    parser.add_argument("--mock", action="store_true", help="run against a local mock_server.py")
+    args = parser.parse_args()
+
+    if args.mock:
+        from mock_server import mock_environment, start_mock_server
+
+        server = start_mock_server(config={"*": {"latency_ms": 5}, "batch": {"processing_seconds": 2.0}})
+        os.environ.update(mock_environment(server))
+
+    name = os.path.splitext(os.path.basename(args.questions))[0]
+    work_dir = args.work_dir or os.path.join(DEFAULT_WORK_ROOT, name)
+    job = BatchJob(work_dir, model=args.model, poll_interval=args.poll_interval,
+                   max_poll_interval=args.max_poll_interval, tool_workers=args.tool_workers)
+    results = job.run(load_questions(args.questions, args.system))
+
+    output = args.output or os.path.join(work_dir, "answers.jsonl")
+    with open(output, "w", encoding="utf-8") as output_file:
+        for result in results:
+            output_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+    failed = sum(1 for result in results if result["status"] != "done")
+    usage = job.usage()
+    print(f"{len(results) - failed}/{len(results)} answered, written to {output}")
+    print(f"Tokens: {usage['prompt_tokens']} prompt ({usage['cached_tokens']} cached), "
+          f"{usage['completion_tokens']} completion; estimated cost ${usage['estimated_cost_usd']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Latency percentiles and throughput of every tool and of full agent turns at
+several concurrency levels, against the mock server or recorded cassettes.
+
+Results are written as JSON and can be compared with a stored baseline;
+the script exits with status 1 if a workload regressed beyond the tolerance.
+Every workload and level is measured several times (--repeats) and the best
+run is kept, so a regression has to show in every run to be reported.
+
+Usage:
+    python bench.py                                   # mock backend, compare with bench_baseline.json
+    python bench.py --concurrency 1,8,32 --output results.json
+    python bench.py --save-baseline                   # store the results as the new baseline
+    AGENT_CASSETTE_DIR=cassettes python bench.py --backend replay
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# Arguments cycled through by the tool workloads
+TOOL_ARGUMENTS = {
+    "get_stock_price": [{"ticker": ticker} for ticker in ("AAPL", "MSFT", "GOOG", "NVDA", "TSLA")],
+    "get_dividend_date": [{"ticker": ticker} for ticker in ("AAPL", "MSFT", "KO", "JNJ", "PG")],
+    "get_weather": [{"location": location} for location in ("London,UK", "Prague,CZ", "Tokyo,JP", "Paris,FR")],
+    "search_web": [{"query": query} for query in ("python asyncio tutorial", "latest AI news", "rust vs go")],
+    "get_price_history": [{"ticker": ticker, "period": period}
+                          for ticker, period in (("AAPL", "1y"), ("MSFT", "3mo"), ("NVDA", "6mo"), ("KO", "5y"))],
+}
+
+# User prompts cycled through by the turn workload
+TURN_PROMPTS = [
+    "What's the stock price of Apple (AAPL)?",
+    "When is the next dividend of Microsoft (MSFT)?",
+    "What's the weather like in London?",
+    "Search for the latest news about electric cars.",
+]
+
+
+def percentile(values, q):
+    """
+    Compute a percentile with linear interpolation between closest ranks.
+
+    Args:
+        values (list): Observations
+        q (float): Percentile between 0 and 100
+
+    Returns:
+        float: Percentile value (0.0 for an empty list)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies, errors, wall_seconds):
+    """
+    Summarize one benchmark run.
+
+    Args:
+        latencies (list): Latency of every call in seconds
+        errors (int): Number of failed calls
+        wall_seconds (float): Wall-clock duration of the run
+
+    Returns:
+        dict: Count, errors, latency percentiles in ms and throughput in calls/s
+    """
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+
+
+def best_of(summaries):
+    """
+    Combine repeated runs of a workload into the best value of every statistic.
+
+    Noise on a shared machine only ever makes a run slower, so the best of
+    several runs is a stable estimate, and a regression against it means
+    that every run regressed.
+
+    Args:
+        summaries (list): Summaries from summarize() of the same workload and level
+
+    Returns:
+        dict: Lowest latencies and errors and highest throughput, with the number of runs
+    """
+    best = dict(summaries[0])
+    for key in ("errors", "p50_ms", "p95_ms", "p99_ms", "mean_ms"):
+        best[key] = min(summary[key] for summary in summaries)
+    best["throughput_rps"] = max(summary["throughput_rps"] for summary in summaries)
+    best["runs"] = len(summaries)
+    return best
+
+
+def run_workload(call, requests, concurrency, warmup=2):
+    """
+    Run a workload with a fixed number of calls spread over worker threads.
+
+    Args:
+        call (callable): Function taking the call index and returning True on success
+        requests (int): Number of measured calls
+        concurrency (int): Number of worker threads
+        warmup (int): Unmeasured calls made before the run
+
+    Returns:
+        dict: Summary from summarize()
+    """
+    for index in range(warmup):
+        call(index)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(index):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = call(index)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def tool_workload(name):
+    """
+    Build the call function of a tool workload (the tool function without the result cache).
+    """
+    from tools import registry
+
+    function = registry.get(name).function
+    arguments = TOOL_ARGUMENTS[name]
+
+    def call(index):
+        result = function(**arguments[index % len(arguments)])
+        return not (isinstance(result, dict) and "error" in result)
+    return call
+
+
+def turn_workload():
+    """
+    Build the call function of the full-turn workload.
+    """
+    from main import get_completion_from_messages
+
+    def call(index):
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": TURN_PROMPTS[index % len(TURN_PROMPTS)]},
+        ]
+        response = get_completion_from_messages(messages)
+        return response != "No relevant function call found."
+    return call
+
+
+def compare(results, baseline, tolerance=0.3, min_delta_ms=2.0):
+    """
+    Compare benchmark results with a baseline.
+
+    A workload regressed if its p95 latency grew by more than the tolerance
+    (and by at least min_delta_ms), its throughput dropped by more than the
+    tolerance, or it produced errors the baseline did not have.
+
+    Args:
+        results (dict): Current results
+        baseline (dict): Baseline results in the same format
+        tolerance (float): Allowed relative change
+        min_delta_ms (float): Latency changes below this are treated as noise
+
+    Returns:
+        list: Regression messages (empty if nothing regressed)
+    """
+    baseline_runs = {(run["workload"], run["concurrency"]): run for run in baseline.get("results", [])}
+    regressions = []
+    for run in results["results"]:
+        reference = baseline_runs.get((run["workload"], run["concurrency"]))
+        if reference is None:
+            continue
+        label = f"{run['workload']} @ concurrency {run['concurrency']}"
+        if run["p95_ms"] > reference["p95_ms"] * (1 + tolerance) and \
+                run["p95_ms"] - reference["p95_ms"] >= min_delta_ms:
+            regressions.append(f"{label}: p95 {reference['p95_ms']:.1f} ms -> {run['p95_ms']:.1f} ms")
+        if run["throughput_rps"] < reference["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {reference['throughput_rps']:.1f}/s -> {run['throughput_rps']:.1f}/s")
+        if run["errors"] > reference["errors"]:
+            regressions.append(f"{label}: errors {reference['errors']} -> {run['errors']}")
+    return regressions
+
+
+def add_backend_arguments(parser):
+    """
+    Add the backend selection options shared by bench.py and loadgen.py.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend
+    """
+    parser.add_argument("--backend", choices=["mock", "replay", "live"], default="mock")
+    parser.add_argument("--mock-latency-ms", type=float, default=20.0)
+    parser.add_argument("--mock-llm-latency-ms", type=float, default=100.0)
+    parser.add_argument("--mock-latency-sigma", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="keep the client-side provider limits")
+
+
+def setup_backend(args):
+    """
+    Point the agent at the selected backend before any client is created.
+
+    Args:
+        args (argparse.Namespace): Options from add_backend_arguments()
+
+    Returns:
+        dict: Backend description for the results metadata
+    """
+    if not args.keep_rate_limits:
+        # Client-side limiters would measure the configured quotas, not the code
+        for provider in ("yahoo", "ipapi", "openweathermap", "open_meteo", "tavily"):
+            os.environ[f"RATE_LIMIT_{provider.upper()}"] = "100000:100000"
+
+    if args.backend == "mock":
+        from mock_server import mock_environment, start_mock_server
+
+        random.seed(args.seed)
+        server = start_mock_server(config={
+            "*": {"latency_ms": args.mock_latency_ms, "latency_sigma": args.mock_latency_sigma},
+            "openai": {"latency_ms": args.mock_llm_latency_ms, "latency_sigma": args.mock_latency_sigma},
+        })
+        os.environ.update(mock_environment(server))
+        return {"backend": "mock", "mock_latency_ms": args.mock_latency_ms,
+                "mock_llm_latency_ms": args.mock_llm_latency_ms, "mock_latency_sigma": args.mock_latency_sigma}
+
+    if args.backend == "replay":
+        os.environ["AGENT_CASSETTE_MODE"] = "replay"
+        import recording
+        recording.configure("replay")
+        return {"backend": "replay", "cassette_dir": recording.cassette.directory,
+                "latency_scale": recording.cassette.latency_scale}
+
+    return {"backend": "live"}
+
+
+def print_table(results):
+    print(f"{'workload':<28}{'conc':>5}{'count':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'calls/s':>10}")
+    for run in results["results"]:
+        print(f"{run['workload']:<28}{run['concurrency']:>5}{run['count']:>7}{run['errors']:>5}"
+              f"{run['p50_ms']:>10.1f}{run['p95_ms']:>10.1f}{run['p99_ms']:>10.1f}{run['throughput_rps']:>10.1f}")
+
+
+def main():
+    """
+    Run the benchmark suite from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark tools and agent turns")
+    add_backend_arguments(parser)
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--tool-requests", type=int, default=100, help="measured calls per tool and level")
+    parser.add_argument("--turn-requests", type=int, default=40, help="measured turns per level")
+    parser.add_argument("--workloads", default="tools,turns", help="tools, turns or both")
+    parser.add_argument("--output", help="write the results JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per workload and level; the best is kept")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative regression")
+    args = parser.parse_args()
+
+    metadata = setup_backend(args)
+    # Import the lazy dependencies before the worker threads race to do it
+    from main import preload
+    preload()
+    levels = [int(level) for level in args.concurrency.split(",")]
+    workloads = []
+    if "tools" in args.workloads:
+        workloads += [(f"tool:{name}", tool_workload(name), args.tool_requests) for name in TOOL_ARGUMENTS]
+    if "turns" in args.workloads:
+        workloads.append(("turn", turn_workload(), args.turn_requests))
+
+    from tools import registry
+
+    results = {
+        "meta": dict(metadata, python=platform.python_version(), timestamp=int(time.time())),
+        "results": [],
+    }
+    for name, call, requests in workloads:
+        for concurrency in levels:
+            runs = []
+            for _ in range(args.repeats):
+                registry.cache.clear()
+                runs.append(run_workload(call, requests, concurrency))
+            summary = best_of(runs)
+            results["results"].append(dict({"workload": name, "concurrency": concurrency}, **summary))
+            print(f"  {name} @ {concurrency}: p95 {summary['p95_ms']:.1f} ms, {summary['throughput_rps']:.1f}/s")
+
+    print()
+    print_table(results)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            baseline_file.write(output + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("meta", {}).get("backend") != metadata["backend"]:
+            print(f"\nBaseline was measured with the {baseline['meta'].get('backend')} backend, skipping comparison")
+            return 0
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Bulkhead Module
+Per-tool concurrency pools with bounded queues and fast rejection.
+
+When Tavily or Yahoo slows down, calls to the tool using it pile up and
+hold the threads that run agent turns, so turns that only need a fast or
+cached tool wait behind them. A bulkhead caps what one tool can hold:
+
+- at most `max_concurrency` calls of the tool run at the same time;
+- at most `max_queue` more calls wait for a slot, each for at most
+  `queue_timeout` seconds (and never past the request deadline);
+- any further call is rejected at once with BulkheadFull, which the
+  registry turns into an error result the model can explain.
+
+Limits are set per tool in the @tool decorator (see registry.py) and can be
+overridden with BULKHEAD_<TOOL>="concurrency:queue", e.g.
+BULKHEAD_SEARCH_WEB=2:2.
+"""
+
+import os
+import threading
+import time
+
+from deadline import DeadlineExceeded, remaining_timeout
+
+# Longest time a call waits in the queue of a bulkhead
+DEFAULT_QUEUE_TIMEOUT = 1.0
+
+
+class BulkheadFull(Exception):
+    """Raised when a call finds the bulkhead of its tool saturated."""
+
+    def __init__(self, name, reason):
+        super().__init__(f"{name} is overloaded ({reason}), try again later")
+        self.name = name
+        self.reason = reason
+
+
+def bulkhead_limits(name, max_concurrency, max_queue):
+    """
+    Get the limits of a tool, applying a BULKHEAD_<TOOL>="concurrency:queue" override.
+
+    Args:
+        name (str): Tool name
+        max_concurrency (int): Configured concurrency limit
+        max_queue (int): Configured queue limit
+
+    Returns:
+        tuple: (max_concurrency, max_queue)
+    """
+    override = os.environ.get(f"BULKHEAD_{name.upper()}")
+    if override:
+        concurrency, _, queue = override.partition(":")
+        max_concurrency = int(concurrency)
+        if queue:
+            max_queue = int(queue)
+    return max_concurrency, max_queue
+
+
+class Bulkhead:
+    """
+    Bounded concurrency pool with a bounded waiting queue.
+    """
+
+    def __init__(self, name, max_concurrency, max_queue=0, queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        """
+        Args:
+            name (str): Name used in errors (the tool name)
+            max_concurrency (int): Maximum number of calls running at the same time
+            max_queue (int): Maximum number of calls waiting for a slot (0 rejects at once)
+            queue_timeout (float): Longest wait for a slot in seconds
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Take a slot, waiting in the queue if there is room in it.
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            BulkheadFull: If the queue is full, or no slot freed up within the queue
+                timeout or the request deadline
+        """
+        with self._condition:
+            if self.active < self.max_concurrency and not self.queued:
+                self.active += 1
+                return 0.0
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise BulkheadFull(self.name, "queue full")
+            try:
+                timeout = remaining_timeout(self.queue_timeout)
+            except DeadlineExceeded:
+                self.rejected += 1
+                raise BulkheadFull(self.name, "deadline exceeded") from None
+
+            started = time.monotonic()
+            self.queued += 1
+            try:
+                if not self._condition.wait_for(lambda: self.active < self.max_concurrency, timeout):
+                    self.rejected += 1
+                    raise BulkheadFull(self.name, "queue timeout")
+                self.active += 1
+            finally:
+                self.queued -= 1
+            return time.monotonic() - started
+
+    def release(self):
+        """
+        Give a slot back and wake the next queued call.
+        """
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Limits, running and queued calls, and rejections so far
+        """
+        with self._condition:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "rejected": self.rejected,
+            }
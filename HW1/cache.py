@@ -0,0 +1,215 @@
+"""
+Cache Module
+TTL caches for tool results.
+
+MemoryCache is private to one process. SQLiteCache keeps entries in a local
+SQLite database in WAL mode, so several worker processes on one host (see
+server.py --processes) share quotes, geocodes and search results instead of
+each cold-missing its own cache. The backend is chosen with
+AGENT_CACHE_BACKEND ("memory" or "sqlite") and AGENT_CACHE_PATH.
+"""
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+import codec
+from results import Record, from_state
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tool_cache.sqlite3")
+
+
+class MemoryCache:
+    """
+    Dictionary-backed cache whose entries expire after a per-entry TTL.
+    """
+
+    def __init__(self, max_entries=10000):
+        """
+        Args:
+            max_entries (int): Maximum number of entries; the oldest are dropped first
+        """
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get a cached value.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        """
+        Store a value.
+
+        Args:
+            key (str): Cache key
+            value: Value to store
+            ttl (float): Time to live in seconds
+        """
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                # Dictionaries keep insertion order, so the first key is the oldest
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def ttl(self, key):
+        """
+        Get the remaining lifetime of an entry.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            float: Seconds until the entry expires, or None if missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        remaining = entry[0] - time.monotonic()
+        return remaining if remaining >= 0 else None
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    Cache stored in a SQLite database shared by all processes on the host.
+
+    Values must be JSON-serializable or result records; records are stored as
+    their raw fields and read back as records of the same type. Every thread
+    uses its own connection; expiry times are wall-clock timestamps so all
+    processes agree on them.
+    """
+
+    # Expired and excess entries are pruned every this many writes
+    PRUNE_INTERVAL = 256
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=100000):
+        """
+        Args:
+            path (str): Database file, created if missing
+            max_entries (int): Maximum number of entries; the soonest to expire are dropped first
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        # next() of a count is atomic, so threads sharing the cache never lose a write
+        self._writes = itertools.count(1)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        # Connections are opened lazily so a cache created before os.fork() is safe to use in the children
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        """
+        Get a cached value.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return from_state(codec.loads(row[0])) if row else None
+
+    def ttl(self, key):
+        """
+        Get the remaining lifetime of an entry.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            float: Seconds until the entry expires, or None if missing or expired
+        """
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires_at FROM entries WHERE key = ? AND expires_at >= ?", (key, now)
+        ).fetchone()
+        return row[0] - now if row else None
+
+    def set(self, key, value, ttl):
+        """
+        Store a value.
+
+        Args:
+            key (str): Cache key
+            value: JSON-serializable value or result record
+            ttl (float): Time to live in seconds
+        """
+        if isinstance(value, Record):
+            value = value.to_state()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO entries (key, expires_at, value) VALUES (?, ?, ?)",
+            (key, time.time() + ttl, codec.dumps(value)),
+        )
+        if next(self._writes) % self.PRUNE_INTERVAL == 0:
+            self._prune(connection)
+
+    def _prune(self, connection):
+        connection.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+        excess = connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires_at LIMIT ?)", (excess,)
+            )
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self._connection().execute("DELETE FROM entries")
+
+
+def create_cache():
+    """
+    Create the tool result cache selected by AGENT_CACHE_BACKEND.
+
+    Returns:
+        MemoryCache or SQLiteCache: Cache instance
+    """
+    backend = os.environ.get("AGENT_CACHE_BACKEND", "memory")
+    if backend == "sqlite":
+        return SQLiteCache(os.environ.get("AGENT_CACHE_PATH", DEFAULT_CACHE_PATH))
+    if backend != "memory":
+        print(f"Unknown AGENT_CACHE_BACKEND {backend!r}, using the in-memory cache")
+    return MemoryCache()
@@ -0,0 +1,122 @@
+"""
+JSON Codec Module
+Canonical JSON encoding and decoding for the dispatch path.
+
+Every tool turn decodes the call arguments and encodes the arguments and
+the result for the conversation; cache keys, the SQLite cache and the HTTP
+service encode JSON as well. All of them go through this module, which uses
+orjson when it is installed and the standard library otherwise:
+
+- dumps() produces canonical JSON: sorted keys, compact separators and
+  non-ASCII characters kept as they are. The same value always produces the
+  same bytes, which keeps cache keys stable and the request prefix cacheable
+  by the provider.
+- Result records (see results.py) are encoded through their to_json()
+  method, so their formatting happens only here, and a record is encoded
+  at most once.
+
+AGENT_JSON_CODEC selects the backend: "auto" (default), "orjson" or "json".
+Values orjson cannot encode (integers beyond 64 bits, non-string keys) are
+encoded by the standard library instead.
+"""
+
+import json
+import os
+
+from results import Record
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj):
+    """
+    Encode objects that are not plain JSON values: records with a to_json() method.
+    """
+    to_json = getattr(obj, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_json()
+
+
+def _select_backend():
+    requested = os.environ.get("AGENT_JSON_CODEC", "auto")
+    if requested not in ("auto", "orjson", "json"):
+        print(f"Unknown AGENT_JSON_CODEC {requested!r}, using auto")
+        requested = "auto"
+    if requested == "orjson" and orjson is None:
+        print("AGENT_JSON_CODEC=orjson but orjson is not installed, using json")
+    if requested != "json" and orjson is not None:
+        return "orjson"
+    return "json"
+
+
+# Name of the backend in use, "orjson" or "json"
+BACKEND = _select_backend()
+
+_fast = orjson if BACKEND == "orjson" else None
+
+
+def _encode(obj):
+    if _fast is not None:
+        try:
+            return _fast.dumps(obj, default=_default, option=_fast.OPT_SORT_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+def dumps(obj):
+    """
+    Serialize a value to canonical JSON.
+
+    A record passed directly is encoded once; its JSON is kept on the record
+    and reused, so a cached result is not serialized again on every hit.
+
+    Args:
+        obj: JSON value, possibly containing result records
+
+    Returns:
+        str: Canonical JSON string
+    """
+    if isinstance(obj, Record):
+        encoded = getattr(obj, "_encoded", None)
+        if encoded is None:
+            encoded = obj._encoded = _encode(obj.to_json())
+        return encoded
+    return _encode(obj)
+
+
+def dumps_bytes(obj):
+    """
+    Serialize a value to canonical JSON.
+
+    Args:
+        obj: JSON value, possibly containing result records
+
+    Returns:
+        bytes: UTF-8 encoded canonical JSON
+    """
+    if _fast is not None and not isinstance(obj, Record):
+        try:
+            return _fast.dumps(obj, default=_default, option=_fast.OPT_SORT_KEYS)
+        except TypeError:
+            pass
+    return dumps(obj).encode("utf-8")
+
+
+def loads(data):
+    """
+    Parse JSON.
+
+    Args:
+        data (str or bytes): JSON document
+
+    Returns:
+        Parsed value
+    """
+    if _fast is not None:
+        return _fast.loads(data)
+    return json.loads(data)
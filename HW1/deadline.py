@@ -0,0 +1,192 @@
+"""
+Deadline Module
+Request-scoped deadlines propagated from the agent loop into tools and HTTP calls.
+
+A deadline is set once per turn with deadline_scope(); every hop below it asks
+remaining_timeout() for its timeout, so it only uses what is left of the turn's
+budget instead of a fixed per-hop value.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+# Smallest timeout handed to an HTTP call; below this the hop is not attempted
+MIN_TIMEOUT = 0.05
+
+_current_deadline = contextvars.ContextVar("deadline", default=None)
+
+# Abandoned calls that may still be running before new calls fail fast
+# (AGENT_MAX_ABANDONED_CALLS overrides it)
+MAX_ABANDONED_CALLS = 32
+
+# Worker threads of timed-out calls that are still running; each one removes itself when it finishes
+_abandoned = set()
+_abandoned_lock = threading.Lock()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the time budget of the current request is used up."""
+
+
+class TooManyAbandonedCalls(Exception):
+    """Raised instead of starting a call while too many timed-out calls are still running."""
+
+
+class Deadline:
+    """
+    Absolute point in time by which a request has to finish.
+    """
+
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds (float): Time budget from now in seconds
+        """
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """
+        Returns:
+            float: Seconds left (negative once expired)
+        """
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        """
+        Returns:
+            bool: True if no time is left
+        """
+        return self.remaining() <= 0
+
+
+def current_deadline():
+    """
+    Get the deadline of the current request.
+
+    Returns:
+        Deadline: Current deadline, or None outside a deadline scope
+    """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """
+    Set the deadline for the enclosed block.
+
+    A nested scope can only shorten the deadline of the enclosing one.
+
+    Args:
+        seconds (float): Time budget in seconds (None keeps the enclosing deadline)
+
+    Yields:
+        Deadline: Effective deadline of the block
+    """
+    outer = _current_deadline.get()
+    deadline = outer
+    if seconds is not None:
+        deadline = Deadline(seconds)
+        if outer is not None and outer.expires_at < deadline.expires_at:
+            deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining_timeout(cap=None):
+    """
+    Compute the timeout for the next hop from the current deadline.
+
+    Args:
+        cap (float, optional): Upper bound for the timeout in seconds
+
+    Returns:
+        float: Timeout in seconds (cap if no deadline is set)
+
+    Raises:
+        DeadlineExceeded: If the current deadline has (almost) passed
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return cap
+    remaining = deadline.remaining()
+    if remaining < MIN_TIMEOUT:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return remaining if cap is None else min(cap, remaining)
+
+
+def call_with_timeout(function, timeout, *args, **kwargs):
+    """
+    Call a blocking function that does not support timeouts itself.
+
+    The call runs in its own daemon thread that inherits the current context.
+    If the timeout passes first, the thread is abandoned (a running call
+    cannot be stopped) and the caller continues. A thread per call means hung
+    calls never take capacity from later ones; abandoned_workers() reports
+    how many are still running. Once MAX_ABANDONED_CALLS of them are, e.g.
+    while a provider hangs, new calls fail at once instead of leaving yet
+    another stuck thread behind.
+
+    Args:
+        function (callable): Function to call
+        timeout (float): Timeout in seconds (None waits indefinitely)
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+
+    Returns:
+        Return value of the function
+
+    Raises:
+        DeadlineExceeded: If the function does not finish in time
+        TooManyAbandonedCalls: If too many earlier calls are still running after their timeout
+    """
+    name = getattr(function, "__name__", "call")
+    limit = int(os.environ.get("AGENT_MAX_ABANDONED_CALLS") or MAX_ABANDONED_CALLS)
+    with _abandoned_lock:
+        if len(_abandoned) >= limit:
+            raise TooManyAbandonedCalls(f"{len(_abandoned)} timed-out calls are still running, not starting {name}")
+
+    context = contextvars.copy_context()
+    outcome = {}
+
+    def run():
+        try:
+            outcome["value"] = context.run(function, *args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            with _abandoned_lock:
+                outcome["done"] = True
+                _abandoned.discard(threading.current_thread())
+
+    worker = threading.Thread(target=run, name=f"deadline-{name}", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        with _abandoned_lock:
+            # Unless it finished just now
+            if "done" not in outcome:
+                _abandoned.add(worker)
+        metrics.abandoned_calls.inc()
+        raise DeadlineExceeded(f"{name} timed out after {timeout:.2f}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+def abandoned_workers():
+    """
+    Count the worker threads of timed-out calls that are still running.
+
+    Returns:
+        int: Abandoned calls that have not finished yet
+    """
+    with _abandoned_lock:
+        return len(_abandoned)
@@ -0,0 +1,271 @@
+"""
+Conversation History Module
+Keeps the message list of long sessions under a hard token ceiling by evicting
+stale tool results and folding old turns into a rolling summary.
+"""
+
+import json
+
+# Hard ceiling for the estimated size of the message list sent to the model
+DEFAULT_MAX_TOKENS = 8000
+
+# After compaction the history is shrunk to this share of the ceiling, so the
+# request prefix stays unchanged (and cacheable) for several turns afterwards
+COMPACTION_TARGET_RATIO = 0.6
+
+# Number of most recent messages that are never summarized or evicted
+KEEP_RECENT_MESSAGES = 8
+
+# Marker of the system message holding the rolling summary
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+
+# Rough size of per-message framing (role, separators) in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Appended to a summary shortened to fit the ceiling
+TRUNCATION_MARKER = "\n[truncated to fit the conversation size limit]"
+
+# Reason given in the JSON stub that replaces a truncated tool result
+TRUNCATION_REASON = "result too large for the conversation size limit"
+
+
+def _as_dict(message):
+    """
+    Return a message as a plain dictionary.
+
+    Args:
+        message: Message dictionary or OpenAI message object
+
+    Returns:
+        dict: Message dictionary
+    """
+    if isinstance(message, dict):
+        return message
+    return message.model_dump(exclude_none=True)
+
+
+def estimate_tokens(message):
+    """
+    Estimate the number of tokens of a single message.
+
+    Uses the common approximation of four characters per token, which is
+    accurate enough for budgeting and needs no tokenizer download.
+
+    Args:
+        message: Message dictionary or OpenAI message object
+
+    Returns:
+        int: Estimated token count
+    """
+    message = _as_dict(message)
+    size = len(message.get("content") or "")
+    if message.get("tool_calls"):
+        size += len(json.dumps(message["tool_calls"]))
+    return size // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def count_tokens(messages):
+    """
+    Estimate the number of tokens of a message list.
+
+    Args:
+        messages (list): List of message dictionaries
+
+    Returns:
+        int: Estimated token count
+    """
+    return sum(estimate_tokens(message) for message in messages)
+
+
+def _split_groups(messages):
+    """
+    Split messages into groups that must be kept or removed together.
+
+    An assistant message with tool calls and the tool messages answering it
+    form one group, because the API rejects tool messages without their call.
+
+    Args:
+        messages (list): List of message dictionaries
+
+    Returns:
+        list: List of message groups (lists)
+    """
+    groups = []
+    for message in messages:
+        if _as_dict(message).get("role") == "tool" and groups:
+            groups[-1].append(message)
+        else:
+            groups.append([message])
+    return groups
+
+
+def _is_summary(message):
+    message = _as_dict(message)
+    return message.get("role") == "system" and (message.get("content") or "").startswith(SUMMARY_PREFIX)
+
+
+def summarize_messages(messages, max_chars=2000):
+    """
+    Build a compact extractive summary of old messages without calling the LLM.
+
+    Args:
+        messages (list): Messages to summarize
+        max_chars (int): Maximum length of the summary
+
+    Returns:
+        str: One line per message, newest lines kept if the summary is too long
+    """
+    lines = []
+    for message in messages:
+        message = _as_dict(message)
+        role = message.get("role")
+        content = (message.get("content") or "").strip()
+        if _is_summary(message):
+            lines.append(content[len(SUMMARY_PREFIX):].strip())
+        elif message.get("tool_calls"):
+            for tool_call in message["tool_calls"]:
+                function = tool_call.get("function", {})
+                lines.append(f"- assistant called {function.get('name')}({function.get('arguments', '')})")
+        elif role == "tool":
+            lines.append(f"- {message.get('name', 'tool')} returned: {content[:150]}")
+        elif content:
+            lines.append(f"- {role}: {content[:200]}")
+
+    summary = "\n".join(line for line in lines if line)
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:]
+        summary = summary[summary.find("\n") + 1:]
+    return summary
+
+
+def evict_stale_tool_results(messages, keep_recent=KEEP_RECENT_MESSAGES):
+    """
+    Replace the content of old tool messages with a short placeholder.
+
+    Tool results such as quotes go stale quickly and are usually the largest
+    messages, so only the most recent ones are kept verbatim.
+
+    Args:
+        messages (list): List of message dictionaries (modified in place)
+        keep_recent (int): Number of most recent messages left untouched
+
+    Returns:
+        int: Number of evicted tool results
+    """
+    evicted = 0
+    for index in range(max(len(messages) - keep_recent, 0)):
+        message = _as_dict(messages[index])
+        if message.get("role") != "tool" or message.get("content", "").startswith('{"evicted"'):
+            continue
+        messages[index] = {
+            **message,
+            "content": json.dumps({"evicted": True, "reason": "stale tool result"}),
+        }
+        evicted += 1
+    return evicted
+
+
+def _truncate(message, max_chars):
+    """
+    Truncate the content of a message. The newest lines of a summary are at
+    its end, so a summary keeps its end. A tool result is replaced by a JSON
+    stub holding the start of the original as a preview, so the model still
+    receives valid JSON.
+
+    Args:
+        message: Message dictionary or OpenAI message object
+        max_chars (int): Length of the truncated content, including the marker or stub
+
+    Returns:
+        dict: Truncated copy of the message
+    """
+    message = _as_dict(message)
+    content = message.get("content") or ""
+    if _is_summary(message):
+        lines = content[len(SUMMARY_PREFIX):]
+        keep = max(max_chars - len(SUMMARY_PREFIX) - len(TRUNCATION_MARKER), 0)
+        return {**message, "content": SUMMARY_PREFIX + TRUNCATION_MARKER + lines[max(len(lines) - keep, 0):]}
+
+    keep = len(content)
+    while True:
+        stub = json.dumps({"truncated": True, "reason": TRUNCATION_REASON, "preview": content[:keep]},
+                          ensure_ascii=False)
+        # Escaping can make the preview longer than the text it holds
+        if len(stub) <= max_chars or keep == 0:
+            return {**message, "content": stub}
+        keep = max(keep - (len(stub) - max_chars), 0)
+
+
+def compact_history(messages, max_tokens=DEFAULT_MAX_TOKENS, keep_recent=KEEP_RECENT_MESSAGES, summarizer=None):
+    """
+    Enforce a hard token ceiling on a conversation, modifying it in place.
+
+    Nothing happens while the history fits under the ceiling. Once it does
+    not, stale tool results are evicted, older turns are folded into a single
+    rolling summary message placed after the leading system messages, and the
+    history is shrunk to COMPACTION_TARGET_RATIO of the ceiling. As a last
+    resort the oldest remaining turns are dropped, and if the latest turn
+    alone is still too large (e.g. one huge tool result), the summary and
+    then the tool results, oldest first, are truncated. A conversation that
+    still does not fit (e.g. one very long user message) is left as it is;
+    the estimate is rough, and the API enforces the model's real context limit.
+
+    Args:
+        messages (list): List of message dictionaries (modified in place)
+        max_tokens (int): Hard ceiling for the estimated token count
+        keep_recent (int): Number of most recent messages kept verbatim
+        summarizer (callable, optional): Function turning a list of messages
+            into summary text; defaults to summarize_messages
+
+    Returns:
+        list: The same, compacted message list
+    """
+    if not max_tokens or count_tokens(messages) <= max_tokens:
+        return messages
+
+    summarizer = summarizer or summarize_messages
+    target = int(max_tokens * COMPACTION_TARGET_RATIO)
+
+    # Leading system prompts are kept as they are; a previous summary is rolled up
+    head_size = 0
+    while head_size < len(messages) and _as_dict(messages[head_size]).get("role") == "system" \
+            and not _is_summary(messages[head_size]):
+        head_size += 1
+    head = list(messages[:head_size])
+    body = list(messages[head_size:])
+
+    evict_stale_tool_results(body, keep_recent)
+
+    groups = _split_groups(body)
+    old = []
+    # Move whole groups into the summary until the rest fits the target
+    while len(groups) > 1 and count_tokens(head) + sum(count_tokens(group) for group in groups) > target \
+            and sum(len(group) for group in groups[1:]) >= keep_recent:
+        old.extend(groups.pop(0))
+    if groups and _is_summary(groups[0][0]):
+        old.extend(groups.pop(0))
+
+    if old:
+        summary_budget = max(max_tokens - target, 0) * 4
+        summary = summarizer(old)
+        if summary:
+            head.append({"role": "system", "content": f"{SUMMARY_PREFIX}\n{summary[:summary_budget]}"})
+
+    # Hard ceiling: drop the oldest turns, keeping at least the latest one
+    while len(groups) > 1 and count_tokens(head) + sum(count_tokens(group) for group in groups) > max_tokens:
+        groups.pop(0)
+
+    body = [message for group in groups for message in group]
+    # The latest turn alone is too large: truncate the summary, then tool results, oldest first
+    for part, index in [(head, index) for index in range(len(head)) if _is_summary(head[index])] + \
+            [(body, index) for index in range(len(body)) if _as_dict(body[index]).get("role") == "tool"]:
+        excess = count_tokens(head) + count_tokens(body) - max_tokens
+        if excess <= 0:
+            break
+        content = _as_dict(part[index]).get("content") or ""
+        if len(content) <= 2 * len(TRUNCATION_MARKER):
+            continue
+        part[index] = _truncate(part[index], len(content) - (excess + 1) * 4)
+
+    messages[:] = head + body
+    return messages
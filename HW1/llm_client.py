@@ -0,0 +1,271 @@
+"""
+OpenAI Client Wrapper Module
+Paces chat completion requests using the rate-limit headers returned by the API
+and retries 429 and transient 5xx errors with jittered exponential backoff.
+
+Requests first wait for a slot in the fair LLM scheduler (see scheduler.py),
+which orders them by priority class and tenant and, if enabled, takes their
+estimated tokens from the shared tokens-per-minute budget.
+"""
+
+import random
+import re
+import threading
+import time
+
+import recording
+from deadline import DeadlineExceeded, current_deadline
+from history import count_tokens
+from scheduler import get_scheduler
+
+# HTTP status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_reset_duration(value):
+    """
+    Parse a rate-limit reset duration such as "1s", "6m0s" or "250ms".
+
+    Args:
+        value (str): Duration string from an x-ratelimit-reset-* header
+
+    Returns:
+        float: Duration in seconds, or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_int(headers, name):
+    """
+    Read an integer rate-limit header.
+
+    Returns:
+        int: Header value, or None if it is missing or malformed
+    """
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error):
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def _retry_after(error):
+    """
+    Read the server-suggested delay from a failed response, if any.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if headers.get("retry-after"):
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            pass
+    return None
+
+
+class RateLimitedClient:
+    """
+    Wrapper around an OpenAI client that stays under the account rate limits.
+
+    After every response the remaining request and token budgets and their
+    reset times are read from the x-ratelimit-* headers. Before the next
+    request the wrapper waits for a reset if the budget is exhausted, instead
+    of sending a request that would be rejected with 429.
+    """
+
+    def __init__(self, client, max_retries=6, deadline=60.0, base_delay=0.5, max_delay=20.0):
+        """
+        Args:
+            client: OpenAI client; its own retries should be disabled (max_retries=0)
+            max_retries (int): Maximum number of retries per request
+            deadline (float): Total time budget per request in seconds, including retries
+            base_delay (float): Initial backoff delay in seconds
+            max_delay (float): Maximum backoff delay in seconds
+        """
+        self.client = client
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.stats = {"requests": 0, "retries": 0, "paced_seconds": 0.0}
+
+    def update_limits(self, headers):
+        """
+        Update the known rate-limit state from response headers.
+
+        Missing or malformed values leave the known state unchanged; they
+        must not fail a completion that succeeded.
+
+        Args:
+            headers: Response headers (case-insensitive mapping)
+        """
+        now = time.monotonic()
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+        with self._lock:
+            if remaining_requests is not None:
+                self.remaining_requests = remaining_requests
+                reset = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+                self.requests_reset_at = now + (reset or 0.0)
+            if remaining_tokens is not None:
+                self.remaining_tokens = remaining_tokens
+                reset = parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+                self.tokens_reset_at = now + (reset or 0.0)
+
+    def _count(self, key, amount=1):
+        # The client is shared by the server's worker threads
+        with self._lock:
+            self.stats[key] += amount
+
+    def pacing_delay(self, estimated_tokens=0):
+        """
+        Compute how long to wait before the next request fits the budget.
+
+        Args:
+            estimated_tokens (int): Estimated prompt size of the next request
+
+        Returns:
+            float: Seconds to wait (0 if the request can be sent now)
+        """
+        now = time.monotonic()
+        delay = 0.0
+        with self._lock:
+            if self.remaining_requests is not None and self.remaining_requests <= 0:
+                delay = max(delay, self.requests_reset_at - now)
+            if self.remaining_tokens is not None and self.remaining_tokens < estimated_tokens:
+                delay = max(delay, self.tokens_reset_at - now)
+            # Reserve the budget this request will use
+            if self.remaining_requests is not None:
+                self.remaining_requests -= 1
+            if self.remaining_tokens is not None:
+                self.remaining_tokens -= estimated_tokens
+        return max(delay, 0.0)
+
+    def backoff_delay(self, attempt, error=None):
+        """
+        Compute the jittered exponential backoff delay for a retry.
+
+        Args:
+            attempt (int): Number of the retry (0 for the first retry)
+            error (Exception, optional): Error that caused the retry
+
+        Returns:
+            float: Seconds to wait before retrying
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        suggested = _retry_after(error) if error is not None else None
+        if suggested:
+            delay = max(delay, min(suggested, self.max_delay))
+        return delay
+
+    def create_chat_completion(self, **kwargs):
+        """
+        Create a chat completion with pacing and retries.
+
+        In record/replay mode the completion goes through the active cassette
+        (see recording.py) under the "openai" provider.
+
+        Args:
+            **kwargs: Arguments for client.chat.completions.create
+
+        Returns:
+            ChatCompletion: Parsed completion response
+        """
+        from openai.types.chat import ChatCompletion
+
+        return recording.call(
+            "openai",
+            kwargs,
+            lambda: self._create_with_retries(**kwargs),
+            encode=lambda completion: completion.model_dump(mode="json"),
+            decode=ChatCompletion.model_validate,
+        )
+
+    def _create_with_retries(self, **kwargs):
+        """
+        Create a chat completion with pacing and retries.
+
+        Args:
+            **kwargs: Arguments for client.chat.completions.create
+
+        Returns:
+            ChatCompletion: Parsed completion response
+
+        Raises:
+            openai.OpenAIError: If the request fails permanently
+            DeadlineExceeded: If the request deadline has passed before sending
+        """
+        give_up_at = time.monotonic() + self.deadline
+        request_deadline = current_deadline()
+        if request_deadline is not None:
+            give_up_at = min(give_up_at, request_deadline.expires_at)
+            if request_deadline.expired():
+                raise DeadlineExceeded("Request deadline exceeded before calling the model")
+        estimated_tokens = count_tokens(kwargs.get("messages", []))
+        with get_scheduler("llm").slot(estimated_tokens):
+            return self._send_paced(kwargs, estimated_tokens, give_up_at)
+
+    def _send_paced(self, kwargs, estimated_tokens, give_up_at):
+        """
+        Send a chat completion request after pacing, retrying transient errors.
+        """
+        import openai
+
+        pause = self.pacing_delay(estimated_tokens)
+        if pause > 0:
+            pause = min(pause, max(give_up_at - time.monotonic(), 0.0))
+            self._count("paced_seconds", pause)
+            time.sleep(pause)
+
+        attempt = 0
+        while True:
+            try:
+                self._count("requests")
+                timeout = max(give_up_at - time.monotonic(), 0.1)
+                raw_response = self.client.chat.completions.with_raw_response.create(timeout=timeout, **kwargs)
+                self.update_limits(raw_response.headers)
+                return raw_response.parse()
+            except openai.OpenAIError as e:
+                response = getattr(e, "response", None)
+                if response is not None:
+                    self.update_limits(response.headers)
+                if not _is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                if time.monotonic() + delay > give_up_at:
+                    raise
+                self._count("retries")
+                attempt += 1
+                time.sleep(delay)
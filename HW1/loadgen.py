@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Load Generator
+Replays a corpus of multi-turn conversations against the agent to find its
+saturation point.
+
+Two load models are supported:
+- closed loop: a fixed number of virtual users, each starting its next
+  conversation when the previous one finished (plus optional think time)
+- open loop: conversations arrive as a Poisson process at a target rate,
+  independently of how fast they are served, and wait for one of a fixed
+  number of workers; the wait is reported as queueing delay
+
+Each load level runs for a fixed duration. The report lists throughput,
+turn latency, queueing delay and error rate per level, plus the saturation
+throughput: the highest throughput reached within the error budget.
+
+Usage:
+    python loadgen.py --mode closed --levels 1,4,16,64 --duration 10
+    python loadgen.py --mode open --levels 5,10,20,40 --workers 16 --output load.json
+    python loadgen.py --url http://127.0.0.1:8080 --levels 8,32,128
+    python loadgen.py --prefetch --levels 4,16
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench import add_backend_arguments, percentile, setup_backend
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "loadgen_corpus.jsonl")
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+def load_corpus(path):
+    """
+    Load a conversation corpus.
+
+    Each line is a JSON object with a "turns" list of user messages.
+
+    Args:
+        path (str): JSONL file
+
+    Returns:
+        list: Conversations as lists of user messages
+    """
+    conversations = []
+    with open(path, encoding="utf-8") as corpus_file:
+        for line in corpus_file:
+            if line.strip():
+                conversations.append(json.loads(line)["turns"])
+    return conversations
+
+
+class LoadStats:
+    """
+    Thread-safe collector of turn latencies, queueing delays and errors of one load level.
+    """
+
+    def __init__(self):
+        self.turn_latencies = []
+        self.queue_delays = []
+        self.conversations = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record_turn(self, seconds, failed):
+        with self._lock:
+            self.turn_latencies.append(seconds)
+            if failed:
+                self.errors += 1
+
+    def record_conversation(self, queue_delay=None):
+        with self._lock:
+            self.conversations += 1
+            if queue_delay is not None:
+                self.queue_delays.append(queue_delay)
+
+    def summary(self, wall_seconds):
+        """
+        Args:
+            wall_seconds (float): Duration of the load level including draining
+
+        Returns:
+            dict: Throughput, latency and queueing delay percentiles (ms) and error rate
+        """
+        turns = len(self.turn_latencies)
+        summary = {
+            "conversations": self.conversations,
+            "turns": turns,
+            "errors": self.errors,
+            "error_rate": round(self.errors / turns, 4) if turns else 0.0,
+            "throughput_tps": round(turns / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+            "latency_p50_ms": round(percentile(self.turn_latencies, 50) * 1000, 1),
+            "latency_p95_ms": round(percentile(self.turn_latencies, 95) * 1000, 1),
+            "latency_p99_ms": round(percentile(self.turn_latencies, 99) * 1000, 1),
+        }
+        if self.queue_delays:
+            summary["queue_p50_ms"] = round(percentile(self.queue_delays, 50) * 1000, 1)
+            summary["queue_p95_ms"] = round(percentile(self.queue_delays, 95) * 1000, 1)
+            summary["queue_p99_ms"] = round(percentile(self.queue_delays, 99) * 1000, 1)
+        return summary
+
+
+def run_conversation(complete, turns, stats, think_time=0.0):
+    """
+    Play one conversation turn by turn, keeping its history.
+
+    Args:
+        complete (callable): Function taking the message list and returning the reply text
+        turns (list): User messages
+        stats (LoadStats): Collector for the turn results
+        think_time (float): Pause between turns in seconds
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    for index, text in enumerate(turns):
+        if index and think_time:
+            time.sleep(think_time)
+        messages.append({"role": "user", "content": text})
+        started = time.perf_counter()
+        try:
+            reply = complete(messages)
+            failed = False
+        except Exception:
+            reply = None
+            failed = True
+        stats.record_turn(time.perf_counter() - started, failed)
+        if failed:
+            # A real user would retry or give up; either way the history is unusable
+            return
+        messages.append({"role": "assistant", "content": reply})
+
+
+def run_closed_loop(complete, corpus, users, duration, think_time=0.0):
+    """
+    Run a closed-loop load level.
+
+    Args:
+        complete (callable): Turn function, see run_conversation()
+        corpus (list): Conversations
+        users (int): Number of concurrent virtual users
+        duration (float): Seconds during which new conversations are started
+        think_time (float): Pause between turns in seconds
+
+    Returns:
+        dict: Summary from LoadStats.summary()
+    """
+    stats = LoadStats()
+    counter = iter(range(sys.maxsize))
+    counter_lock = threading.Lock()
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    def user():
+        while time.perf_counter() < stop_at:
+            with counter_lock:
+                index = next(counter)
+            run_conversation(complete, corpus[index % len(corpus)], stats, think_time)
+            stats.record_conversation()
+
+    threads = [threading.Thread(target=user, daemon=True) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.summary(time.perf_counter() - started)
+
+
+def run_open_loop(complete, corpus, rate, workers, duration, think_time=0.0, rng=None):
+    """
+    Run an open-loop load level with Poisson conversation arrivals.
+
+    Args:
+        complete (callable): Turn function, see run_conversation()
+        corpus (list): Conversations
+        rate (float): Conversation arrivals per second
+        workers (int): Number of conversations served at the same time
+        duration (float): Seconds during which conversations arrive
+        think_time (float): Pause between turns in seconds
+        rng (random.Random, optional): Source of the arrival times
+
+    Returns:
+        dict: Summary from LoadStats.summary(), including queueing delays
+    """
+    rng = rng or random.Random()
+    stats = LoadStats()
+
+    def serve(turns, arrived_at):
+        queue_delay = time.perf_counter() - arrived_at
+        run_conversation(complete, turns, stats, think_time)
+        stats.record_conversation(queue_delay)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        arrival = started
+        index = 0
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival >= started + duration:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(serve, corpus[index % len(corpus)], arrival)
+            index += 1
+    return stats.summary(time.perf_counter() - started)
+
+
+def saturation(levels, max_error_rate):
+    """
+    Find the saturation throughput of a load sweep.
+
+    Args:
+        levels (list): Level summaries with "level" and "throughput_tps"
+        max_error_rate (float): Highest acceptable error rate
+
+    Returns:
+        dict: Level with the highest throughput within the error budget, or None
+    """
+    healthy = [level for level in levels if level["error_rate"] <= max_error_rate]
+    if not healthy:
+        return None
+    return max(healthy, key=lambda level: level["throughput_tps"])
+
+
+def agent_turn(model, tenant=None, priority=None):
+    """
+    Build a turn function calling the agent in-process.
+    """
+    from main import get_completion_from_messages
+    from scheduler import caller_scope
+
+    def complete(messages):
+        with caller_scope(tenant, priority):
+            reply = get_completion_from_messages(messages, model=model)
+        return reply if isinstance(reply, str) else reply.content
+    return complete
+
+
+def http_turn(url, model, tenant=None, priority=None):
+    """
+    Build a turn function calling a running agent service (server.py).
+
+    Non-2xx answers, including 503 rejections, count as errors.
+    """
+    import requests
+
+    sessions = threading.local()
+    endpoint = f"{url.rstrip('/')}/v1/chat"
+    headers = {name: value for name, value in (("X-Tenant", tenant), ("X-Priority", priority)) if value}
+
+    def complete(messages):
+        session = getattr(sessions, "session", None)
+        if session is None:
+            session = sessions.session = requests.Session()
+        response = session.post(endpoint, json={"messages": messages, "model": model}, headers=headers, timeout=60)
+        response.raise_for_status()
+        return response.json()["reply"]
+    return complete
+
+
+def print_report(report):
+    mode = report["meta"]["mode"]
+    label = "users" if mode == "closed" else "rate/s"
+    print(f"{label:>8}{'convs':>7}{'turns':>7}{'err%':>7}{'turns/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          + (f"{'q p50':>9}{'q p95':>9}" if mode == "open" else ""))
+    for level in report["levels"]:
+        line = (f"{level['level']:>8}{level['conversations']:>7}{level['turns']:>7}{level['error_rate'] * 100:>7.1f}"
+                f"{level['throughput_tps']:>9.1f}{level['latency_p50_ms']:>9.0f}{level['latency_p95_ms']:>9.0f}"
+                f"{level['latency_p99_ms']:>9.0f}")
+        if mode == "open":
+            line += f"{level.get('queue_p50_ms', 0):>9.0f}{level.get('queue_p95_ms', 0):>9.0f}"
+        print(line)
+    peak = report["saturation"]
+    if peak:
+        print(f"\nSaturation throughput: {peak['throughput_tps']:.1f} turns/s at {label} {peak['level']}")
+    else:
+        print("\nNo level stayed within the error budget")
+
+
+def main():
+    """
+    Run a load sweep from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Replay conversations against the agent under load")
+    add_backend_arguments(parser)
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--levels", default="1,4,16",
+                        help="comma-separated virtual users (closed) or arrivals per second (open)")
+    parser.add_argument("--workers", type=int, default=16, help="conversations served at once (open loop)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per load level")
+    parser.add_argument("--think-time", type=float, default=0.0, help="pause between turns in seconds")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="JSONL conversation corpus")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--url", help="load a running agent service (server.py) instead of the in-process agent")
+    parser.add_argument("--prefetch", action="store_true",
+                        help="start predicted tool calls during the first completion (in-process agent)")
+    parser.add_argument("--answer-cache", action="store_true",
+                        help="answer repeated opening questions from the semantic answer cache (in-process agent)")
+    parser.add_argument("--tenant", help="tenant the turns are sent as (X-Tenant, see scheduler.py)")
+    parser.add_argument("--priority", choices=["interactive", "bulk"], help="priority class of the turns (X-Priority)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", help="write the report JSON to this file")
+    args = parser.parse_args()
+
+    if args.url:
+        metadata = {"backend": "service", "url": args.url}
+        complete = http_turn(args.url, args.model, args.tenant, args.priority)
+    else:
+        metadata = setup_backend(args)
+        if args.prefetch:
+            os.environ["AGENT_PREFETCH"] = "1"
+        if args.answer_cache:
+            os.environ["AGENT_ANSWER_CACHE"] = "1"
+        # Import the lazy dependencies before the worker threads race to do it
+        from main import preload
+        preload()
+        complete = agent_turn(args.model, args.tenant, args.priority)
+    corpus = load_corpus(args.corpus)
+    rng = random.Random(args.seed)
+    # Warm up lazy imports, clients and connection pools outside the measurement
+    run_conversation(complete, corpus[0], LoadStats())
+    if args.prefetch:
+        from prefetch import reset_prefetch_stats
+        reset_prefetch_stats()
+
+    levels = []
+    for value in args.levels.split(","):
+        level = float(value) if args.mode == "open" else int(value)
+        if args.mode == "closed":
+            summary = run_closed_loop(complete, corpus, level, args.duration, args.think_time)
+        else:
+            summary = run_open_loop(complete, corpus, level, args.workers, args.duration, args.think_time, rng)
+        levels.append(dict({"level": level}, **summary))
+        print(f"  {args.mode} {level}: {summary['throughput_tps']:.1f} turns/s, "
+              f"p95 {summary['latency_p95_ms']:.0f} ms, errors {summary['errors']}")
+
+    prefetch_stats = None
+    if args.prefetch and not args.url:
+        from prefetch import get_prefetch_stats
+        prefetch_stats = get_prefetch_stats()
+
+    report = {
+        "meta": dict(metadata, mode=args.mode, duration=args.duration, think_time=args.think_time,
+                     workers=args.workers if args.mode == "open" else None, corpus=os.path.basename(args.corpus)),
+        "levels": levels,
+        "saturation": saturation(levels, args.max_error_rate),
+    }
+    if prefetch_stats:
+        report["prefetch"] = prefetch_stats
+    print()
+    print_report(report)
+    if prefetch_stats:
+        print(f"Prefetch: {prefetch_stats['hits']}/{prefetch_stats['predicted']} speculative calls used "
+              f"(hit rate {prefetch_stats['hit_rate']:.0%}), {prefetch_stats['coverage']:.0%} of tool calls prefetched")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+            output_file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,289 @@
 import os
-import json
-from openai import OpenAI
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 
+import metrics
+import recording
+from answer_cache import AnswerCache, answer_cache_enabled, opening_question
+# Everything that ends up in the request prefix is serialized canonically, so the
+# same value always produces the same bytes and provider-side prompt caching stays effective
+from codec import dumps as dump_json, loads
+from deadline import deadline_scope
+from history import DEFAULT_MAX_TOKENS, compact_history
+from llm_client import RateLimitedClient
+from prefetch import Prefetcher, prefetch_enabled
+from tracing import SPAN_KIND_CLIENT, span
+
 # Import tools from the tools module
 from tools import (
     get_stock_price,
     get_dividend_date, 
     get_weather,
+    get_price_history,
     search_web,
     tools,
-    available_functions
+    available_functions,
+    registry
 )
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
+# OpenAI client, created on first completion (importing openai is slow)
+llm = None
+_llm_lock = threading.Lock()
+
+# Latency target for a whole turn (both completions and all tool calls), in seconds
+DEFAULT_TURN_TIMEOUT = 30.0
+
+# Reply of a turn in which the model did not call a tool
+NO_TOOL_ANSWER = "No relevant function call found."
+
+
+def get_llm():
+    """
+    Get the rate-limited OpenAI client, creating it on first use.
+
+    Returns:
+        RateLimitedClient: Shared client wrapper
+    """
+    global llm
+    if llm is None:
+        with _llm_lock:
+            if llm is None:
+                from openai import OpenAI
+
+                # Retries are handled by RateLimitedClient
+                # Replayed completions never reach the API, so no key is needed;
+                # OPENAI_BASE_URL (read by the SDK) can point at mock_server.py
+                client = OpenAI(
+                    api_key=os.environ.get("OPENAI_API_KEY") or ("replay" if recording.replaying() else None),
+                    max_retries=0,
+                )
+                llm = RateLimitedClient(client)
+    return llm
+
+
+def preload():
+    """
+    Import the lazily loaded dependencies and create the OpenAI client up front.
+
+    Long-running services should call this before taking traffic: the first
+    concurrent turns would otherwise import openai, requests, the Tavily
+    client and yfinance from several threads at once, which can expose
+    partially initialized modules.
+    """
+    import requests  # noqa: F401
+
+    get_llm()
+    try:
+        import tavily  # noqa: F401
+    except ImportError:
+        pass
+    if not os.environ.get("YAHOO_BASE_URL"):
+        import yfinance  # noqa: F401
+
+
+# Tool schemas as the registry serialized them, sorted by name with canonical key
+# order, so every request sends identical bytes
+request_tools = loads(registry.schemas_json())
+
+# Semantic cache of whole turns, consulted when AGENT_ANSWER_CACHE is set
+answer_cache = AnswerCache(registry)
+
+# Token usage accumulated across all completions in this process
+usage_stats = {
+    "requests": 0,
+    "prompt_tokens": 0,
+    "cached_tokens": 0,
+    "completion_tokens": 0,
+}
+_usage_lock = threading.Lock()
+
+
+def build_request(messages, model):
+    """
+    Build the keyword arguments for a chat completion request.
+
+    The prefix (tools, then messages in order) contains no volatile values,
+    so consecutive turns of a conversation share a byte-identical prefix.
+
+    Args:
+        messages (list): List of message dictionaries with role and content
+        model (str): OpenAI model to use
+
+    Returns:
+        dict: Keyword arguments for client.chat.completions.create
+    """
+    return {
+        "model": model,
+        "messages": messages,
+        "tools": request_tools,
+        "tool_choice": "auto",
+    }
+
+
+def record_usage(response):
+    """
+    Record token usage of a completion, including cached prompt tokens.
 
+    Args:
+        response: OpenAI chat completion response
 
-def get_completion_from_messages(messages, model="gpt-4o"):
+    Returns:
+        dict: Usage of this completion (prompt, cached and completion tokens)
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+    call_usage = {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": usage.completion_tokens or 0,
+    }
+
+    # Turns run on concurrent worker threads
+    with _usage_lock:
+        usage_stats["requests"] += 1
+        for key, value in call_usage.items():
+            usage_stats[key] += value
+    return call_usage
+
+
+def get_usage_stats():
+    """
+    Get accumulated token usage, including the prompt cache hit ratio.
+
+    Returns:
+        dict: Token counters and the share of prompt tokens served from cache
+    """
+    with _usage_lock:
+        stats = dict(usage_stats)
+    prompt_tokens = stats["prompt_tokens"]
+    stats["cached_ratio"] = stats["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+    return stats
+
+
+def get_completion_from_messages(messages, model="gpt-4o", max_history_tokens=DEFAULT_MAX_TOKENS,
+                                 turn_timeout=DEFAULT_TURN_TIMEOUT, on_event=None, prefetch=None,
+                                 use_answer_cache=None):
     """
     Process messages and handle function calls using OpenAI's function calling feature.
     
+    The message list is compacted in place before each completion so long
+    sessions stay under max_history_tokens. The whole turn runs under one
+    deadline; every completion, tool and HTTP hop only gets the remaining time.
+    An opening question similar to one answered before can be served from the
+    answer cache without any completion.
+    
     Args:
         messages (list): List of message dictionaries with role and content
         model (str): OpenAI model to use (default: "gpt-4o")
+        max_history_tokens (int): Hard ceiling for the conversation size (0 disables compaction)
+        turn_timeout (float): Time budget for the whole turn in seconds (None for no deadline)
+        on_event (callable, optional): Called with progress events ("tool_call", "tool_result")
+            as they happen, e.g. to stream them to a client
+        prefetch (bool, optional): Start tool calls predicted from the user message while the
+            first completion runs (defaults to AGENT_PREFETCH)
+        use_answer_cache (bool, optional): Look up and store the answer in the semantic
+            answer cache (defaults to AGENT_ANSWER_CACHE)
     
     Returns:
-        OpenAI message object or error string
+        OpenAI message object (or CachedAnswer) or error string
+    """
+    with deadline_scope(turn_timeout), span("agent.turn", **{"gen_ai.request.model": model}) as current:
+        if use_answer_cache is None:
+            use_answer_cache = answer_cache_enabled()
+        question = opening_question(messages) if use_answer_cache else None
+        if question is not None:
+            cached = answer_cache.lookup(messages)
+            current.set_attribute("answer_cache.hit", cached is not None)
+            if cached is not None:
+                if cached.tool_call:
+                    name, arguments, result_json = cached.tool_call
+                    append_tool_exchange(messages, f"call_cached_{uuid.uuid4().hex[:24]}", name, arguments,
+                                          result_json)
+                if on_event:
+                    on_event({"event": "answer_cached", "similarity": round(cached.similarity, 3)})
+                return cached
+        started_at = time.time()
+
+        if prefetch is None:
+            prefetch = prefetch_enabled()
+        prefetcher = Prefetcher(registry) if prefetch else None
+        if prefetcher is not None:
+            prefetcher.start(messages)
+        try:
+            answer = _run_turn(messages, model, max_history_tokens, on_event, prefetcher)
+        finally:
+            if prefetcher is not None:
+                prefetcher.discard()
+        # The fallback reply is not an answer worth serving to similar questions
+        if question is not None and not isinstance(answer, str):
+            answer_cache.store(question, messages, answer.content, started_at)
+        return answer
+
+
+def _complete(messages, model, max_history_tokens):
+    """
+    Compact the history and run one chat completion, recording its usage.
+    """
+    compact_history(messages, max_history_tokens)
+    with span("llm.chat_completion", kind=SPAN_KIND_CLIENT, **{"gen_ai.request.model": model}) as current:
+        started = time.perf_counter()
+        response = get_llm().create_chat_completion(**build_request(messages, model))
+        call_usage = record_usage(response)
+        metrics.record_llm_call(model, time.perf_counter() - started, call_usage)
+        current.set_attribute("gen_ai.usage.input_tokens", call_usage.get("prompt_tokens"))
+        current.set_attribute("gen_ai.usage.cached_tokens", call_usage.get("cached_tokens"))
+        current.set_attribute("gen_ai.usage.output_tokens", call_usage.get("completion_tokens"))
+    return response
+
+
+def append_tool_exchange(messages, tool_id, function_name, function_args, content):
     """
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        tools=tools,  # Custom tools
-        tool_choice="auto"  # Allow AI to decide if a tool should be called
-    )
+    Append a tool call of the assistant and its result to the conversation.
+
+    Args:
+        messages (list): Conversation (modified in place)
+        tool_id (str): Tool call ID
+        function_name (str): Tool name
+        function_args (dict): Call arguments
+        content (str): Tool result as JSON
+    """
+    messages.append({
+        "role": "assistant",
+        "tool_calls": [
+            {
+                "id": tool_id,
+                "type": "function",
+                "function": {
+                    "name": function_name,
+                    "arguments": dump_json(function_args),
+                }
+            }
+        ]
+    })
+    messages.append({
+        "role": "tool",
+        "tool_call_id": tool_id,
+        "name": function_name,
+        "content": content,
+    })
+
+
+def _run_turn(messages, model, max_history_tokens, on_event=None, prefetcher=None):
+    """
+    Run one agent turn: first completion, optional tool call and synthesis completion.
+
+    A tool call the prefetcher already started is not run a second time.
+    """
+    response = _complete(messages, model, max_history_tokens)
 
     response_message = response.choices[0].message
 
@@ -48,45 +293,28 @@ def get_completion_from_messages(messages, model="gpt-4o"):
 
         # Extract tool name and arguments
         function_name = tool_call.function.name
-        function_args = json.loads(tool_call.function.arguments) 
+        function_args = loads(tool_call.function.arguments)
         tool_id = tool_call.id
         
-        # Call the function
-        function_to_call = available_functions[function_name]
-        function_response = function_to_call(**function_args)
-
-        messages.append({
-            "role": "assistant",
-            "tool_calls": [
-                {
-                    "id": tool_id,  
-                    "type": "function",
-                    "function": {
-                        "name": function_name,
-                        "arguments": json.dumps(function_args),
-                    }
-                }
-            ]
-        })
-        messages.append({
-            "role": "tool",
-            "tool_call_id": tool_id,  
-            "name": function_name,
-            "content": json.dumps(function_response),
-        })
+        # Call the function through the registry (cache, timeout and concurrency policies)
+        if on_event:
+            on_event({"event": "tool_call", "name": function_name, "arguments": function_args})
+        function_response = prefetcher.take(function_name, function_args) if prefetcher else None
+        if function_response is None:
+            function_response = registry.dispatch(function_name, function_args)
+        if on_event:
+            on_event({"event": "tool_result", "name": function_name,
+                      "error": isinstance(function_response, dict) and "error" in function_response})
+
+        append_tool_exchange(messages, tool_id, function_name, function_args, dump_json(function_response))
 
         # Second call to get final response based on function output
-        second_response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            tools=tools,  
-            tool_choice="auto"  
-        )
+        second_response = _complete(messages, model, max_history_tokens)
         final_answer = second_response.choices[0].message
 
         return final_answer
 
-    return "No relevant function call found."
+    return NO_TOOL_ANSWER
 
 
 def main():
@@ -101,9 +329,21 @@ def main():
     print("2. get_dividend_date - Get dividend dates")
     print("3. get_weather - Get weather information")
     print("4. search_web - Search the web")
+    print("5. get_price_history - Get price history analytics")
     print("\nUse the get_completion_from_messages() function to interact with the AI assistant.")
     print("See test files for examples of how to use each tool.")
 
+    metrics_port = os.environ.get("AGENT_METRICS_PORT")
+    if metrics_port:
+        server = metrics.start_server(int(metrics_port))
+        print(f"\nMetrics available at http://127.0.0.1:{metrics_port}/metrics (Ctrl-C to stop)")
+        # The server runs in a daemon thread, so keep the process alive while it is scraped
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,309 @@
+"""
+Metrics Module
+Counters and histograms for tool and LLM performance, exposed in Prometheus
+text format on a local HTTP port.
+
+Recording is lock-free on the hot path: every thread writes to its own shard
+of a metric, and shards are only summed when the metrics are scraped. The
+shards of threads that have finished are folded into one retired total at
+that point, so short-lived threads do not pile up shards.
+"""
+
+import bisect
+import threading
+
+# Default histogram buckets for latencies, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# USD per million tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+}
+
+_metrics = []
+_metrics_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    """
+    Base class holding the per-thread shards of a metric.
+    """
+
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # (thread, shard) of every thread that has recorded a value
+        self._shards = []
+        # Totals of the shards of finished threads
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+        with _metrics_lock:
+            _metrics.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _merge(self, totals, shard):
+        raise NotImplementedError
+
+    def _totals(self):
+        """
+        Sum the retired totals and the shards of running threads, retiring the
+        shards of finished threads first (they cannot be written any more).
+
+        Returns:
+            dict: Label values tuple to total
+        """
+        totals = {}
+        with self._shards_lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = live
+            self._merge(totals, self._retired)
+            for _, shard in live:
+                self._merge(totals, shard)
+        return totals
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing counter.
+    """
+
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        """
+        Increase the counter.
+
+        Args:
+            amount (float): Amount to add
+            **labels: Label values
+        """
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, totals, shard):
+        for key, value in dict(shard).items():
+            totals[key] = totals.get(key, 0) + value
+
+    def values(self):
+        """
+        Returns:
+            dict: Label values tuple to total
+        """
+        return self._totals()
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in sorted(self.values().items())]
+
+
+class Histogram(_Metric):
+    """
+    Histogram with fixed buckets.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        Record an observation.
+
+        Args:
+            value (float): Observed value
+            **labels: Label values
+        """
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _merge(self, totals, shard):
+        for key, (counts, total, count) in dict(shard).items():
+            merged = totals.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+
+    def values(self):
+        """
+        Returns:
+            dict: Label values tuple to (bucket counts, sum, count)
+        """
+        return self._totals()
+
+    def render(self):
+        lines = []
+        for key, (counts, total, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def render():
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: Metrics text
+    """
+    with _metrics_lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# LLM metrics
+llm_requests = Counter("agent_llm_requests_total", "Chat completion requests", ["model"])
+llm_latency = Histogram("agent_llm_latency_seconds", "Chat completion latency", ["model"])
+llm_tokens = Counter("agent_llm_tokens_total", "Tokens used by chat completions", ["model", "type"])
+llm_cost = Counter("agent_llm_cost_usd_total", "Estimated cost of chat completions in USD", ["model"])
+
+# Tool metrics
+tool_calls = Counter("agent_tool_calls_total", "Tool calls by outcome (ok, error, cache_hit, refresh, rejected)",
+                     ["tool", "outcome"])
+tool_latency = Histogram("agent_tool_latency_seconds", "Tool call latency including cache lookups", ["tool"])
+
+# Speculative tool calls (prefetch.py)
+prefetch_calls = Counter("agent_prefetch_calls_total",
+                         "Speculative tool calls by outcome (hits, wasted, misses)", ["tool", "outcome"])
+
+# Semantic answer cache (answer_cache.py)
+answer_cache_lookups = Counter("agent_answer_cache_lookups_total",
+                               "Answer cache lookups by outcome (hits, misses, stale)", ["outcome"])
+
+# Cache refresh-ahead (warmup.py)
+warmup_refreshes = Counter("agent_warmup_refreshes_total",
+                           "Cache warm-up refreshes by outcome (refreshed, failed, throttled)", ["tool", "outcome"])
+
+# Fair scheduling of LLM and tool calls (scheduler.py)
+scheduler_wait = Histogram("agent_scheduler_wait_seconds", "Time calls waited for a slot in the fair scheduler",
+                           ["scheduler", "priority"])
+
+# Upstream HTTP metrics
+http_requests = Counter("agent_http_requests_total", "Outbound HTTP requests", ["provider", "status"])
+http_latency = Histogram("agent_http_latency_seconds", "Outbound HTTP request latency", ["provider"])
+hop_timeout = Histogram("agent_hop_timeout_seconds", "Adaptive timeouts given to upstream calls (timeouts.py)",
+                        ["endpoint"])
+abandoned_calls = Counter("agent_abandoned_calls_total",
+                          "Blocking calls abandoned at their timeout while still running (deadline.py)")
+
+# HTTP service (server.py)
+server_requests = Counter("agent_server_requests_total", "Requests served by the HTTP service", ["path", "status"])
+server_queue_wait = Histogram("agent_server_queue_wait_seconds", "Time chat requests waited for a worker",
+                              ["priority"])
+server_turn_latency = Histogram("agent_server_turn_seconds", "Agent turn latency in the HTTP service, excluding queueing")
+
+# Weather provider selection
+weather_source = Counter("agent_weather_source_total", "Weather results by provider", ["source"])
+weather_fallbacks = Counter("agent_weather_fallbacks_total", "Fallbacks from OpenWeatherMap to Open-Meteo")
+
+
+def record_llm_call(model, seconds, usage):
+    """
+    Record a chat completion with its token usage and estimated cost.
+
+    Args:
+        model (str): Model name
+        seconds (float): Request latency
+        usage (dict): prompt_tokens, cached_tokens and completion_tokens
+    """
+    prompt_tokens = usage.get("prompt_tokens", 0)
+    cached_tokens = usage.get("cached_tokens", 0)
+    completion_tokens = usage.get("completion_tokens", 0)
+    llm_requests.inc(model=model)
+    llm_latency.observe(seconds, model=model)
+    llm_tokens.inc(prompt_tokens, model=model, type="prompt")
+    llm_tokens.inc(cached_tokens, model=model, type="cached")
+    llm_tokens.inc(completion_tokens, model=model, type="completion")
+
+    prices = MODEL_PRICES.get(model)
+    if prices:
+        input_price, cached_price, output_price = prices
+        cost = ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+                + completion_tokens * output_price) / 1_000_000
+        llm_cost.inc(cost, model=model)
+
+
+def start_server(port=9464, host="127.0.0.1"):
+    """
+    Serve /metrics on a local port from a background thread.
+
+    Args:
+        port (int): Port to listen on (0 picks a free port)
+        host (str): Interface to bind
+
+    Returns:
+        ThreadingHTTPServer: Running server (call shutdown() to stop it)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
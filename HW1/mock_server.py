@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+"""
+Mock Upstream Server
+Local stand-in for every API the agent calls, for load tests without quota.
+
+Emulated endpoints:
+- OpenAI chat completions (POST /v1/chat/completions), with tool calls
+- OpenAI files and batches (POST /v1/files, GET /v1/files/{id}/content,
+  POST /v1/batches, GET /v1/batches/{id}); a batch completes after a
+  configurable processing time
+- Yahoo Finance quotes and daily bars (GET /v7/finance/quote, /v8/finance/chart/{symbol})
+- ipapi.co (GET /json/)
+- OpenWeatherMap current weather and forecast (GET /data/2.5/weather, /data/2.5/forecast)
+- Open-Meteo geocoding and forecast (GET /v1/search, /v1/forecast)
+- Tavily search (POST /search)
+
+Every endpoint group has a configurable latency distribution (log-normal,
+given by its median and sigma), error rate and rate limit. Point the agent at
+the server with the environment variables printed on startup (see
+mock_environment()).
+
+Usage:
+    python mock_server.py --port 8900 --latency-ms 50 --error-rate 0.01
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ratelimit import TokenBucket
+
+# Default behaviour of every endpoint group
+DEFAULT_ENDPOINT_CONFIG = {
+    "latency_ms": 50.0,  # median latency
+    "latency_sigma": 0.5,  # log-normal shape; 0 gives a constant latency
+    "error_rate": 0.0,  # share of requests answered with 500
+    "rate_limit": 0.0,  # requests per second, 0 for unlimited
+    "burst": 10,
+}
+
+ENDPOINT_GROUPS = ("openai", "yahoo", "ipapi", "openweathermap", "open_meteo", "tavily")
+
+# Behaviour of OpenAI batches, configured under the "batch" key
+DEFAULT_BATCH_CONFIG = {
+    "processing_seconds": 1.0,  # time from creation until a batch is completed
+    "error_rate": 0.0,  # share of batch requests answered with an error line
+}
+
+WEATHER_DESCRIPTIONS = ("clear sky", "few clouds", "scattered clouds", "broken clouds", "light rain", "overcast clouds")
+
+_TICKER_IN_PARENS = re.compile(r"\(([A-Z]{1,5})\)")
+_TICKER = re.compile(r"\b([A-Z]{2,5})\b")
+_HISTORY_WORDS = ("trend", "history", "historical", "performance", "volatility", "drawdown", "moving average")
+_HISTORY_PERIOD = re.compile(r"(?:last|past) (\d+ )?(months?|years?)")
+_WEATHER_LOCATION = re.compile(r"weather (?:like |forecast )?(?:in|for) ([A-Za-z0-9 .,'-]+?)(?:[?.!]|$| and )", re.IGNORECASE)
+
+
+def _seed(text):
+    return zlib.crc32(text.lower().encode("utf-8"))
+
+
+def _stock_price(symbol):
+    return round(20 + _seed(symbol) % 48000 / 100, 2)
+
+
+def _price_history(symbol, period1, period2):
+    """
+    Deterministic daily bars of a symbol: a random walk over weekdays since 2015.
+
+    The walk is always generated from its start, so overlapping ranges agree.
+
+    Returns:
+        tuple: (session timestamps, dict of open/high/low/close/volume lists)
+    """
+    rng = random.Random(_seed(symbol))
+    close = _stock_price(symbol) / 3
+    day = datetime(2015, 1, 5, tzinfo=timezone.utc)
+    timestamps = []
+    bars = {name: [] for name in ("open", "high", "low", "close", "volume")}
+    while True:
+        session = int((day + timedelta(hours=14, minutes=30)).timestamp())
+        if session >= period2:
+            break
+        if day.weekday() < 5:
+            open_price = close * math.exp(rng.gauss(0, 0.004))
+            close = open_price * math.exp(rng.gauss(0.0004, 0.015))
+            high = max(open_price, close) * (1 + abs(rng.gauss(0, 0.006)))
+            low = min(open_price, close) * (1 - abs(rng.gauss(0, 0.006)))
+            volume = int(1_000_000 * (1 + 4 * rng.random()))
+            if session >= period1:
+                timestamps.append(session)
+                for name, value in zip(bars, (open_price, high, low, close, volume)):
+                    bars[name].append(round(value, 4) if name != "volume" else value)
+        day += timedelta(days=1)
+    return timestamps, bars
+
+
+def _weather(location):
+    seed = _seed(location)
+    return {
+        "temp": round(-5 + seed % 400 / 10, 1),
+        "humidity": 30 + seed % 65,
+        "pressure": 990 + seed % 40,
+        "wind": round(seed % 120 / 10, 1),
+        "description": WEATHER_DESCRIPTIONS[seed % len(WEATHER_DESCRIPTIONS)],
+    }
+
+
+class EndpointBehaviour:
+    """
+    Latency, error and rate-limit behaviour of one endpoint group.
+    """
+
+    def __init__(self, latency_ms, latency_sigma, error_rate, rate_limit, burst):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit > 0 else None
+
+    def sample_latency(self):
+        """
+        Returns:
+            float: Latency for the next response in seconds
+        """
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.latency_ms / 1000 * math.exp(random.gauss(0, self.latency_sigma))
+
+
+class MockState:
+    """
+    Shared state of the mock server: endpoint behaviour and request counters.
+    """
+
+    def __init__(self, config=None):
+        """
+        Args:
+            config (dict, optional): Per-group overrides of DEFAULT_ENDPOINT_CONFIG,
+                e.g. {"openai": {"latency_ms": 800}, "*": {"error_rate": 0.01}}, and
+                overrides of DEFAULT_BATCH_CONFIG under "batch"
+        """
+        config = config or {}
+        self.behaviours = {}
+        for group in ENDPOINT_GROUPS:
+            settings = dict(DEFAULT_ENDPOINT_CONFIG)
+            settings.update(config.get("*", {}))
+            settings.update(config.get(group, {}))
+            self.behaviours[group] = EndpointBehaviour(**settings)
+        self.batch_config = dict(DEFAULT_BATCH_CONFIG, **config.get("batch", {}))
+        self.requests = {group: 0 for group in ENDPOINT_GROUPS}
+        self.files = {}
+        self.batches = {}
+        self._lock = threading.Lock()
+        self._call_counter = 0
+        self._object_counter = 0
+
+    def count(self, group):
+        with self._lock:
+            self.requests[group] += 1
+
+    def next_call_id(self):
+        with self._lock:
+            self._call_counter += 1
+            return f"call_mock{self._call_counter}"
+
+    def next_object_id(self, prefix):
+        with self._lock:
+            self._object_counter += 1
+            return f"{prefix}-mock{self._object_counter}"
+
+
+def _choose_tool_call(text, tool_names):
+    """
+    Pick the tool call a model would likely make for a user message.
+
+    Returns:
+        tuple: (tool name, arguments) or None for a plain answer
+    """
+    lowered = text.lower()
+    ticker_match = _TICKER_IN_PARENS.search(text) or _TICKER.search(text)
+    if "weather" in lowered and "get_weather" in tool_names:
+        location = _WEATHER_LOCATION.search(text)
+        arguments = {"location": location.group(1).strip()} if location else {}
+        if "forecast" in lowered or "tomorrow" in lowered:
+            arguments["mode"] = "forecast"
+        return "get_weather", arguments
+    if ticker_match and "get_price_history" in tool_names and any(word in lowered for word in _HISTORY_WORDS):
+        period = _HISTORY_PERIOD.search(lowered)
+        arguments = {"ticker": ticker_match.group(1)}
+        named = period and f"{(period.group(1) or '1').strip()}{'mo' if period.group(2).startswith('month') else 'y'}"
+        if named in ("1mo", "3mo", "6mo", "1y", "2y", "5y"):
+            arguments["period"] = named
+        return "get_price_history", arguments
+    if "dividend" in lowered and ticker_match and "get_dividend_date" in tool_names:
+        return "get_dividend_date", {"ticker": ticker_match.group(1)}
+    if ticker_match and ("price" in lowered or "stock" in lowered) and "get_stock_price" in tool_names:
+        return "get_stock_price", {"ticker": ticker_match.group(1)}
+    if any(word in lowered for word in ("search", "news", "latest", "research")) and "search_web" in tool_names:
+        return "search_web", {"query": text[:200]}
+    return None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Request handler emulating the upstream APIs.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; Nagle would delay the body by a delayed ACK
+    disable_nagle_algorithm = True
+    state = None
+
+    # Routing: (method, path) -> (endpoint group, handler method name)
+    routes = {
+        ("POST", "/v1/chat/completions"): ("openai", "chat_completion"),
+        ("GET", "/v7/finance/quote"): ("yahoo", "yahoo_quote"),
+        ("GET", "/json/"): ("ipapi", "ipapi"),
+        ("GET", "/data/2.5/weather"): ("openweathermap", "openweather_current"),
+        ("GET", "/data/2.5/forecast"): ("openweathermap", "openweather_forecast"),
+        ("GET", "/v1/search"): ("open_meteo", "open_meteo_geocoding"),
+        ("GET", "/v1/forecast"): ("open_meteo", "open_meteo_forecast"),
+        ("POST", "/search"): ("tavily", "tavily_search"),
+        ("POST", "/v1/files"): ("openai", "upload_file"),
+        ("POST", "/v1/batches"): ("openai", "create_batch"),
+    }
+
+    # Routes with an object ID in the path: (method, pattern) -> (endpoint group, handler method name)
+    pattern_routes = {
+        ("GET", re.compile(r"^/v1/files/(?P<id>[\w-]+)/content$")): ("openai", "file_content"),
+        ("GET", re.compile(r"^/v1/batches/(?P<id>[\w-]+)$")): ("openai", "retrieve_batch"),
+        ("GET", re.compile(r"^/v8/finance/chart/(?P<id>[\w.^=-]+)$")): ("yahoo", "yahoo_chart"),
+    }
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        parsed = urlparse(self.path)
+        route = self.routes.get((method, parsed.path))
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        if route is None:
+            for (route_method, pattern), candidate in self.pattern_routes.items():
+                match = pattern.match(parsed.path) if route_method == method else None
+                if match:
+                    route = candidate
+                    query.update(match.groupdict())
+                    break
+        body = b""
+        if method == "POST":
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if route is None:
+            self._send_json(404, {"error": f"No mock for {method} {parsed.path}"})
+            return
+
+        group, handler_name = route
+        behaviour = self.state.behaviours[group]
+        self.state.count(group)
+        time.sleep(behaviour.sample_latency())
+
+        if behaviour.bucket is not None:
+            wait = behaviour.bucket.try_acquire()
+            if wait > 0:
+                self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                                {"retry-after-ms": str(int(wait * 1000) + 1)})
+                return
+        if behaviour.error_rate and random.random() < behaviour.error_rate:
+            self._send_json(500, {"error": {"message": "Injected mock failure", "type": "server_error"}})
+            return
+
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            payload = _parse_multipart(content_type, body)
+        else:
+            payload = json.loads(body) if body else {}
+        status, response = getattr(self, handler_name)(query, payload)
+        headers = self._rate_limit_headers(behaviour) if group == "openai" else None
+        if isinstance(response, bytes):
+            self._send_bytes(status, response, "application/octet-stream")
+        else:
+            self._send_json(status, response, headers)
+
+    def _rate_limit_headers(self, behaviour):
+        if behaviour.bucket is None:
+            return None
+        return {
+            "x-ratelimit-remaining-requests": str(int(behaviour.bucket._tokens)),
+            "x-ratelimit-reset-requests": f"{int(1000 / behaviour.bucket.rate)}ms",
+        }
+
+    def _send_json(self, status, payload, headers=None):
+        self._send_bytes(status, json.dumps(payload).encode("utf-8"), "application/json", headers)
+
+    def _send_bytes(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # --- OpenAI ---
+
+    def chat_completion(self, query, payload):
+        messages = payload.get("messages", [])
+        tool_names = {tool["function"]["name"] for tool in payload.get("tools") or []}
+        last = messages[-1] if messages else {"role": "user", "content": ""}
+        prompt_tokens = sum(len(json.dumps(message)) for message in messages) // 4
+
+        message = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+        if last.get("role") == "tool":
+            message["content"] = f"Here is what I found: {str(last.get('content'))[:200]}"
+        else:
+            choice = _choose_tool_call(str(last.get("content") or ""), tool_names)
+            if choice:
+                name, arguments = choice
+                message["tool_calls"] = [{
+                    "id": self.state.next_call_id(),
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)},
+                }]
+                finish_reason = "tool_calls"
+            else:
+                message["content"] = "I can help with stock prices, dividends, weather and web search."
+
+        completion_tokens = len(json.dumps(message)) // 4
+        return 200, {
+            "id": f"chatcmpl-mock{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": prompt_tokens // 1024 * 1024},
+            },
+        }
+
+    # --- OpenAI files and batches ---
+
+    def upload_file(self, query, payload):
+        content = payload.get("file", b"")
+        file_id = self.state.next_object_id("file")
+        file_object = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": payload.get("file_name", "upload.jsonl"),
+            "purpose": payload.get("purpose", b"").decode("utf-8"),
+            "status": "processed",
+        }
+        with self.state._lock:
+            self.state.files[file_id] = (file_object, content)
+        return 200, file_object
+
+    def file_content(self, query, payload):
+        entry = self.state.files.get(query["id"])
+        if entry is None:
+            return 404, {"error": {"message": f"No such file: {query['id']}", "type": "invalid_request_error"}}
+        return 200, entry[1]
+
+    def create_batch(self, query, payload):
+        entry = self.state.files.get(payload.get("input_file_id"))
+        if entry is None:
+            return 404, {"error": {"message": "Input file not found", "type": "invalid_request_error"}}
+        lines = [json.loads(line) for line in entry[1].decode("utf-8").splitlines() if line.strip()]
+        now = int(time.time())
+        batch = {
+            "id": self.state.next_object_id("batch"),
+            "object": "batch",
+            "endpoint": payload.get("endpoint"),
+            "errors": None,
+            "input_file_id": payload["input_file_id"],
+            "completion_window": payload.get("completion_window", "24h"),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": now,
+            "in_progress_at": None,
+            "expires_at": now + 86400,
+            "completed_at": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            "metadata": payload.get("metadata"),
+        }
+        with self.state._lock:
+            self.state.batches[batch["id"]] = (batch, lines, time.monotonic())
+        return 200, batch
+
+    def retrieve_batch(self, query, payload):
+        with self.state._lock:
+            entry = self.state.batches.get(query["id"])
+        if entry is None:
+            return 404, {"error": {"message": f"No such batch: {query['id']}", "type": "invalid_request_error"}}
+        batch, lines, created = entry
+        if batch["status"] in ("validating", "in_progress"):
+            elapsed = time.monotonic() - created
+            if elapsed < self.state.batch_config["processing_seconds"]:
+                batch["status"] = "in_progress"
+                batch["in_progress_at"] = batch["in_progress_at"] or int(time.time())
+            else:
+                self._complete_batch(batch, lines)
+        return 200, batch
+
+    def _complete_batch(self, batch, lines):
+        """
+        Run every request of a batch and store its output and error files.
+        """
+        outputs, errors = [], []
+        for line in lines:
+            request_id = self.state.next_object_id("batch_req")
+            if random.random() < self.state.batch_config["error_rate"]:
+                errors.append({"id": request_id, "custom_id": line["custom_id"], "response": None,
+                               "error": {"code": "server_error", "message": "Injected mock failure"}})
+                continue
+            _, body = self.chat_completion({}, line["body"])
+            outputs.append({"id": request_id, "custom_id": line["custom_id"], "error": None,
+                            "response": {"status_code": 200, "request_id": request_id, "body": body}})
+
+        for kind, records in (("output_file_id", outputs), ("error_file_id", errors)):
+            if records:
+                file_id = self.state.next_object_id("file")
+                content = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+                with self.state._lock:
+                    self.state.files[file_id] = ({"id": file_id, "object": "file", "bytes": len(content),
+                                                  "purpose": "batch_output"}, content)
+                batch[kind] = file_id
+        batch["request_counts"] = {"total": len(lines), "completed": len(outputs), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    # --- Yahoo Finance ---
+
+    def yahoo_quote(self, query, payload):
+        results = []
+        for symbol in query.get("symbols", "").split(","):
+            symbol = symbol.strip().upper()
+            if not symbol or not symbol.isalpha() or len(symbol) > 5:
+                continue
+            results.append({
+                "symbol": symbol,
+                "regularMarketPrice": _stock_price(symbol),
+                "dividendDate": 1700000000 + _seed(symbol) % 20000000,
+            })
+        return 200, {"quoteResponse": {"result": results, "error": None}}
+
+    def yahoo_chart(self, query, payload):
+        symbol = query["id"].upper()
+        timestamps, bars = _price_history(symbol, int(query.get("period1", 0)),
+                                          int(query.get("period2", time.time())))
+        return 200, {"chart": {"result": [{
+            "meta": {"symbol": symbol, "currency": "USD", "dataGranularity": query.get("interval", "1d")},
+            "timestamp": timestamps,
+            "indicators": {"quote": [bars]},
+        }], "error": None}}
+
+    # --- ipapi.co ---
+
+    def ipapi(self, query, payload):
+        return 200, {"ip": "127.0.0.1", "city": "Prague", "country_name": "Czechia", "country_code": "CZ"}
+
+    # --- OpenWeatherMap ---
+
+    def _openweather_unknown(self, location):
+        return any(character.isdigit() for character in location)
+
+    def openweather_current(self, query, payload):
+        location = query.get("q", "")
+        if self._openweather_unknown(location):
+            return 404, {"cod": "404", "message": "city not found"}
+        weather = _weather(location)
+        city, _, country = location.partition(",")
+        return 200, {
+            "name": city.strip().title(),
+            "sys": {"country": (country.strip() or "XX")[:2].upper()},
+            "main": {"temp": weather["temp"], "feels_like": weather["temp"] - 1.5,
+                     "humidity": weather["humidity"], "pressure": weather["pressure"]},
+            "weather": [{"description": weather["description"]}],
+            "wind": {"speed": weather["wind"]},
+            "dt": int(time.time()),
+        }
+
+    def openweather_forecast(self, query, payload):
+        location = query.get("q", "")
+        if self._openweather_unknown(location):
+            return 404, {"cod": "404", "message": "city not found"}
+        weather = _weather(location)
+        city, _, country = location.partition(",")
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        entries = []
+        for index in range(40):
+            entries.append({
+                "dt": int((start + timedelta(hours=3 * index)).timestamp()),
+                "main": {"temp": weather["temp"] + math.sin(index / 4) * 3,
+                         "feels_like": weather["temp"] - 1.5 + math.sin(index / 4) * 3,
+                         "humidity": weather["humidity"], "pressure": weather["pressure"]},
+                "weather": [{"description": weather["description"]}],
+                "wind": {"speed": weather["wind"]},
+                "dt_txt": (start + timedelta(hours=3 * index)).strftime("%Y-%m-%d %H:%M:%S"),
+            })
+        return 200, {
+            "cnt": len(entries),
+            "list": entries,
+            "city": {"name": city.strip().title(), "country": (country.strip() or "XX")[:2].upper()},
+        }
+
+    # --- Open-Meteo ---
+
+    def open_meteo_geocoding(self, query, payload):
+        name = query.get("name", "")
+        if not name or any(character.isdigit() for character in name):
+            return 200, {"generationtime_ms": 0.1}
+        seed = _seed(name)
+        return 200, {"results": [{
+            "name": name.title(),
+            "latitude": round(-60 + seed % 12000 / 100, 4),
+            "longitude": round(-180 + seed % 36000 / 100, 4),
+            "country": "Mockland",
+        }]}
+
+    def open_meteo_forecast(self, query, payload):
+        weather = _weather(f"{query.get('latitude')},{query.get('longitude')}")
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:00")
+        wind_factor = 1.0 if query.get("wind_speed_unit") == "ms" else 3.6
+        values = {
+            "time": now,
+            "temperature_2m": weather["temp"],
+            "apparent_temperature": weather["temp"] - 1.5,
+            "relative_humidity_2m": weather["humidity"],
+            "pressure_msl": float(weather["pressure"]),
+            "wind_speed_10m": round(weather["wind"] * wind_factor, 1),
+            "weather_code": (0, 1, 2, 3, 61, 3)[_seed(now) % 6],
+        }
+        # Like the real API, only the requested sections are returned
+        response = {}
+        if query.get("current"):
+            response["current"] = values
+        if query.get("hourly"):
+            start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+            hours = 24 * int(query.get("forecast_days") or 7)
+            times = [(start + timedelta(hours=index)).strftime("%Y-%m-%dT%H:%M") for index in range(hours)]
+            response["hourly"] = {"time": times}
+            for variable in query["hourly"].split(","):
+                if variable != "time":
+                    response["hourly"][variable] = [values.get(variable, 0)] * len(times)
+        return 200, response
+
+    # --- Tavily ---
+
+    def tavily_search(self, query, payload):
+        search_query = payload.get("query", "")
+        results = []
+        for index in range(min(int(payload.get("max_results") or 5), 5)):
+            results.append({
+                "title": f"Result {index + 1} for {search_query[:60]}",
+                "url": f"https://example.com/{_seed(search_query) % 10000}/{index}",
+                "content": f"Mock content about {search_query}. " * 12,
+                "score": round(0.95 - index * 0.1, 2),
+            })
+        return 200, {"query": search_query, "results": results, "response_time": 0.01}
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    """
+    Threading server with a listen backlog large enough for load tests.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def _parse_multipart(content_type, body):
+    """
+    Parse a multipart/form-data body into a dictionary of field name to bytes.
+
+    The file name of an uploaded file is stored under "<field>_name".
+    """
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body)
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        fields[name] = part.get_payload(decode=True)
+        filename = part.get_filename()
+        if filename:
+            fields[f"{name}_name"] = filename
+    return fields
+
+
+def start_mock_server(port=0, host="127.0.0.1", config=None):
+    """
+    Start the mock server in a background thread.
+
+    Args:
+        port (int): Port to listen on (0 picks a free port)
+        host (str): Interface to bind
+        config (dict, optional): Per-group endpoint behaviour, see MockState
+
+    Returns:
+        MockHTTPServer: Running server; server.state holds request counters
+    """
+    state = MockState(config)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = MockHTTPServer((host, port), handler)
+    server.state = state
+    threading.Thread(target=server.serve_forever, name="mock-server", daemon=True).start()
+    return server
+
+
+def mock_environment(server_or_url):
+    """
+    Environment variables pointing the agent at a mock server.
+
+    Args:
+        server_or_url: Running server or its base URL (e.g. "http://127.0.0.1:8900")
+
+    Returns:
+        dict: Environment variable overrides
+    """
+    if isinstance(server_or_url, str):
+        base_url = server_or_url.rstrip("/")
+    else:
+        host, port = server_or_url.server_address[:2]
+        base_url = f"http://{host}:{port}"
+    return {
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "OPENAI_API_KEY": "mock",
+        "YAHOO_BASE_URL": base_url,
+        "IPAPI_BASE_URL": base_url,
+        "OPENWEATHER_BASE_URL": base_url,
+        "OPENWEATHER_API_KEY": "mock",
+        "OPEN_METEO_BASE_URL": base_url,
+        "OPEN_METEO_GEOCODING_BASE_URL": base_url,
+        "TAVILY_BASE_URL": base_url,
+        "TAVILY_API_KEY": "mock",
+    }
+
+
+def main():
+    """
+    Run the mock server from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Local stand-in for all upstream APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_ENDPOINT_CONFIG["latency_ms"],
+                        help="median latency of every endpoint")
+    parser.add_argument("--latency-sigma", type=float, default=DEFAULT_ENDPOINT_CONFIG["latency_sigma"],
+                        help="log-normal sigma of the latency (0 for constant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second per endpoint group")
+    parser.add_argument("--config", help="JSON file with per-group overrides, e.g. {\"openai\": {\"latency_ms\": 800}}")
+    args = parser.parse_args()
+
+    config = {"*": {
+        "latency_ms": args.latency_ms,
+        "latency_sigma": args.latency_sigma,
+        "error_rate": args.error_rate,
+        "rate_limit": args.rate_limit,
+    }}
+    if args.config:
+        with open(args.config, encoding="utf-8") as config_file:
+            config.update(json.load(config_file))
+
+    server = start_mock_server(args.port, args.host, config)
+    print(f"Mock upstream server listening on http://{args.host}:{args.port}")
+    print("Point the agent at it with:")
+    for name, value in mock_environment(server).items():
+        print(f"  export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
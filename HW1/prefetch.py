@@ -0,0 +1,305 @@
+"""
+Speculative Tool Prefetch Module
+Starts likely tool calls while the first chat completion is still in flight.
+
+Many user messages make the next tool call obvious ("weather in London",
+"price of Apple (AAPL)"). predict_calls() extracts such calls locally with
+regular expressions, a ticker list and a small gazetteer; a Prefetcher runs
+them through the tool registry in the background. When the model asks for
+the same call, the prefetched result is used instead of starting the tool
+only then; results the model does not ask for are dropped. The registry
+cache still keeps them, so a later turn asking for them is served from it.
+
+Prefetching is enabled with AGENT_PREFETCH=1 (or per turn with the prefetch
+argument of main.get_completion_from_messages()). Hit rates are available
+from get_prefetch_stats() and the agent_prefetch_calls_total metric.
+"""
+
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from history import _as_dict
+from scheduler import caller_scope
+from tracing import current_span
+
+# Company names users write instead of ticker symbols
+KNOWN_TICKERS = {
+    "apple": "AAPL",
+    "microsoft": "MSFT",
+    "alphabet": "GOOGL",
+    "google": "GOOGL",
+    "amazon": "AMZN",
+    "meta": "META",
+    "facebook": "META",
+    "nvidia": "NVDA",
+    "tesla": "TSLA",
+    "netflix": "NFLX",
+    "intel": "INTC",
+    "amd": "AMD",
+    "ibm": "IBM",
+    "oracle": "ORCL",
+    "coca-cola": "KO",
+    "coca cola": "KO",
+    "pepsico": "PEP",
+    "johnson & johnson": "JNJ",
+    "procter & gamble": "PG",
+    "walmart": "WMT",
+    "disney": "DIS",
+    "mcdonald's": "MCD",
+    "visa": "V",
+    "mastercard": "MA",
+    "jpmorgan": "JPM",
+    "exxon": "XOM",
+    "chevron": "CVX",
+    "pfizer": "PFE",
+    "verizon": "VZ",
+    "at&t": "T",
+}
+
+# Cities recognised as weather locations, in the spelling passed to get_weather
+GAZETTEER = [
+    "Amsterdam", "Athens", "Auckland", "Bangkok", "Barcelona", "Beijing", "Berlin", "Boston",
+    "Brussels", "Budapest", "Buenos Aires", "Cairo", "Cape Town", "Chicago", "Copenhagen", "Delhi",
+    "Dubai", "Dublin", "Helsinki", "Hong Kong", "Istanbul", "Jakarta", "Lisbon", "London",
+    "Los Angeles", "Madrid", "Melbourne", "Mexico City", "Miami", "Milan", "Montreal", "Moscow",
+    "Mumbai", "Munich", "Nairobi", "New York", "Oslo", "Paris", "Prague", "Rome", "San Francisco",
+    "Seattle", "Seoul", "Shanghai", "Singapore", "Stockholm", "Sydney", "Tokyo", "Toronto",
+    "Vancouver", "Vienna", "Warsaw", "Zurich",
+]
+
+_TICKER_IN_PARENS = re.compile(r"\(([A-Z]{1,5}(?:\.[A-Z]{1,2})?)\)")
+_TICKER_WORD = re.compile(r"\b([A-Z]{2,5})\b")
+_COMPANY = re.compile(r"\b(" + "|".join(re.escape(name) for name in sorted(KNOWN_TICKERS, key=len, reverse=True))
+                      + r")\b", re.IGNORECASE)
+_CITY = re.compile(r"\b(" + "|".join(re.escape(city) for city in sorted(GAZETTEER, key=len, reverse=True))
+                   + r")\b", re.IGNORECASE)
+_CITY_SPELLING = {city.lower(): city for city in GAZETTEER}
+_KNOWN_SYMBOLS = set(KNOWN_TICKERS.values())
+
+_WEATHER_WORDS = ("weather", "temperature", "forecast", "rain", "sunny", "humid")
+_FORECAST_WORDS = ("forecast", "tomorrow", "this week", "next few days")
+_PRICE_WORDS = ("price", "stock", "share", "trading", "quote")
+_HISTORY_WORDS = ("trend", "history", "historical", "performance", "volatility", "drawdown", "moving average")
+_HISTORY_PERIODS = ("1mo", "3mo", "6mo", "1y", "2y", "5y")
+_HISTORY_PERIOD = re.compile(r"(?:last|past) (\d+ )?(months?|years?)")
+
+# Runs the speculative calls; sized for a handful of calls per turn across concurrent turns
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="prefetch")
+
+_stats = {"predicted": 0, "hits": 0, "wasted": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def prefetch_enabled():
+    """
+    Returns:
+        bool: True if AGENT_PREFETCH enables speculative tool calls
+    """
+    return os.environ.get("AGENT_PREFETCH", "").lower() in ("1", "true", "yes")
+
+
+def _ticker(text):
+    """
+    Find the ticker symbol a message is about.
+
+    Returns:
+        str: Ticker symbol, or None
+    """
+    match = _TICKER_IN_PARENS.search(text)
+    if match:
+        return match.group(1)
+    match = _COMPANY.search(text)
+    if match:
+        return KNOWN_TICKERS[match.group(1).lower()]
+    for word in _TICKER_WORD.findall(text):
+        if word in _KNOWN_SYMBOLS:
+            return word
+    return None
+
+
+def predict_calls(text):
+    """
+    Predict the tool calls a user message will lead to.
+
+    Only calls whose arguments can be derived reliably are predicted: weather
+    for a known city and stock price, price history or dividend date for a
+    known ticker.
+
+    Args:
+        text (str): User message
+
+    Returns:
+        list: (tool name, arguments) tuples
+    """
+    lowered = text.lower()
+    calls = []
+    if any(word in lowered for word in _WEATHER_WORDS):
+        city = _CITY.search(text)
+        if city:
+            arguments = {"location": _CITY_SPELLING[city.group(1).lower()]}
+            if any(word in lowered for word in _FORECAST_WORDS):
+                arguments["mode"] = "forecast"
+            calls.append(("get_weather", arguments))
+
+    ticker = _ticker(text)
+    if ticker:
+        if "dividend" in lowered:
+            calls.append(("get_dividend_date", {"ticker": ticker}))
+        elif any(word in lowered for word in _HISTORY_WORDS):
+            arguments = {"ticker": ticker}
+            period = _HISTORY_PERIOD.search(lowered)
+            if period:
+                unit = "mo" if period.group(2).startswith("month") else "y"
+                named = f"{(period.group(1) or '1').strip()}{unit}"
+                if named in _HISTORY_PERIODS:
+                    arguments["period"] = named
+            calls.append(("get_price_history", arguments))
+        elif any(word in lowered for word in _PRICE_WORDS):
+            calls.append(("get_stock_price", {"ticker": ticker}))
+    return calls
+
+
+def _last_user_message(messages):
+    # The history also holds the OpenAI message objects of assistant turns
+    for message in reversed(messages):
+        message = _as_dict(message)
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+
+def _record(outcome, tool, amount=1):
+    with _stats_lock:
+        _stats[outcome] += amount
+    if outcome != "predicted":
+        metrics.prefetch_calls.inc(amount, tool=tool, outcome=outcome)
+
+
+class Prefetcher:
+    """
+    Speculative tool calls of one agent turn.
+    """
+
+    def __init__(self, registry, max_calls=2):
+        """
+        Args:
+            registry (ToolRegistry): Registry the calls are dispatched through
+            max_calls (int): Maximum number of speculative calls per turn
+        """
+        self.registry = registry
+        self.max_calls = max_calls
+        self._pending = {}
+
+    def _key(self, name, arguments):
+        """
+        Build the matching key of a call, ignoring arguments left at their default.
+        """
+        registered = self.registry.get(name)
+        if registered is None:
+            return None
+        parameters = registered.signature.parameters
+        significant = {
+            key: value for key, value in arguments.items()
+            if key not in parameters or value != parameters[key].default
+        }
+        return registered.cache_key(significant)
+
+    def start(self, messages):
+        """
+        Start the calls predicted from the last user message.
+
+        The calls run in the current context, so they share the turn's deadline
+        and appear in its trace, but as bulk work: they use the tools' bulk
+        bulkheads and never take slots from interactive calls.
+
+        Args:
+            messages (list): Conversation including the new user message
+
+        Returns:
+            list: (tool name, arguments) tuples that were started
+        """
+        started = []
+        for name, arguments in predict_calls(_last_user_message(messages))[:self.max_calls]:
+            key = self._key(name, arguments)
+            if key is None or key in self._pending:
+                continue
+            context = contextvars.copy_context()
+            self._pending[key] = (name, _executor.submit(context.run, self._dispatch, name, arguments))
+            _record("predicted", name)
+            started.append((name, arguments))
+        current_span().set_attribute("prefetch.started", len(started))
+        return started
+
+    def _dispatch(self, name, arguments):
+        with caller_scope(priority="bulk"):
+            return self.registry.dispatch(name, arguments)
+
+    def take(self, name, arguments):
+        """
+        Get the prefetched result of a call the model asked for.
+
+        Waits for the speculative call if it is still running; that is never
+        slower than starting the same call now.
+
+        Args:
+            name (str): Tool name
+            arguments (dict): Call arguments from the model
+
+        Returns:
+            dict: Tool result, or None if the call was not prefetched (or failed)
+        """
+        entry = self._pending.pop(self._key(name, arguments), None)
+        if entry is None:
+            _record("misses", name)
+            return None
+        try:
+            result = entry[1].result()
+        except Exception:
+            _record("misses", name)
+            return None
+        if isinstance(result, dict) and "error" in result:
+            # E.g. rejected by a full bulk bulkhead; the turn makes the call itself
+            _record("misses", name)
+            return None
+        _record("hits", name)
+        current_span().set_attribute("prefetch.hit", True)
+        return result
+
+    def discard(self):
+        """
+        Drop the calls the model did not ask for; calls not yet started are cancelled.
+        """
+        for name, future in self._pending.values():
+            future.cancel()
+            _record("wasted", name)
+        self._pending.clear()
+
+
+def get_prefetch_stats():
+    """
+    Get the prefetch counters of this process.
+
+    Returns:
+        dict: Predicted, hit, wasted and missed calls, the hit rate (share of
+            predicted calls the model used) and the coverage (share of tool
+            calls served from a prefetch)
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    requested = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / stats["predicted"] if stats["predicted"] else 0.0
+    stats["coverage"] = stats["hits"] / requested if requested else 0.0
+    return stats
+
+
+def reset_prefetch_stats():
+    """
+    Reset the prefetch counters, e.g. between load levels.
+    """
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
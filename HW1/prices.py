@@ -0,0 +1,394 @@
+"""
+Price History Module
+Local columnar cache of daily OHLCV bars and the NumPy analytics behind get_price_history.
+
+Bars are stored per ticker as one raw little-endian file per column
+(<dir>/<TICKER>/close.<generation>.f8, ...) and read back as read-only
+memory maps: a summary touches only the columns it needs and nothing is
+parsed. meta.json holds the committed row count, the first day the data
+covers and the last day that was checked with the upstream API.
+
+- New sessions are appended to the column files; rows past the committed
+  count (left by an interrupted write) are cut off before the next append.
+- A request reaching further back than the cached data rewrites the
+  ticker under a new generation, so existing memory maps stay valid.
+- Only completed sessions are stored; the upstream API is asked at most
+  once per day and ticker.
+
+Writers hold a per-ticker file lock, so worker processes sharing the
+directory (AGENT_PRICE_CACHE_DIR, default .cache/prices) fetch each range once.
+This module imports NumPy and is only imported by the tool that needs it.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_PRICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "prices")
+
+# Column name -> (file suffix, dtype)
+COLUMNS = {
+    "timestamp": ("i8", np.dtype("<i8")),
+    "open": ("f8", np.dtype("<f8")),
+    "high": ("f8", np.dtype("<f8")),
+    "low": ("f8", np.dtype("<f8")),
+    "close": ("f8", np.dtype("<f8")),
+    "volume": ("f8", np.dtype("<f8")),
+}
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Largest relative change of an already cached close before the cached history is fetched again
+ADJUSTMENT_TOLERANCE = 0.005
+
+# Window lengths of the reported simple moving averages, in sessions
+SMA_WINDOWS = (20, 50, 200)
+
+_SYMBOL = re.compile(r"^[A-Z0-9.^=-]{1,12}$")
+_SECONDS_PER_DAY = 86400
+
+
+def day_timestamp(day):
+    """
+    Args:
+        day (date): Calendar day
+
+    Returns:
+        int: Unix timestamp of midnight UTC of the day
+    """
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def _day(timestamp):
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).date().isoformat()
+
+
+def normalize_bars(bars, before):
+    """
+    Turn fetched bars into sorted column arrays of completed sessions.
+
+    Timestamps are cut to midnight UTC of their session day; rows without a
+    close, duplicate days and sessions on or after `before` are dropped.
+
+    Args:
+        bars (dict): Column name to list of values (as returned by the fetch function)
+        before (date): First day that is not complete yet
+
+    Returns:
+        dict: Column name to NumPy array
+    """
+    timestamps = np.asarray(bars.get("timestamp") or [], dtype="<i8")
+    timestamps = timestamps - timestamps % _SECONDS_PER_DAY
+    columns = {"timestamp": timestamps}
+    for name in ("open", "high", "low", "close", "volume"):
+        values = bars.get(name) or []
+        columns[name] = np.array([np.nan if value is None else value for value in values], dtype="<f8") \
+            if len(values) else np.full(len(timestamps), np.nan)
+
+    keep = np.isfinite(columns["close"]) & (timestamps < day_timestamp(before))
+    order = np.argsort(timestamps[keep], kind="stable")
+    columns = {name: values[keep][order] for name, values in columns.items()}
+    if len(columns["timestamp"]):
+        first = np.concatenate(([True], np.diff(columns["timestamp"]) > 0))
+        columns = {name: values[first] for name, values in columns.items()}
+    return columns
+
+
+class PriceStore:
+    """
+    Per-ticker columnar bar files with memory-mapped reads and incremental appends.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Args:
+            directory (str, optional): Cache directory (default AGENT_PRICE_CACHE_DIR or DEFAULT_PRICE_DIR)
+        """
+        self.directory = directory or os.environ.get("AGENT_PRICE_CACHE_DIR") or DEFAULT_PRICE_DIR
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _ticker_dir(self, ticker):
+        symbol = ticker.strip().upper()
+        if not _SYMBOL.match(symbol):
+            raise ValueError(f"Invalid ticker symbol: {ticker!r}")
+        return os.path.join(self.directory, symbol)
+
+    def _column_path(self, ticker_dir, name, generation):
+        return os.path.join(ticker_dir, f"{name}.{generation}.{COLUMNS[name][0]}")
+
+    def meta(self, ticker):
+        """
+        Args:
+            ticker (str): Ticker symbol
+
+        Returns:
+            dict: generation, rows, covered_from and checked_through, or None if nothing is cached
+        """
+        try:
+            with open(os.path.join(self._ticker_dir(ticker), "meta.json"), encoding="utf-8") as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, ticker_dir, meta):
+        path = os.path.join(ticker_dir, "meta.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(f"{path}.tmp", path)
+
+    def read(self, ticker):
+        """
+        Map the cached columns of a ticker.
+
+        Args:
+            ticker (str): Ticker symbol
+
+        Returns:
+            dict: Column name to read-only array (memory-mapped), or None if nothing is cached
+        """
+        meta = self.meta(ticker)
+        if meta is None:
+            return None
+        ticker_dir = self._ticker_dir(ticker)
+        rows = meta["rows"]
+        columns = {}
+        for name, (_, dtype) in COLUMNS.items():
+            if rows:
+                columns[name] = np.memmap(self._column_path(ticker_dir, name, meta["generation"]),
+                                          dtype=dtype, mode="r", shape=(rows,))
+            else:
+                columns[name] = np.empty(0, dtype=dtype)
+        return columns
+
+    def locked(self, ticker):
+        """
+        Hold the write lock of a ticker (threads of this process and other processes).
+
+        Usage:
+            with store.locked("MSFT"):
+                ...
+
+        Args:
+            ticker (str): Ticker symbol
+
+        Returns:
+            context manager
+        """
+        return _TickerLock(self, self._ticker_dir(ticker))
+
+    def append(self, ticker, columns, checked_through):
+        """
+        Append sessions after the last cached one. Call with locked(ticker) held.
+
+        Args:
+            ticker (str): Ticker symbol
+            columns (dict): Column arrays from normalize_bars()
+            checked_through (date): Last day checked with the upstream API
+
+        Returns:
+            int: Number of rows appended
+        """
+        ticker_dir = self._ticker_dir(ticker)
+        meta = self.meta(ticker)
+        rows = meta["rows"]
+        generation = meta["generation"]
+        timestamps = columns["timestamp"]
+        if rows:
+            last = np.memmap(self._column_path(ticker_dir, "timestamp", generation), dtype="<i8", mode="r",
+                             shape=(rows,))[-1]
+            new = timestamps > last
+        else:
+            new = np.ones(len(timestamps), dtype=bool)
+        count = int(new.sum())
+        for name, (_, dtype) in COLUMNS.items():
+            with open(self._column_path(ticker_dir, name, generation), "r+b") as column_file:
+                # Cut off rows of an interrupted earlier append before writing
+                column_file.truncate(rows * dtype.itemsize)
+                column_file.seek(0, os.SEEK_END)
+                column_file.write(np.ascontiguousarray(columns[name][new], dtype=dtype).tobytes())
+        meta.update(rows=rows + count, checked_through=checked_through.isoformat())
+        self._write_meta(ticker_dir, meta)
+        return count
+
+    def replace(self, ticker, columns, covered_from, checked_through):
+        """
+        Store all sessions of a ticker under a new generation. Call with locked(ticker) held.
+
+        Args:
+            ticker (str): Ticker symbol
+            columns (dict): Column arrays from normalize_bars()
+            covered_from (date): First day the data covers
+            checked_through (date): Last day checked with the upstream API
+        """
+        ticker_dir = self._ticker_dir(ticker)
+        previous = self.meta(ticker)
+        generation = previous["generation"] + 1 if previous else 1
+        for name, (_, dtype) in COLUMNS.items():
+            with open(self._column_path(ticker_dir, name, generation), "wb") as column_file:
+                column_file.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        self._write_meta(ticker_dir, {
+            "generation": generation,
+            "rows": len(columns["timestamp"]),
+            "covered_from": covered_from.isoformat(),
+            "checked_through": checked_through.isoformat(),
+        })
+        if previous:
+            # Open memory maps of the old generation stay valid after unlinking
+            for name in COLUMNS:
+                try:
+                    os.unlink(self._column_path(ticker_dir, name, previous["generation"]))
+                except FileNotFoundError:
+                    pass
+
+
+class _TickerLock:
+    """
+    Thread lock plus exclusive flock on <ticker dir>/.lock.
+    """
+
+    def __init__(self, store, ticker_dir):
+        with store._locks_lock:
+            self._thread_lock = store._locks.setdefault(ticker_dir, threading.Lock())
+        self._ticker_dir = ticker_dir
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            os.makedirs(self._ticker_dir, exist_ok=True)
+            self._file = open(os.path.join(self._ticker_dir, ".lock"), "a")
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        finally:
+            self._thread_lock.release()
+        return False
+
+
+def load_history(store, ticker, start, today, fetch):
+    """
+    Get the cached bars of a ticker, fetching only what is missing.
+
+    The incremental fetch starts at the last cached session. If the upstream
+    close of that session no longer matches the cached one (a split or
+    dividend changed the adjusted prices), the whole range is fetched again.
+
+    Args:
+        store (PriceStore): Bar cache
+        ticker (str): Ticker symbol
+        start (date): First day that has to be covered
+        today (date): Current day (UTC); its session is not complete yet
+        fetch (callable): Function(ticker, start date, end date) returning bars as a
+            dictionary of column lists for the days start <= day < end
+
+    Returns:
+        tuple: (column arrays from PriceStore.read(), number of fetched sessions)
+    """
+    with store.locked(ticker):
+        meta = store.meta(ticker)
+        if meta is not None and start >= date.fromisoformat(meta["covered_from"]):
+            if date.fromisoformat(meta["checked_through"]) >= today:
+                return store.read(ticker), 0
+            cached = store.read(ticker)
+            if not len(cached["timestamp"]):
+                columns = normalize_bars(fetch(ticker, start, today), before=today)
+                appended = store.append(ticker, columns, checked_through=today)
+                return store.read(ticker), appended
+            last_day = date.fromisoformat(_day(cached["timestamp"][-1]))
+            columns = normalize_bars(fetch(ticker, last_day, today), before=today)
+            overlap = columns["timestamp"][:1] == cached["timestamp"][-1]
+            if not overlap.any() or abs(columns["close"][0] / cached["close"][-1] - 1.0) <= ADJUSTMENT_TOLERANCE:
+                appended = store.append(ticker, columns, checked_through=today)
+                return store.read(ticker), appended
+            start = date.fromisoformat(meta["covered_from"])
+
+        columns = normalize_bars(fetch(ticker, start, today), before=today)
+        store.replace(ticker, columns, covered_from=start, checked_through=today)
+        return store.read(ticker), len(columns["timestamp"])
+
+
+def summarize(columns, start):
+    """
+    Summarize the sessions from a start day on.
+
+    Moving averages describe the latest session and use all cached sessions,
+    so they are available for short periods as well.
+
+    Args:
+        columns (dict): Column arrays from PriceStore.read()
+        start (date): First day of the period
+
+    Returns:
+        dict: Period return, volatility, drawdown, moving averages, range and volume,
+            or None if the period has fewer than two sessions
+    """
+    first = int(np.searchsorted(columns["timestamp"], day_timestamp(start)))
+    timestamps = np.asarray(columns["timestamp"][first:])
+    close = np.asarray(columns["close"][first:])
+    if len(close) < 2:
+        return None
+    high = np.asarray(columns["high"][first:])
+    low = np.asarray(columns["low"][first:])
+    volume = np.asarray(columns["volume"][first:])
+    high = np.where(np.isfinite(high), high, close)
+    low = np.where(np.isfinite(low), low, close)
+
+    returns = np.diff(close) / close[:-1]
+    running_peak = np.maximum.accumulate(close)
+    drawdowns = close / running_peak - 1.0
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(close[:trough + 1]))
+    best, worst = int(np.argmax(returns)), int(np.argmin(returns))
+    highest, lowest = int(np.argmax(high)), int(np.argmin(low))
+
+    def percent(value):
+        return round(float(value) * 100, 2)
+
+    moving_averages = {}
+    history = columns["close"]
+    for window in SMA_WINDOWS:
+        if len(history) >= window:
+            moving_averages[f"sma_{window}"] = round(float(np.mean(history[-window:])), 2)
+    last = float(close[-1])
+
+    summary = {
+        "start": _day(timestamps[0]),
+        "end": _day(timestamps[-1]),
+        "sessions": len(close),
+        "first_close": round(float(close[0]), 2),
+        "last_close": round(last, 2),
+        "period_return_pct": percent(last / close[0] - 1.0),
+        "annualized_volatility_pct": percent(returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)),
+        "max_drawdown_pct": percent(drawdowns[trough]),
+        "max_drawdown_period": [_day(timestamps[peak]), _day(timestamps[trough])],
+        "high": {"price": round(float(high[highest]), 2), "date": _day(timestamps[highest])},
+        "low": {"price": round(float(low[lowest]), 2), "date": _day(timestamps[lowest])},
+        "best_day": {"return_pct": percent(returns[best]), "date": _day(timestamps[best + 1])},
+        "worst_day": {"return_pct": percent(returns[worst]), "date": _day(timestamps[worst + 1])},
+        "moving_averages": moving_averages,
+    }
+    if "sma_50" in moving_averages:
+        summary["last_close_vs_sma_50_pct"] = percent(last / moving_averages["sma_50"] - 1.0)
+    finite_volume = volume[np.isfinite(volume)]
+    if len(finite_volume):
+        summary["average_daily_volume"] = int(finite_volume.mean())
+    return summary
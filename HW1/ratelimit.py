@@ -0,0 +1,239 @@
+"""
+Rate Limiter Module
+Token-bucket rate limiting for the upstream APIs used by the tools.
+
+Each provider has its own bucket. By default buckets live in process memory;
+setting RATE_LIMIT_DIR switches to file-backed buckets guarded by an exclusive
+file lock, so all worker processes on a host share one quota.
+
+RATE_LIMIT_<PROVIDER>="rate:burst" overrides the limits of a provider;
+RATE_LIMIT_<PROVIDER>=0 disables its limit.
+"""
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Default limits per provider: sustained rate (requests per second) and burst size
+PROVIDER_LIMITS = {
+    "yahoo": {"rate": 2.0, "burst": 5},
+    # free tier: 1000 requests/day. A token takes 86 s to refill, so calls beyond the
+    # burst fail at once instead of waiting; the burst covers a busy minute
+    "ipapi": {"rate": 1000 / 86400, "burst": 50},
+    "openweathermap": {"rate": 1.0, "burst": 10},  # free tier: 60 calls/minute
+    "open_meteo": {"rate": 10.0, "burst": 10},  # 600 calls/minute
+    "tavily": {"rate": 1.5, "burst": 5},  # 100 requests/minute
+    "warmup": {"rate": 1.0, "burst": 2},  # cache refresh-ahead budget (warmup.py)
+    "openai_tokens": {"rate": 30000 / 60, "burst": 30000},  # tokens per minute (scheduler.py, AGENT_TPM_BUDGET=1)
+}
+
+# Longest time a tool waits for a token before giving up
+DEFAULT_MAX_WAIT = 2.0
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no token becomes available within the allowed wait time."""
+
+    def __init__(self, provider):
+        super().__init__(f"Rate limit exceeded for {provider}, try again later")
+        self.provider = provider
+
+
+class TokenBucket:
+    """
+    Thread-safe in-process token bucket.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): Tokens added per second
+            burst (int): Bucket capacity
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1.0):
+        """
+        Take tokens if available.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+
+class UnlimitedBucket:
+    """
+    Bucket of a provider whose limit is disabled; every request is granted.
+    """
+
+    rate = float("inf")
+    burst = float("inf")
+
+    def try_acquire(self, tokens=1.0):
+        """
+        Returns:
+            float: Always 0
+        """
+        return 0.0
+
+
+class FileTokenBucket:
+    """
+    Token bucket whose state is stored in a file shared by all processes.
+
+    The state ("tokens timestamp") is read and written under an exclusive
+    flock, so concurrent workers draw from the same budget.
+    """
+
+    def __init__(self, rate, burst, path):
+        """
+        Args:
+            rate (float): Tokens added per second
+            burst (int): Bucket capacity
+            path (str): Path of the shared state file
+        """
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1.0):
+        """
+        Take tokens if available.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        with self._lock, open(self.path, "a+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                content = state_file.read().split()
+                now = time.time()
+                if len(content) == 2:
+                    available = min(self.burst, float(content[0]) + (now - float(content[1])) * self.rate)
+                else:
+                    available = self.burst
+
+                wait = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / self.rate
+
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(f"{available} {now}")
+                state_file.flush()
+                return wait
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _provider_limits(provider):
+    """
+    Get the limits of a provider, applying a RATE_LIMIT_<PROVIDER>="rate:burst" override.
+
+    Returns:
+        dict: Rate and burst, or None if the limit is disabled (rate 0)
+
+    Raises:
+        ValueError: If the override is not a non-negative rate and a burst of at least 1
+    """
+    limits = dict(PROVIDER_LIMITS.get(provider, {"rate": 1.0, "burst": 1}))
+    name = f"RATE_LIMIT_{provider.upper()}"
+    override = os.environ.get(name)
+    if override:
+        rate, _, burst = override.partition(":")
+        try:
+            limits["rate"] = float(rate)
+            if burst:
+                limits["burst"] = float(burst)
+        except ValueError:
+            raise ValueError(f"Invalid {name}={override!r}, expected \"rate:burst\"") from None
+        if limits["rate"] == 0:
+            return None
+        if limits["rate"] < 0 or limits["burst"] < 1:
+            raise ValueError(f"Invalid {name}={override!r}: the rate must be positive (0 disables the limit) "
+                             f"and the burst at least 1")
+    return limits
+
+
+def get_bucket(provider):
+    """
+    Get (and create on first use) the token bucket of a provider.
+
+    Args:
+        provider (str): Provider name, e.g. "yahoo" or "tavily"
+
+    Returns:
+        TokenBucket, FileTokenBucket or UnlimitedBucket: Bucket for the provider
+    """
+    bucket = _buckets.get(provider)
+    if bucket is not None:
+        return bucket
+
+    with _buckets_lock:
+        if provider not in _buckets:
+            limits = _provider_limits(provider)
+            shared_dir = os.environ.get("RATE_LIMIT_DIR")
+            if limits is None:
+                _buckets[provider] = UnlimitedBucket()
+            elif shared_dir and fcntl is not None:
+                os.makedirs(shared_dir, exist_ok=True)
+                path = os.path.join(shared_dir, f"{provider}.bucket")
+                _buckets[provider] = FileTokenBucket(limits["rate"], limits["burst"], path)
+            else:
+                if shared_dir:
+                    print("File locking is not available, using in-process rate limiting")
+                _buckets[provider] = TokenBucket(limits["rate"], limits["burst"])
+        return _buckets[provider]
+
+
+def acquire(provider, max_wait=DEFAULT_MAX_WAIT):
+    """
+    Wait for a request token of a provider.
+
+    Args:
+        provider (str): Provider name
+        max_wait (float): Longest time to wait in seconds
+
+    Returns:
+        bool: True if a token was acquired, False if the wait would be too long
+    """
+    bucket = get_bucket(provider)
+    give_up_at = time.monotonic() + max_wait
+    while True:
+        wait = bucket.try_acquire()
+        if wait == 0:
+            return True
+        if time.monotonic() + wait > give_up_at:
+            return False
+        time.sleep(wait)
@@ -0,0 +1,232 @@
+"""
+Record/Replay Module
+Captures upstream request/response pairs to cassette files and serves them
+from disk, so tests and benchmarks can run offline and deterministically.
+
+The mode is chosen with AGENT_CASSETTE_MODE:
+- "off" (default): calls go to the real APIs
+- "record": calls go to the real APIs and every interaction is saved
+- "replay": interactions are served from the cassettes; nothing leaves the host
+
+Cassettes are JSON Lines files, one per provider, in AGENT_CASSETTE_DIR;
+each recorded interaction is appended as one line. Replayed calls wait for
+the recorded latency multiplied by AGENT_CASSETTE_LATENCY_SCALE (0 replays
+instantly), so benchmarks keep the real latency profile, but never past the
+request deadline.
+"""
+
+import json
+import os
+import threading
+import time
+
+from deadline import DeadlineExceeded, remaining_timeout
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# Request parameters that must never be written to a cassette
+SECRET_PARAMS = {"appid", "api_key", "apikey", "key", "token"}
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when no recorded interaction matches a request."""
+
+
+class RecordedResponse:
+    """
+    Minimal stand-in for requests.Response built from a recorded interaction.
+    """
+
+    def __init__(self, status_code, text, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def encode_http_response(response):
+    """
+    Encode a requests.Response for a cassette.
+    """
+    return {
+        "status_code": response.status_code,
+        "text": response.text,
+        "headers": {"content-type": response.headers.get("content-type", "")},
+    }
+
+
+def decode_http_response(recorded):
+    """
+    Rebuild a response object from a cassette entry.
+    """
+    return RecordedResponse(recorded["status_code"], recorded["text"], recorded.get("headers"))
+
+
+def _request_key(provider, request):
+    return provider + ":" + json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class Cassette:
+    """
+    Set of recorded interactions stored in a directory, one file per provider.
+    """
+
+    def __init__(self, directory, mode=MODE_OFF, latency_scale=1.0):
+        """
+        Args:
+            directory (str): Directory holding the cassette files
+            mode (str): "off", "record" or "replay"
+            latency_scale (float): Multiplier for replayed latencies
+        """
+        self.directory = directory
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._providers = {}
+        self._index = {}
+        self._positions = {}
+
+    def _load(self, provider):
+        interactions = self._providers.get(provider)
+        if interactions is None:
+            path = os.path.join(self.directory, f"{provider}.jsonl")
+            legacy_path = os.path.join(self.directory, f"{provider}.json")
+            interactions = []
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as cassette_file:
+                    interactions = [json.loads(line) for line in cassette_file if line.strip()]
+            elif os.path.exists(legacy_path):
+                # Cassettes recorded before the switch to JSON Lines
+                with open(legacy_path, encoding="utf-8") as cassette_file:
+                    interactions = json.load(cassette_file)
+            self._providers[provider] = interactions
+            for entry in interactions:
+                self._index.setdefault(entry["key"], []).append(entry)
+        return interactions
+
+    def _append(self, provider, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{provider}.jsonl")
+        if not os.path.exists(path) and len(self._providers[provider]) > 1:
+            # First line of the file: write what was loaded from a legacy cassette first
+            entries = self._providers[provider][:-1]
+        else:
+            entries = []
+        with open(path, "a", encoding="utf-8") as cassette_file:
+            for item in entries + [entry]:
+                cassette_file.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+
+    def call(self, provider, request, perform, encode=None, decode=None):
+        """
+        Perform, record or replay an upstream call depending on the mode.
+
+        Args:
+            provider (str): Provider name, also the cassette file name
+            request (dict): JSON-serializable description of the request (the match key)
+            perform (callable): Function doing the real call
+            encode (callable, optional): Converts the real result to JSON-serializable data
+            decode (callable, optional): Converts recorded data back to the result type
+
+        Returns:
+            Result of the real or replayed call
+
+        Raises:
+            CassetteMiss: In replay mode, if the request was never recorded
+            DeadlineExceeded: In replay mode, if the recorded latency runs past the request deadline
+        """
+        if self.mode == MODE_OFF:
+            return perform()
+
+        key = _request_key(provider, request)
+        if self.mode == MODE_REPLAY:
+            with self._lock:
+                self._load(provider)
+                matches = self._index.get(key)
+                if not matches:
+                    raise CassetteMiss(f"No recorded {provider} interaction for {key}")
+                # Repeated identical requests replay their recordings in order, then cycle
+                position = self._positions.get(key, 0)
+                self._positions[key] = position + 1
+                entry = matches[position % len(matches)]
+            if self.latency_scale > 0:
+                delay = entry["latency"] * self.latency_scale
+                wait = remaining_timeout(delay)
+                time.sleep(wait)
+                if wait < delay:
+                    # The real call would have timed out at the deadline too
+                    raise DeadlineExceeded(f"Replayed {provider} call ran past the request deadline")
+            return decode(entry["response"]) if decode else entry["response"]
+
+        started = time.perf_counter()
+        result = perform()
+        latency = time.perf_counter() - started
+        entry = {
+            "key": key,
+            "request": request,
+            "response": encode(result) if encode else result,
+            "latency": round(latency, 4),
+        }
+        with self._lock:
+            self._load(provider).append(entry)
+            self._index.setdefault(key, []).append(entry)
+            self._append(provider, entry)
+        return result
+
+
+def redact(params):
+    """
+    Drop secret query parameters before a request is used as a cassette key.
+
+    Args:
+        params (dict): Query parameters
+
+    Returns:
+        dict: Parameters without API keys
+    """
+    return {key: value for key, value in (params or {}).items() if key.lower() not in SECRET_PARAMS}
+
+
+cassette = Cassette(
+    os.environ.get("AGENT_CASSETTE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes")),
+    os.environ.get("AGENT_CASSETTE_MODE", MODE_OFF),
+    float(os.environ.get("AGENT_CASSETTE_LATENCY_SCALE", "1.0")),
+)
+
+
+def configure(mode, directory=None, latency_scale=None):
+    """
+    Change the record/replay mode at runtime.
+
+    Args:
+        mode (str): "off", "record" or "replay"
+        directory (str, optional): Cassette directory
+        latency_scale (float, optional): Multiplier for replayed latencies
+    """
+    global cassette
+    cassette = Cassette(
+        directory or cassette.directory,
+        mode,
+        cassette.latency_scale if latency_scale is None else latency_scale,
+    )
+
+
+def replaying():
+    """
+    Returns:
+        bool: True if upstream calls are served from cassettes
+    """
+    return cassette.mode == MODE_REPLAY
+
+
+def call(provider, request, perform, encode=None, decode=None):
+    """
+    Perform, record or replay an upstream call using the active cassette.
+
+    See Cassette.call for the arguments.
+    """
+    return cassette.call(provider, request, perform, encode, decode)
@@ -0,0 +1,378 @@
+"""
+Tool Registry Module
+Declarative registration of tool functions.
+
+The @tool decorator builds the OpenAI function schema from the type hints and
+docstring of a function once, at registration, together with its execution
+policy (cache TTL, timeout, bulkhead limits). The schema list and the
+dispatch table are both generated from the registry, so a new tool is added
+in one place.
+"""
+
+import inspect
+import re
+import time
+import types
+import typing
+
+import metrics
+from bulkhead import Bulkhead, BulkheadFull, bulkhead_limits
+from cache import create_cache
+from codec import dumps as canonical_json
+from deadline import DeadlineExceeded, deadline_scope
+from scheduler import current_caller, get_scheduler
+from tracing import span
+
+# JSON schema types of the supported parameter annotations
+JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+}
+
+_ARG_LINE = re.compile(r"^(\w+)\s*(?:\([^)]*\))?\s*:\s*(.*)$")
+
+
+def parse_docstring(docstring):
+    """
+    Split a Google-style docstring into its summary and argument descriptions.
+
+    Args:
+        docstring (str): Function docstring
+
+    Returns:
+        tuple: (summary paragraph, dict of argument name to description)
+    """
+    lines = inspect.cleandoc(docstring or "").splitlines()
+    summary = []
+    for line in lines:
+        if not line.strip() or line.strip().endswith(":"):
+            break
+        summary.append(line.strip())
+
+    arguments = {}
+    in_args = False
+    current = None
+    for line in lines:
+        stripped = line.strip()
+        if stripped == "Args:":
+            in_args = True
+            continue
+        if not in_args:
+            continue
+        if not line.startswith(" ") and stripped:
+            # Next section (Returns:, Raises:, ...)
+            break
+        match = _ARG_LINE.match(stripped)
+        indent = len(line) - len(line.lstrip())
+        if match and (current is None or indent <= arguments[current][0]):
+            current = match.group(1)
+            arguments[current] = (indent, match.group(2).strip())
+        elif current and stripped:
+            arguments[current] = (arguments[current][0], f"{arguments[current][1]} {stripped}")
+
+    return " ".join(summary), {name: text for name, (_, text) in arguments.items()}
+
+
+def _parameter_schema(annotation):
+    """
+    Build the JSON schema of a parameter from its type annotation.
+
+    Returns:
+        tuple: (schema dict, True if the annotation allows None)
+    """
+    optional = False
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union or origin is types.UnionType:
+        members = [member for member in typing.get_args(annotation) if member is not type(None)]
+        optional = len(members) < len(typing.get_args(annotation))
+        annotation = members[0] if len(members) == 1 else str
+        origin = typing.get_origin(annotation)
+
+    if origin is typing.Literal:
+        values = list(typing.get_args(annotation))
+        return {"type": JSON_TYPES.get(type(values[0]), "string"), "enum": values}, optional
+    return {"type": JSON_TYPES.get(origin or annotation, "string")}, optional
+
+
+def build_schema(function, description=None):
+    """
+    Build the OpenAI function-calling schema of a function.
+
+    The description is the first paragraph of the docstring and parameter
+    descriptions come from its Args section. Parameters without a default
+    value are required.
+
+    Args:
+        function (callable): Tool function with type hints
+        description (str, optional): Override for the tool description
+
+    Returns:
+        dict: Tool schema
+    """
+    summary, argument_docs = parse_docstring(function.__doc__)
+    hints = typing.get_type_hints(function)
+    properties = {}
+    required = []
+    for name, parameter in inspect.signature(function).parameters.items():
+        schema, optional = _parameter_schema(hints.get(name, str))
+        if argument_docs.get(name):
+            schema["description"] = argument_docs[name]
+        properties[name] = schema
+        if parameter.default is inspect.Parameter.empty and not optional:
+            required.append(name)
+
+    return {
+        "type": "function",
+        "function": {
+            "name": function.__name__,
+            "description": description or summary,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+            },
+        },
+    }
+
+
+class Tool:
+    """
+    A registered tool: function, precomputed schema and execution policy.
+    """
+
+    def __init__(self, function, schema, cache_ttl=0, timeout=None, max_concurrency=None, max_queue=None):
+        """
+        Args:
+            function (callable): Tool function
+            schema (dict): OpenAI function schema
+            cache_ttl (float): Seconds to cache successful results (0 disables caching)
+            timeout (float, optional): Time budget of a single call in seconds
+            max_concurrency (int, optional): Maximum number of simultaneous calls
+            max_queue (int, optional): Maximum number of calls waiting for a slot
+                (default max_concurrency); further calls are rejected
+
+        Bulk work (cache warm-up, speculative prefetch, bulk tenants) gets a
+        separate bulkhead with half the limits, so it can never take the slots
+        of interactive calls.
+        """
+        self.name = function.__name__
+        self.function = function
+        self.schema = schema
+        self.schema_bytes = canonical_json(schema).encode("utf-8")
+        self.signature = inspect.signature(function)
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.bulkhead = None
+        self.bulk_bulkhead = None
+        if max_concurrency:
+            max_concurrency, max_queue = bulkhead_limits(
+                self.name, max_concurrency, max_concurrency if max_queue is None else max_queue)
+            self.bulkhead = Bulkhead(self.name, max_concurrency, max_queue)
+            self.bulk_bulkhead = Bulkhead(f"{self.name} (bulk)", max(max_concurrency // 2, 1), max_queue // 2)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+
+    def cache_key(self, arguments):
+        """
+        Build the cache key of a call.
+
+        Args:
+            arguments (dict): Call arguments
+
+        Returns:
+            str: Key made of the tool name and the canonical arguments
+        """
+        return f"{self.name}:{canonical_json(arguments)}"
+
+
+class ToolRegistry:
+    """
+    Registry of tools with schema generation and policy-aware dispatch.
+    """
+
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache (optional): Result cache with get(key) and set(key, value, ttl);
+                defaults to the backend selected by AGENT_CACHE_BACKEND
+        """
+        self._tools = {}
+        self._observers = []
+        self.cache = cache if cache is not None else create_cache()
+
+    def register(self, function, description=None, cache_ttl=0, timeout=None, max_concurrency=None, max_queue=None):
+        """
+        Register a tool function.
+
+        Args:
+            function (callable): Tool function with type hints and a docstring
+            description (str, optional): Override for the tool description
+            cache_ttl (float): Seconds to cache successful results (0 disables caching)
+            timeout (float, optional): Time budget of a single call in seconds
+            max_concurrency (int, optional): Maximum number of simultaneous calls
+            max_queue (int, optional): Maximum number of calls waiting for a slot (default max_concurrency)
+
+        Returns:
+            Tool: Registered tool
+        """
+        schema = build_schema(function, description)
+        registered = Tool(function, schema, cache_ttl, timeout, max_concurrency, max_queue)
+        self._tools[registered.name] = registered
+        return registered
+
+    def tool(self, description=None, cache_ttl=0, timeout=None, max_concurrency=None, max_queue=None):
+        """
+        Decorator registering a tool function; the function itself is returned unchanged.
+
+        Args:
+            description (str, optional): Override for the tool description
+            cache_ttl (float): Seconds to cache successful results (0 disables caching)
+            timeout (float, optional): Time budget of a single call in seconds
+            max_concurrency (int, optional): Maximum number of simultaneous calls
+            max_queue (int, optional): Maximum number of calls waiting for a slot (default max_concurrency)
+
+        Returns:
+            callable: Decorator
+        """
+        def decorator(function):
+            self.register(function, description, cache_ttl, timeout, max_concurrency, max_queue)
+            return function
+        return decorator
+
+    def get(self, name):
+        """
+        Args:
+            name (str): Tool name
+
+        Returns:
+            Tool: Registered tool, or None
+        """
+        return self._tools.get(name)
+
+    def schemas(self):
+        """
+        Returns:
+            list: Tool schemas sorted by name
+        """
+        return [self._tools[name].schema for name in sorted(self._tools)]
+
+    def schemas_json(self):
+        """
+        Returns:
+            bytes: Canonical JSON of the schema list, assembled from the precomputed schema bytes
+        """
+        return b"[" + b",".join(self._tools[name].schema_bytes for name in sorted(self._tools)) + b"]"
+
+    def add_observer(self, observer):
+        """
+        Register a callback for the calls of cached tools, e.g. to track popular arguments.
+
+        Args:
+            observer (callable): Function(name, arguments, cache_hit) called on every
+                dispatch of a tool with a cache_ttl, except refreshes
+        """
+        self._observers.append(observer)
+
+    def bulkhead_stats(self):
+        """
+        Returns:
+            dict: Tool name to Bulkhead.stats() for the tools with a concurrency limit,
+                with the stats of the bulk bulkhead under "bulk"
+        """
+        return {name: dict(registered.bulkhead.stats(), bulk=registered.bulk_bulkhead.stats())
+                for name, registered in sorted(self._tools.items()) if registered.bulkhead is not None}
+
+    def functions(self):
+        """
+        Returns:
+            dict: Tool name to function
+        """
+        return {name: registered.function for name, registered in self._tools.items()}
+
+    def dispatch(self, name, arguments, refresh=False):
+        """
+        Call a tool by name, applying its cache, timeout and concurrency policy.
+
+        Calls that miss the cache enter the tool's bulkhead first (the bulk
+        bulkhead for refreshes and bulk callers) and then wait for a slot in
+        the fair tool scheduler (see scheduler.py).
+
+        Args:
+            name (str): Tool name
+            arguments (dict): Call arguments
+            refresh (bool): Skip the cache lookup and store a fresh result (see warmup.py)
+
+        Returns:
+            dict: Tool result, or a dictionary with an "error" key
+        """
+        registered = self._tools.get(name)
+        if registered is None:
+            return {"error": f"Unknown tool: {name}"}
+        try:
+            registered.signature.bind(**arguments)
+        except TypeError as e:
+            return {"error": f"Invalid arguments for {name}: {str(e)}"}
+
+        started = time.perf_counter()
+        with span("tool.dispatch", **{"tool.name": name}) as current:
+            key = None
+            if registered.cache_ttl:
+                key = registered.cache_key(arguments)
+                cached = None if refresh else self.cache.get(key)
+                current.set_attribute("cache.hit", cached is not None)
+                if not refresh:
+                    for observer in self._observers:
+                        observer(name, arguments, cached is not None)
+                if cached is not None:
+                    metrics.tool_calls.inc(tool=name, outcome="cache_hit")
+                    metrics.tool_latency.observe(time.perf_counter() - started, tool=name)
+                    return cached
+
+            bulkhead = registered.bulkhead
+            if bulkhead is not None and (refresh or current_caller()[1] == "bulk"):
+                bulkhead = registered.bulk_bulkhead
+            if bulkhead is not None:
+                try:
+                    waited = bulkhead.acquire()
+                except BulkheadFull as e:
+                    current.set_attribute("bulkhead.rejected", e.reason)
+                    metrics.tool_calls.inc(tool=name, outcome="rejected")
+                    metrics.tool_latency.observe(time.perf_counter() - started, tool=name)
+                    return {"error": str(e)}
+                current.set_attribute("bulkhead.wait_ms", round(waited * 1000, 1))
+            try:
+                # Calls held back by a full bulkhead must not occupy scheduler slots
+                scheduler = get_scheduler("tool")
+                try:
+                    waited = scheduler.acquire()
+                except DeadlineExceeded:
+                    current.set_attribute("scheduler.rejected", True)
+                    metrics.tool_calls.inc(tool=name, outcome="rejected")
+                    metrics.tool_latency.observe(time.perf_counter() - started, tool=name)
+                    return {"error": f"Request deadline exceeded before {name} could run"}
+                current.set_attribute("scheduler.wait_ms", round(waited * 1000, 1))
+                try:
+                    with deadline_scope(registered.timeout):
+                        result = registered.function(**arguments)
+                finally:
+                    scheduler.release()
+            finally:
+                if bulkhead is not None:
+                    bulkhead.release()
+
+            failed = isinstance(result, dict) and "error" in result
+            current.set_attribute("tool.error", failed)
+            metrics.tool_calls.inc(tool=name, outcome="error" if failed else "refresh" if refresh else "ok")
+            metrics.tool_latency.observe(time.perf_counter() - started, tool=name)
+            if key is not None and not failed:
+                self.cache.set(key, result, registered.cache_ttl)
+            return result
+
+
+# Registry shared by all tools in tools.py
+registry = ToolRegistry()
+tool = registry.tool
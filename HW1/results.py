@@ -0,0 +1,324 @@
+"""
+Result Records Module
+Compact, typed tool results that are formatted only when serialized.
+
+The tools used to build dictionaries for every call, the weather tool
+with preformatted strings ("21.3°C", "65%") for each of the 40 entries of
+a forecast. Records keep the raw values in __slots__ attributes instead;
+codec.py calls to_json() when a result is written into the conversation,
+so the formatting happens only at the serialization boundary, and only once
+per result: a cached record served again reuses its encoded JSON. Cached
+results stay small objects. Error results remain plain {"error": ...}
+dictionaries.
+
+Records are read-only mappings of their JSON form, so code that reads a
+result like a dictionary (result["temperature"], "error" in result) keeps
+working; that path formats on every access and is meant for tests and
+tooling, not the dispatch path.
+
+Caches that keep results outside the process (cache.SQLiteCache) store the
+raw fields with to_state() and rebuild the record with from_state(), so a
+result read back from any cache backend is the same type it was stored as.
+"""
+
+from collections.abc import Mapping
+
+# Record classes by name, for from_state()
+_RECORD_TYPES = {}
+
+# Key naming the record class in a stored state
+STATE_TYPE_KEY = "__record__"
+
+
+class Record(Mapping):
+    """
+    Base class of result records. Subclasses define __slots__ and to_json().
+
+    Records must not be changed after construction: codec.dumps() keeps the
+    encoded JSON in _encoded and returns it for every later call.
+    """
+
+    __slots__ = ("_encoded",)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _RECORD_TYPES[cls.__name__] = cls
+
+    def to_json(self):
+        """
+        Returns:
+            dict: JSON form of the record, with formatted values
+        """
+        raise NotImplementedError
+
+    def to_state(self):
+        """
+        Returns:
+            dict: JSON-serializable raw fields of the record, tagged with its
+                class, for from_state()
+        """
+        state = {STATE_TYPE_KEY: type(self).__name__}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            state[name] = [item.to_state() if isinstance(item, Record) else item for item in value] \
+                if isinstance(value, list) else value
+        return state
+
+    def __getitem__(self, key):
+        return self.to_json()[key]
+
+    def __iter__(self):
+        return iter(self.to_json())
+
+    def __len__(self):
+        return len(self.to_json())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_json()!r})"
+
+
+class CurrentWeather(Record):
+    """
+    Current conditions at a location.
+    """
+
+    __slots__ = ("location", "temperature", "feels_like", "humidity", "description", "wind_speed", "wind_unit",
+                 "pressure", "observed_at", "source")
+
+    def __init__(self, location, temperature, feels_like, humidity, description, wind_speed, wind_unit, pressure,
+                 observed_at, source):
+        """
+        Args:
+            location (str): Location name
+            temperature (float): Temperature in °C
+            feels_like (float): Apparent temperature in °C
+            humidity (int): Relative humidity in %
+            description (str): Weather description
+            wind_speed (float): Wind speed in wind_unit
+            wind_unit (str): Unit of the wind speed as reported by the provider, e.g. "m/s"
+            pressure (float): Sea-level pressure in hPa
+            observed_at (str): Observation time
+            source (str): Weather provider
+        """
+        self.location = location
+        self.temperature = temperature
+        self.feels_like = feels_like
+        self.humidity = humidity
+        self.description = description
+        self.wind_speed = wind_speed
+        self.wind_unit = wind_unit
+        self.pressure = pressure
+        self.observed_at = observed_at
+        self.source = source
+
+    def to_json(self):
+        return {
+            "location": self.location,
+            "temperature": f"{self.temperature:.1f}°C",
+            "feels_like": f"{self.feels_like:.1f}°C",
+            "humidity": f"{self.humidity}%",
+            "description": self.description,
+            "wind_speed": f"{self.wind_speed} {self.wind_unit}",
+            "pressure": f"{self.pressure:.0f} hPa",
+            "observed_at": self.observed_at,
+            "source": self.source,
+        }
+
+
+class ForecastEntry(Record):
+    """
+    One step of a forecast, with numeric fields (units in Forecast.units).
+    """
+
+    __slots__ = ("time", "temp", "feels_like", "humidity", "wind_speed", "description")
+
+    def __init__(self, time, temp, feels_like, humidity, wind_speed, description):
+        """
+        Args:
+            time (str): ISO 8601 UTC time of the step
+            temp (float): Temperature in °C
+            feels_like (float): Apparent temperature in °C
+            humidity (int): Relative humidity in %
+            wind_speed (float): Wind speed in m/s
+            description (str): Weather description
+        """
+        self.time = time
+        self.temp = temp
+        self.feels_like = feels_like
+        self.humidity = humidity
+        self.wind_speed = wind_speed
+        self.description = description
+
+    def to_json(self):
+        return {
+            "time": self.time,
+            "temp": round(self.temp, 1),
+            "feels_like": round(self.feels_like, 1),
+            "humidity": self.humidity,
+            "wind_speed": round(self.wind_speed, 1),
+            "description": self.description,
+        }
+
+
+class Forecast(Record):
+    """
+    Forecast for a location in fixed steps.
+    """
+
+    __slots__ = ("location", "interval_hours", "units", "entries", "source")
+
+    def __init__(self, location, interval_hours, units, entries, source):
+        """
+        Args:
+            location (str): Location name
+            interval_hours (int): Hours between entries
+            units (dict): Unit of each numeric entry field
+            entries (list): ForecastEntry records
+            source (str): Weather provider
+        """
+        self.location = location
+        self.interval_hours = interval_hours
+        self.units = units
+        self.entries = entries
+        self.source = source
+
+    def to_json(self):
+        return {
+            "location": self.location,
+            "interval_hours": self.interval_hours,
+            "units": self.units,
+            "forecast": [entry.to_json() for entry in self.entries],
+            "source": self.source,
+        }
+
+
+class StockPrice(Record):
+    """
+    Current price of a stock.
+    """
+
+    __slots__ = ("ticker", "current_price")
+
+    def __init__(self, ticker, current_price):
+        """
+        Args:
+            ticker (str): Ticker symbol as requested
+            current_price (float): Current price, or None if the provider has none
+        """
+        self.ticker = ticker
+        self.current_price = current_price
+
+    def to_json(self):
+        return {"ticker": self.ticker, "current_price": self.current_price}
+
+
+class DividendDate(Record):
+    """
+    Next dividend payment date of a stock.
+    """
+
+    __slots__ = ("ticker", "dividend_date")
+
+    def __init__(self, ticker, dividend_date):
+        """
+        Args:
+            ticker (str): Ticker symbol as requested
+            dividend_date (int): Unix timestamp of the payment date, or None if unknown
+        """
+        self.ticker = ticker
+        self.dividend_date = dividend_date
+
+    def to_json(self):
+        return {"ticker": self.ticker, "dividend_date": self.dividend_date}
+
+
+class PriceHistory(Record):
+    """
+    Summary statistics of the daily prices of a stock over a period.
+    """
+
+    __slots__ = ("ticker", "period", "summary", "source")
+
+    def __init__(self, ticker, period, summary, source):
+        """
+        Args:
+            ticker (str): Ticker symbol
+            period (str): Look-back period, e.g. "1y"
+            summary (dict): Statistics from prices.summarize()
+            source (str): Price provider
+        """
+        self.ticker = ticker
+        self.period = period
+        self.summary = summary
+        self.source = source
+
+    def to_json(self):
+        return dict({"ticker": self.ticker, "period": self.period}, **self.summary, source=self.source)
+
+
+class SearchHit(Record):
+    """
+    One web search result.
+    """
+
+    __slots__ = ("title", "content", "url", "score")
+
+    def __init__(self, title, content, url, score):
+        """
+        Args:
+            title (str): Page title
+            content (str): Page excerpt
+            url (str): Page URL
+            score (float): Relevance score of the search provider
+        """
+        self.title = title
+        self.content = content
+        self.url = url
+        self.score = score
+
+    def to_json(self):
+        return {"title": self.title, "content": self.content, "url": self.url, "score": self.score}
+
+
+class SearchResults(Record):
+    """
+    Results of a web search.
+    """
+
+    __slots__ = ("query", "search_type", "results")
+
+    def __init__(self, query, search_type, results):
+        """
+        Args:
+            query (str): Query as sent to the search provider
+            search_type (str): "basic" or "advanced"
+            results (list): SearchHit records
+        """
+        self.query = query
+        self.search_type = search_type
+        self.results = results
+
+    def to_json(self):
+        return {
+            "query": self.query,
+            "search_type": self.search_type,
+            "results_count": len(self.results),
+            "results": [result.to_json() for result in self.results],
+        }
+
+
+def from_state(state):
+    """
+    Rebuild a record from to_state() output; other values are returned unchanged.
+
+    Args:
+        state: Value read back from a cache
+
+    Returns:
+        Record, or the value itself if it is not a record state
+    """
+    if not isinstance(state, dict) or STATE_TYPE_KEY not in state:
+        return state
+    fields = {name: [from_state(item) for item in value] if isinstance(value, list) else value
+              for name, value in state.items() if name != STATE_TYPE_KEY}
+    return _RECORD_TYPES[state[STATE_TYPE_KEY]](**fields)
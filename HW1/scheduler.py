@@ -0,0 +1,364 @@
+"""
+Fair Scheduler Module
+Per-tenant weighted fair queuing with priority classes for agent work.
+
+Every turn runs on behalf of a caller: a tenant and a priority class,
+"interactive" (a user waiting for the reply) or "bulk" (scripts, batch
+jobs, cache warm-up). The HTTP service takes them from the X-Tenant and
+X-Priority headers and sets them with caller_scope(); code below it reads
+them from a context variable, so neither the agent loop nor the tools pass
+them around.
+
+Three places queue work fairly:
+
+- the request queue of the HTTP service (server.py);
+- LLM calls (llm_client.py), with AGENT_TPM_BUDGET=1 within the OpenAI
+  tokens-per-minute budget ("openai_tokens" in ratelimit.PROVIDER_LIMITS);
+- tool calls (registry.py), after the tool's bulkhead has admitted them.
+
+Waiting work is ordered by priority class first: interactive work is always
+served before bulk work. Within a class, tenants share the capacity in
+proportion to their weights (AGENT_TENANT_WEIGHTS="acme=3,batch-co=0.5",
+default 1) using self-clocked fair queuing: each item gets the virtual
+finish time start + cost / weight, where start is the later of the current
+virtual time and the finish time of the tenant's previous item, and the
+item with the earliest finish time goes next. A tenant flooding the queue
+only pushes its own finish times out. The cost of an LLM call is its
+estimated prompt size in tokens, so the token budget is shared fairly too.
+
+The default slots (SCHEDULER_SLOTS) are above what normal load uses, so
+calls are admitted at once until the agent is overloaded, e.g. by a batch
+tenant running many turns, and only then queue fairly. They can be changed
+with SCHEDULER_<KIND>=<slots>, e.g. SCHEDULER_LLM=4 for an account that
+allows 4 concurrent requests; 0 removes the limit, and calls then pass
+straight through unless the token budget is enabled. The token budget is
+opt-in because it has to match the tokens-per-minute limit of the account.
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import metrics
+from deadline import remaining_timeout
+from ratelimit import get_bucket
+
+# Priority classes, served in this order
+PRIORITIES = ("interactive", "bulk")
+
+DEFAULT_TENANT = "default"
+DEFAULT_PRIORITY = "interactive"
+
+# Calls of each kind running at the same time (None: no limit). Above normal load
+# (bench.py runs up to 16 turns at once), but below what the tools' bulkheads admit together
+SCHEDULER_SLOTS = {"llm": 32, "tool": 8}
+
+_current_caller = contextvars.ContextVar("caller", default=(DEFAULT_TENANT, DEFAULT_PRIORITY))
+
+# Marker of removed queue entries
+_REMOVED = object()
+
+
+def token_budget_enabled():
+    """
+    Returns:
+        bool: True if AGENT_TPM_BUDGET is set to 1/true/on
+    """
+    return os.environ.get("AGENT_TPM_BUDGET", "").lower() in ("1", "true", "on", "yes")
+
+
+@lru_cache(maxsize=8)
+def _parse_weights(value):
+    weights = {}
+    for part in value.split(","):
+        tenant, _, weight = part.partition("=")
+        if tenant.strip() and weight.strip():
+            weights[tenant.strip()] = float(weight)
+    return weights
+
+
+def tenant_weight(tenant):
+    """
+    Get the share weight of a tenant from AGENT_TENANT_WEIGHTS.
+
+    Args:
+        tenant (str): Tenant name
+
+    Returns:
+        float: Weight (1.0 unless configured)
+    """
+    return _parse_weights(os.environ.get("AGENT_TENANT_WEIGHTS", "")).get(tenant, 1.0)
+
+
+def current_caller():
+    """
+    Get the caller of the current request.
+
+    Returns:
+        tuple: (tenant, priority)
+    """
+    return _current_caller.get()
+
+
+@contextmanager
+def caller_scope(tenant=None, priority=None):
+    """
+    Set the caller for the enclosed block.
+
+    Args:
+        tenant (str, optional): Tenant name (None keeps the enclosing tenant)
+        priority (str, optional): "interactive" or "bulk" (None keeps the enclosing class)
+
+    Yields:
+        tuple: (tenant, priority) of the block
+
+    Raises:
+        ValueError: If the priority class is unknown
+    """
+    outer_tenant, outer_priority = _current_caller.get()
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}, use one of {', '.join(PRIORITIES)}")
+    caller = (tenant or outer_tenant, priority or outer_priority)
+    token = _current_caller.set(caller)
+    try:
+        yield caller
+    finally:
+        _current_caller.reset(token)
+
+
+class FairQueue:
+    """
+    Queue ordered by priority class, then by per-tenant virtual finish time.
+
+    Not thread-safe; callers hold their own lock (or run on one event loop).
+    """
+
+    def __init__(self):
+        self._heaps = {priority: [] for priority in PRIORITIES}
+        self._virtual_time = {priority: 0.0 for priority in PRIORITIES}
+        self._last_finish = {}
+        self._sequence = itertools.count()
+        self._counts = {priority: 0 for priority in PRIORITIES}
+
+    def push(self, item, tenant=DEFAULT_TENANT, priority=DEFAULT_PRIORITY, cost=1.0):
+        """
+        Add an item.
+
+        Args:
+            item: Queued value
+            tenant (str): Tenant the item belongs to
+            priority (str): Priority class
+            cost (float): Work the item represents, e.g. tokens
+
+        Returns:
+            list: Queue entry, for remove()
+        """
+        key = (priority, tenant)
+        if len(self._last_finish) > 1024:
+            # Tenants whose last finish time has passed start at the virtual time anyway
+            self._last_finish = {other: finish for other, finish in self._last_finish.items()
+                                 if finish > self._virtual_time[other[0]]}
+        start = max(self._virtual_time[priority], self._last_finish.get(key, 0.0))
+        finish = start + cost / tenant_weight(tenant)
+        self._last_finish[key] = finish
+        entry = [finish, next(self._sequence), item, priority]
+        heapq.heappush(self._heaps[priority], entry)
+        self._counts[priority] += 1
+        return entry
+
+    def _head(self):
+        for priority in PRIORITIES:
+            heap = self._heaps[priority]
+            # Drop removed entries
+            while heap and heap[0][2] is _REMOVED:
+                heapq.heappop(heap)
+            if heap:
+                return heap[0]
+        return None
+
+    def peek(self):
+        """
+        Returns:
+            list: Entry that pop() would return next, or None if the queue is empty
+        """
+        return self._head()
+
+    def pop(self):
+        """
+        Remove and return the next item.
+
+        Returns:
+            Next item
+
+        Raises:
+            IndexError: If the queue is empty
+        """
+        entry = self._head()
+        if entry is None:
+            raise IndexError("pop from an empty FairQueue")
+        heapq.heappop(self._heaps[entry[3]])
+        self._counts[entry[3]] -= 1
+        # Self-clocked: virtual time is the finish time of the item served last
+        self._virtual_time[entry[3]] = entry[0]
+        item, entry[2] = entry[2], _REMOVED
+        return item
+
+    def remove(self, entry):
+        """
+        Remove a queued entry, e.g. of a caller that gave up waiting; entries
+        already popped are left alone.
+
+        Args:
+            entry (list): Entry returned by push()
+        """
+        if entry[2] is not _REMOVED:
+            entry[2] = _REMOVED
+            self._counts[entry[3]] -= 1
+
+    def count(self, priority):
+        """
+        Returns:
+            int: Items queued in a priority class
+        """
+        return self._counts[priority]
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def __iter__(self):
+        for priority in PRIORITIES:
+            for entry in sorted(self._heaps[priority]):
+                if entry[2] is not _REMOVED:
+                    yield entry[2]
+
+
+class FairScheduler:
+    """
+    Thread-safe gate admitting a bounded number of calls in fair-queuing order.
+    """
+
+    def __init__(self, name, slots, budget=None):
+        """
+        Args:
+            name (str): Scheduler name, used in metrics ("llm" or "tool")
+            slots (int): Calls running at the same time (None: no limit)
+            budget (optional): Token bucket (see ratelimit.py) the cost of each call is
+                taken from before it is admitted
+        """
+        self.name = name
+        self.slots = slots
+        self.budget = budget
+        self.active = 0
+        self._queue = FairQueue()
+        self._condition = threading.Condition()
+
+    def acquire(self, cost=1.0):
+        """
+        Wait until the call of the current caller is admitted.
+
+        Args:
+            cost (float): Cost of the call (tokens for LLM calls)
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            DeadlineExceeded: If the request deadline passes while waiting
+        """
+        if self.slots is None and self.budget is None:
+            # Nothing to queue for
+            with self._condition:
+                self.active += 1
+            return 0.0
+
+        tenant, priority = current_caller()
+        started = time.monotonic()
+        with self._condition:
+            entry = self._queue.push(self, tenant, priority, cost)
+            try:
+                while True:
+                    wait = None
+                    if self._queue.peek() is entry and (self.slots is None or self.active < self.slots):
+                        wait = self.budget.try_acquire(min(cost, self.budget.burst)) if self.budget else 0.0
+                        if wait == 0:
+                            self._queue.pop()
+                            self.active += 1
+                            break
+                    # Raises DeadlineExceeded once the request is out of time
+                    self._condition.wait(remaining_timeout(wait))
+            except BaseException:
+                self._queue.remove(entry)
+                self._condition.notify_all()
+                raise
+            # The next caller may now be at the head with a free slot
+            self._condition.notify_all()
+        waited = time.monotonic() - started
+        metrics.scheduler_wait.observe(waited, scheduler=self.name, priority=priority)
+        return waited
+
+    def release(self):
+        """
+        Free the slot of a finished call.
+        """
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, cost=1.0):
+        """
+        Run the enclosed block in an admitted slot.
+
+        Args:
+            cost (float): Cost of the call (tokens for LLM calls)
+
+        Yields:
+            float: Seconds spent waiting
+        """
+        waited = self.acquire(cost)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Slots, running calls and queued calls per priority class
+        """
+        with self._condition:
+            return {"slots": self.slots, "active": self.active,
+                    **{f"queued_{priority}": self._queue.count(priority) for priority in PRIORITIES}}
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(kind):
+    """
+    Get (and create on first use) the scheduler of a kind of call.
+
+    Args:
+        kind (str): "llm" or "tool"
+
+    Returns:
+        FairScheduler: Shared scheduler
+    """
+    scheduler = _schedulers.get(kind)
+    if scheduler is not None:
+        return scheduler
+
+    with _schedulers_lock:
+        if kind not in _schedulers:
+            override = os.environ.get(f"SCHEDULER_{kind.upper()}")
+            # SCHEDULER_<KIND>=0 removes the limit
+            slots = (int(override) or None) if override else SCHEDULER_SLOTS.get(kind)
+            budget = get_bucket("openai_tokens") if kind == "llm" and token_budget_enabled() else None
+            _schedulers[kind] = FairScheduler(kind, slots, budget)
+        return _schedulers[kind]
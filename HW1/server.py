@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+"""
+HTTP Service Module
+Exposes the agent as an HTTP endpoint on an asyncio server.
+
+Chat requests go into a bounded queue served by a fixed number of workers;
+each worker runs one agent turn at a time in a thread. When the queue is
+full the service answers 503 with Retry-After instead of queueing without
+bound, so a load balancer can shed or redirect load. On SIGTERM/SIGINT the
+service stops accepting connections, reports not-ready and drains the queued
+and running turns before exiting.
+
+With --processes N the parent binds the port once and forks N worker
+processes that accept on the shared socket, so JSON and agent work is spread
+over several cores. Workers share the tool cache through SQLite and the
+upstream rate limits through file-backed token buckets (see cache.py and
+ratelimit.py); a crashed worker is restarted with an exponential delay, and
+the supervisor gives up once a worker keeps crashing right after start.
+
+With AGENT_WARMUP=1 every worker also refreshes its most requested cached
+tool calls before they expire (see warmup.py).
+
+Requests name their tenant and priority class in the X-Tenant and
+X-Priority ("interactive" or "bulk") headers. The request queue hands out
+interactive requests first and shares workers fairly between tenants, and
+bulk requests may fill at most BULK_QUEUE_SHARE of the queue, so a batch
+script cannot lock interactive users out. The turn then runs under that
+caller, and its LLM and tool calls are scheduled the same way (see
+scheduler.py).
+
+Endpoints:
+- POST /v1/chat: {"messages": [...]} or {"message": "..."}, optional "model"
+  and "stream"; optional X-Tenant and X-Priority headers. Streaming
+  responses are chunked NDJSON progress events (queued, started, tool_call,
+  tool_result, reply or error, done).
+- GET /healthz: liveness
+- GET /readyz: readiness (503 while draining)
+- GET /metrics: Prometheus metrics
+- GET /v1/usage: token usage of the completions served by this process,
+  including the prompt cache hit ratio
+
+Usage:
+    python server.py --port 8080 --workers 8 --queue-size 64
+    python server.py --port 8080 --processes 4 --workers 8
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import codec
+import metrics
+from deadline import DeadlineExceeded
+from scheduler import DEFAULT_PRIORITY, DEFAULT_TENANT, PRIORITIES, FairQueue, caller_scope
+
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_DRAIN_TIMEOUT = 30.0
+MAX_BODY_BYTES = 1_000_000
+# Largest share of the request queue that bulk requests may take
+BULK_QUEUE_SHARE = 0.5
+# Restart delay of a crashed worker process, doubled after every fast failure
+RESTART_BASE_DELAY = 0.5
+RESTART_MAX_DELAY = 30.0
+# A worker exiting within this many seconds of its start failed fast; after
+# MAX_FAST_FAILURES in a row the supervisor stops
+FAST_FAILURE_SECONDS = 10.0
+MAX_FAST_FAILURES = 5
+
+_TENANT = re.compile(r"^[\w.-]{1,64}$")
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+_END = object()
+
+
+class HTTPError(Exception):
+    """Raised while parsing a request that must be answered with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """
+    Parsed HTTP request.
+    """
+
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        return self.headers.get("connection", "").lower() != "close"
+
+
+async def read_request(reader):
+    """
+    Read one HTTP/1.1 request from a connection.
+
+    Returns:
+        Request: Parsed request, or None if the client closed the connection
+
+    Raises:
+        HTTPError: If the request line or Content-Length is malformed, or the body is too large
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), urlparse(target).path, headers, body)
+
+
+class ChatJob:
+    """
+    A queued agent turn and the channel its progress events are sent through.
+    """
+
+    def __init__(self, messages, model, loop, tenant=DEFAULT_TENANT, priority=DEFAULT_PRIORITY):
+        self.messages = messages
+        self.model = model
+        self.loop = loop
+        self.tenant = tenant
+        self.priority = priority
+        self.events = asyncio.Queue()
+        self.enqueued_at = loop.time()
+        self.cancelled = False
+
+    def emit(self, event):
+        """
+        Send an event to the client; safe to call from worker threads.
+        """
+        self.loop.call_soon_threadsafe(self.events.put_nowait, event)
+
+
+class FairJobQueue(asyncio.Queue):
+    """
+    Bounded request queue that hands out jobs in fair-queuing order (see scheduler.FairQueue).
+    """
+
+    def _init(self, maxsize):
+        self._queue = FairQueue()
+
+    def _put(self, job):
+        self._queue.push(job, job.tenant, job.priority)
+
+    def _get(self):
+        return self._queue.pop()
+
+    def count(self, priority):
+        """
+        Returns:
+            int: Jobs of a priority class waiting for a worker
+        """
+        return self._queue.count(priority)
+
+
+class AgentServer:
+    """
+    Asyncio HTTP server with a bounded request queue and a fixed worker pool.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8080, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 drain_timeout=DEFAULT_DRAIN_TIMEOUT, turn=None, sock=None):
+        """
+        Args:
+            host (str): Interface to bind
+            port (int): Port to listen on (0 picks a free port)
+            workers (int): Number of agent turns running at the same time
+            queue_size (int): Number of requests that may wait for a worker
+            drain_timeout (float): Longest time to wait for queued turns on shutdown
+            turn (callable, optional): Function(messages, model, on_event) returning the reply text;
+                defaults to main.get_completion_from_messages
+            sock (socket.socket, optional): Already bound listening socket (pre-fork mode);
+                host and port are ignored if given
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_size = queue_size
+        self.drain_timeout = drain_timeout
+        self.turn = turn
+        self.sock = sock
+        self.draining = False
+        self.queue = None
+        self.warmer = None
+        self._server = None
+        self._executor = None
+        self._worker_tasks = []
+        self._connections = set()
+
+    @staticmethod
+    def _agent_turn(messages, model, on_event):
+        from main import get_completion_from_messages
+
+        reply = get_completion_from_messages(messages, model=model, on_event=on_event)
+        return reply if isinstance(reply, str) else reply.content
+
+    async def start(self):
+        """
+        Load the agent, start listening and spawn the workers.
+        """
+        loop = asyncio.get_running_loop()
+        if self.turn is None:
+            from main import preload
+
+            # Import everything before the first concurrent turns race to do it
+            await loop.run_in_executor(None, preload)
+            self.turn = self._agent_turn
+            from warmup import CacheWarmer, warmup_enabled
+
+            if warmup_enabled():
+                from tools import registry
+
+                self.warmer = CacheWarmer(registry)
+                self.warmer.start()
+        self.queue = FairJobQueue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="agent-worker")
+        self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        if self.sock is not None:
+            self._server = await asyncio.start_server(self._handle_connection, sock=self.sock)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def drain(self):
+        """
+        Stop accepting connections and finish the queued and running turns.
+
+        Returns:
+            bool: True if everything finished within the drain timeout
+        """
+        self.draining = True
+        self._server.close()
+        if self.warmer is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.warmer.stop)
+        try:
+            await asyncio.wait_for(self.queue.join(), self.drain_timeout)
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        # Give handlers a moment to flush the last responses, then close idle keep-alive connections
+        await asyncio.sleep(0.05)
+        for writer in list(self._connections):
+            writer.close()
+        self._executor.shutdown(wait=drained, cancel_futures=True)
+        return drained
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                waited = loop.time() - job.enqueued_at
+                metrics.server_queue_wait.observe(waited, priority=job.priority)
+                job.emit({"event": "started", "queue_ms": round(waited * 1000, 1)})
+                started = time.perf_counter()
+                try:
+                    reply = await loop.run_in_executor(self._executor, self._run_job, job)
+                    job.emit({"event": "reply", "content": reply})
+                except DeadlineExceeded as e:
+                    job.emit({"event": "error", "status": 504, "error": str(e)})
+                except Exception as e:
+                    job.emit({"event": "error", "status": 500, "error": f"{type(e).__name__}: {e}"})
+                metrics.server_turn_latency.observe(time.perf_counter() - started)
+            finally:
+                job.emit(_END)
+                self.queue.task_done()
+
+    def _run_job(self, job):
+        with caller_scope(job.tenant, job.priority):
+            return self.turn(job.messages, job.model, job.emit)
+
+    async def _handle_connection(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                keep_alive = request.keep_alive and not self.draining
+                status = await self._route(request, writer, keep_alive)
+                metrics.server_requests.inc(path=request.path, status=status)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _route(self, request, writer, keep_alive):
+        if request.path == "/healthz":
+            return await self._send_json(writer, 200, {"status": "ok"}, keep_alive=keep_alive)
+        if request.path == "/readyz":
+            if self.draining:
+                return await self._send_json(writer, 503, {"status": "draining"}, keep_alive=keep_alive)
+            return await self._send_json(writer, 200, {"status": "ready", "queued": self.queue.qsize()},
+                                         keep_alive=keep_alive)
+        if request.path == "/metrics":
+            body = metrics.render().encode("utf-8")
+            return await self._send(writer, 200, body, "text/plain; version=0.0.4; charset=utf-8", keep_alive)
+        if request.path == "/v1/usage":
+            from main import get_usage_stats
+            return await self._send_json(writer, 200, get_usage_stats(), keep_alive=keep_alive)
+        if request.path == "/v1/chat":
+            if request.method != "POST":
+                return await self._send_json(writer, 405, {"error": "Use POST"}, keep_alive=keep_alive)
+            return await self._chat(request, writer, keep_alive)
+        return await self._send_json(writer, 404, {"error": f"Not found: {request.path}"}, keep_alive=keep_alive)
+
+    async def _chat(self, request, writer, keep_alive):
+        try:
+            payload = codec.loads(request.body or b"{}")
+            messages = payload.get("messages")
+            if messages is None and isinstance(payload.get("message"), str):
+                messages = [{"role": "user", "content": payload["message"]}]
+            if not isinstance(messages, list) or not messages:
+                raise ValueError("Provide a non-empty 'messages' list or a 'message' string")
+            tenant = request.headers.get("x-tenant") or DEFAULT_TENANT
+            priority = (request.headers.get("x-priority") or DEFAULT_PRIORITY).lower()
+            if not _TENANT.match(tenant):
+                raise ValueError("X-Tenant must be 1-64 letters, digits, '.', '_' or '-'")
+            if priority not in PRIORITIES:
+                raise ValueError(f"X-Priority must be one of {', '.join(PRIORITIES)}")
+        except (ValueError, AttributeError) as e:
+            return await self._send_json(writer, 400, {"error": str(e)}, keep_alive=keep_alive)
+
+        if self.draining:
+            return await self._send_json(writer, 503, {"error": "Server is draining"}, {"Retry-After": "1"},
+                                         keep_alive=False)
+        job = ChatJob(messages, payload.get("model", "gpt-4o"), asyncio.get_running_loop(), tenant, priority)
+        try:
+            if priority == "bulk" and self.queue.count("bulk") >= self.queue_size * BULK_QUEUE_SHARE:
+                raise asyncio.QueueFull
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return await self._send_json(writer, 503, {"error": "Server is saturated, retry later"},
+                                         {"Retry-After": "1"}, keep_alive=keep_alive)
+
+        try:
+            if payload.get("stream"):
+                return await self._stream(job, writer, keep_alive)
+            result = {}
+            while (event := await job.events.get()) is not _END:
+                if event["event"] == "started":
+                    result["queue_ms"] = event["queue_ms"]
+                elif event["event"] == "tool_call":
+                    result.setdefault("tool_calls", []).append({"name": event["name"], "arguments": event["arguments"]})
+                elif event["event"] == "reply":
+                    result["reply"] = event["content"]
+                elif event["event"] == "error":
+                    result["error"] = event["error"]
+                    result["status"] = event["status"]
+            status = result.pop("status", 200)
+            return await self._send_json(writer, status, result, keep_alive=keep_alive)
+        except (ConnectionError, asyncio.CancelledError):
+            job.cancelled = True
+            raise
+
+    async def _stream(self, job, writer, keep_alive):
+        head = ["HTTP/1.1 200 OK", "Content-Type: application/x-ndjson", "Transfer-Encoding: chunked",
+                "Cache-Control: no-cache", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+
+        async def write_event(event):
+            data = codec.dumps_bytes(event) + b"\n"
+            writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+            await writer.drain()
+
+        await write_event({"event": "queued", "position": self.queue.qsize()})
+        while (event := await job.events.get()) is not _END:
+            await write_event(event)
+        await write_event({"event": "done"})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return 200
+
+    async def _send_json(self, writer, status, payload, headers=None, keep_alive=True):
+        body = codec.dumps_bytes(payload)
+        return await self._send(writer, status, body, "application/json", keep_alive, headers)
+
+    async def _send(self, writer, status, body, content_type, keep_alive, headers=None):
+        head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", f"Content-Type: {content_type}",
+                f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+        return status
+
+
+async def serve(host, port, workers, queue_size, drain_timeout, sock=None):
+    """
+    Run the service until SIGTERM or SIGINT, then drain it.
+    """
+    server = AgentServer(host, port, workers, queue_size, drain_timeout, sock=sock)
+    await server.start()
+    print(f"Agent service listening on http://{host}:{server.port} "
+          f"({workers} workers, queue size {queue_size}, pid {os.getpid()})")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+
+    print("Draining...")
+    drained = await server.drain()
+    print("Drained" if drained else f"Drain timed out after {drain_timeout}s, abandoning remaining turns")
+
+
+def restart_delay(failures):
+    """
+    Get the delay before restarting a worker process.
+
+    Args:
+        failures (int): Fast failures of the worker in a row
+
+    Returns:
+        float: Seconds to wait (0 after a worker that ran for a while)
+    """
+    if not failures:
+        return 0.0
+    return min(RESTART_BASE_DELAY * 2 ** (failures - 1), RESTART_MAX_DELAY)
+
+
+def run_prefork(host, port, processes, workers, queue_size, drain_timeout):
+    """
+    Bind the port once and run the service in several forked worker processes.
+
+    The parent only supervises: it restarts workers that exit unexpectedly and
+    forwards SIGTERM/SIGINT so every worker drains before the parent exits.
+    A worker that crashes soon after its start is restarted after
+    restart_delay(); after MAX_FAST_FAILURES of those in a row (e.g. a bad
+    environment or a locked database) every worker is stopped.
+
+    Returns:
+        int: Exit status (1 if the supervisor gave up on a crashing worker)
+    """
+    sock = socket.create_server((host, port), backlog=1024)
+    children = {}
+    started_at = {}
+    failures = {}
+    # Worker index to the monotonic time it is restarted at
+    pending = {}
+    stopping = False
+    exit_status = 0
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            status = 0
+            try:
+                asyncio.run(serve(host, port, workers, queue_size, drain_timeout, sock=sock))
+            except BaseException:
+                status = 1
+            os._exit(status)
+        children[pid] = index
+        started_at[index] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for index in range(processes):
+        spawn(index)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"Supervisor {os.getpid()} running {processes} worker processes on http://{host}:{port}")
+
+    while children or pending:
+        if stopping:
+            pending.clear()
+        for index, restart_at in list(pending.items()):
+            if restart_at <= time.monotonic():
+                del pending[index]
+                spawn(index)
+        try:
+            # Poll while a restart is due, so it is not held up by the other workers
+            pid, status = os.waitpid(-1, os.WNOHANG if pending else 0)
+        except ChildProcessError:
+            pid = 0
+            if not pending:
+                break
+        if pid == 0:
+            time.sleep(0.05)
+            continue
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        fast = time.monotonic() - started_at[index] < FAST_FAILURE_SECONDS
+        failures[index] = failures.get(index, 0) + 1 if fast else 0
+        if failures[index] >= MAX_FAST_FAILURES:
+            print(f"Worker {index} (pid {pid}) failed {failures[index]} times right after start, stopping")
+            exit_status = 1
+            stop(None, None)
+            continue
+        delay = restart_delay(failures[index])
+        print(f"Worker {index} (pid {pid}) exited with status {status}, restarting in {delay:.1f}s")
+        pending[index] = time.monotonic() + delay
+    sock.close()
+    return exit_status
+
+
+def main():
+    """
+    Run the HTTP service from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Serve the agent over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent agent turns")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="requests waiting for a worker")
+    parser.add_argument("--drain-timeout", type=float, default=DEFAULT_DRAIN_TIMEOUT)
+    parser.add_argument("--processes", type=int, default=1, help="worker processes sharing the port (pre-fork)")
+    args = parser.parse_args()
+
+    if args.processes > 1 and hasattr(os, "fork"):
+        from cache import DEFAULT_CACHE_PATH
+
+        # Share caches and upstream quotas between the workers unless configured otherwise
+        os.environ.setdefault("AGENT_CACHE_BACKEND", "sqlite")
+        os.environ.setdefault("RATE_LIMIT_DIR", os.path.join(os.path.dirname(DEFAULT_CACHE_PATH), "ratelimit"))
+        sys.exit(run_prefork(args.host, args.port, args.processes, args.workers, args.queue_size,
+                             args.drain_timeout))
+    if args.processes > 1:
+        print("Pre-fork mode needs os.fork(), running a single process")
+    asyncio.run(serve(args.host, args.port, args.workers, args.queue_size, args.drain_timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ from tools import (
     search_web
 )
 from main import get_completion_from_messages
+from recording import replaying
 
 # Load environment variables
 load_dotenv()
@@ -266,7 +267,7 @@ def main():
     test_all_tools_standalone()
     
     # Run OpenAI integration tests if API key is available
-    if os.environ.get("OPENAI_API_KEY"):
+    if os.environ.get("OPENAI_API_KEY") or replaying():
         test_all_tools_with_openai()
         test_tool_combinations()
         test_error_handling()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script for the semantic answer cache.
+Checks embeddings, the vector index, freshness rules and a cached turn against mock_server.py -
+no API keys or network access required.
+"""
+
+import os
+import time
+
+from answer_cache import AnswerCache, VectorIndex, embed, opening_question
+from cache import MemoryCache
+from mock_server import mock_environment, start_mock_server
+from registry import ToolRegistry, canonical_json
+
+SYSTEM = {"role": "system", "content": "You are a helpful assistant."}
+
+
+def similarity(first, second):
+    vector = embed(second)
+    return sum(weight * vector.get(index, 0.0) for index, weight in embed(first).items())
+
+
+def test_embeddings_and_index():
+    """
+    Test that paraphrases are close, different questions are not, and the index finds the best match.
+    """
+    print("Testing embeddings and the vector index")
+    print("=" * 50)
+    close = [
+        ("What's the weather in Prague?", "weather in prague"),
+        ("What's the weather in Prague?", "What is the weather like in Prague"),
+        ("MSFT price", "What's the price of MSFT?"),
+        ("What's the stock price of Apple (AAPL)?", "What is Apple's (AAPL) stock price?"),
+    ]
+    apart = [
+        ("What's the weather in Prague?", "What's the weather in Paris?"),
+        ("What's the stock price of Apple (AAPL)?", "What's the stock price of Tesla (TSLA)?"),
+        ("Search for the latest news about electric cars.", "Search for the latest news about electric bikes."),
+    ]
+    for first, second in close:
+        print(f"{similarity(first, second):.3f}  {first!r} ~ {second!r}")
+        assert similarity(first, second) >= 0.9
+    for first, second in apart:
+        print(f"{similarity(first, second):.3f}  {first!r} vs {second!r}")
+        assert similarity(first, second) < 0.9
+
+    index = VectorIndex()
+    for entry_id, text in enumerate(["weather in Prague", "weather in Paris", "MSFT price"]):
+        index.add(entry_id, embed(text))
+    matches = index.search(embed("What is the weather like in Prague?"), 0.5)
+    assert matches[0][1] == 0 and all(entry_id != 2 for _, entry_id in matches)
+    index.remove(0)
+    assert len(index) == 2 and all(entry_id != 0 for _, entry_id in index.search(embed("weather in Prague"), 0.1))
+    print("Result: paraphrases match, different entities do not")
+
+
+def exchange(messages, name, arguments, result):
+    """
+    Append a tool exchange like main._run_turn does.
+    """
+    messages.append({"role": "assistant", "tool_calls": [
+        {"id": "call_1", "type": "function", "function": {"name": name, "arguments": canonical_json(arguments)}}]})
+    messages.append({"role": "tool", "tool_call_id": "call_1", "name": name, "content": canonical_json(result)})
+    return messages
+
+
+def test_freshness_rules():
+    """
+    Test signatures, TTLs from the tools, staleness and what is not cached.
+    """
+    print("\n\nTesting freshness rules")
+    print("=" * 50)
+    registry = ToolRegistry(cache=MemoryCache())
+
+    @registry.tool(cache_ttl=0.2)
+    def get_weather(location: str = None):
+        """Get the weather."""
+        return {"location": location}
+
+    @registry.tool()
+    def get_time(zone: str):
+        """Get the time, never cached."""
+        return {"zone": zone}
+
+    answers = AnswerCache(registry, threshold=0.9)
+    asked = [SYSTEM, {"role": "user", "content": "What's the weather in Prague?"}]
+    question = opening_question(asked)
+    result = {"location": "Prague", "temperature": "12°C"}
+    registry.cache.set(registry.get("get_weather").cache_key({"location": "Prague"}), result, 0.2)
+    assert answers.store(question, exchange(list(asked), "get_weather", {"location": "Prague"}, result), "12°C")
+
+    hit = answers.lookup([SYSTEM, {"role": "user", "content": "weather in prague please"}])
+    assert hit is not None and hit.content == "12°C" and hit.tool_call[0] == "get_weather"
+    # Other city, other system prompt, follow-up question: no hit
+    assert answers.lookup([SYSTEM, {"role": "user", "content": "What's the weather in Paris?"}]) is None
+    assert answers.lookup([{"role": "system", "content": "Answer in French."},
+                           {"role": "user", "content": "What's the weather in Prague?"}]) is None
+    assert answers.lookup(exchange(list(asked), "get_weather", {}, {}) + [
+        {"role": "user", "content": "What's the weather in Prague?"}]) is None
+
+    # A newer tool result makes the answer stale
+    registry.cache.set(registry.get("get_weather").cache_key({"location": "Prague"}),
+                       dict(result, temperature="14°C"), 0.2)
+    assert answers.lookup(asked) is None and len(answers) == 0
+
+    # The answer expires with the tool result it includes
+    registry.cache.clear()
+    answers.store(question, exchange(list(asked), "get_weather", {"location": "Prague"}, result), "12°C")
+    assert answers.lookup(asked) is not None
+    time.sleep(0.25)
+    assert answers.lookup(asked) is None
+
+    # Uncached tools and failed tool calls are not stored
+    timed = [SYSTEM, {"role": "user", "content": "What time is it in Tokyo?"}]
+    assert not answers.store(opening_question(timed), exchange(list(timed), "get_time", {"zone": "JST"}, {}), "9:00")
+    assert not answers.store(question, exchange(list(asked), "get_weather", {"location": "Prague"},
+                                                {"error": "timeout"}), "Sorry")
+    print(f"Result: {answers.stats}")
+    assert answers.stats["stale"] == 2 and answers.stats["hits"] == 2
+
+
+def test_cached_turn():
+    """
+    Test that a repeated question is answered without any completion.
+    """
+    from main import NO_TOOL_ANSWER, answer_cache, get_completion_from_messages
+
+    print("\n\nTesting a cached agent turn")
+    print("=" * 50)
+    server = start_mock_server(config={"*": {"latency_ms": 50, "latency_sigma": 0}})
+    os.environ.update(mock_environment(server))
+    try:
+        answer_cache.clear()
+        durations = []
+        for text in ("What's the stock price of Apple (AAPL)?", "what is Apple's (AAPL) stock price"):
+            before = server.state.requests["openai"]
+            messages = [dict(SYSTEM), {"role": "user", "content": text}]
+            started = time.perf_counter()
+            response = get_completion_from_messages(messages, use_answer_cache=True)
+            durations.append(time.perf_counter() - started)
+            completions = server.state.requests["openai"] - before
+            print(f"{text!r}: {durations[-1] * 1000:.1f} ms, {completions} completions")
+            assert "current_price" in response.content
+        # The cached turn still leaves the tool exchange in the history
+        assert messages[-1]["role"] == "tool" and "AAPL" in messages[-1]["content"]
+
+        # The fallback reply of a turn without a tool call is not cached
+        for _ in range(2):
+            before = server.state.requests["openai"]
+            response = get_completion_from_messages([dict(SYSTEM), {"role": "user", "content": "Tell me a joke"}],
+                                                    use_answer_cache=True)
+            assert response == NO_TOOL_ANSWER and server.state.requests["openai"] - before == 1
+        print(f"Fallback reply {NO_TOOL_ANSWER!r} was not cached")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert completions == 0
+    print(f"Result: {durations[0] * 1000:.0f} ms for the first turn, {durations[1] * 1000:.1f} ms from the cache")
+    assert durations[1] < 0.02 < durations[0]
+
+
+def main():
+    """
+    Main function to run all answer cache tests.
+    """
+    print("Answer Cache Testing Suite")
+    print("=" * 60)
+
+    test_embeddings_and_index()
+    test_freshness_rules()
+    test_cached_turn()
+
+    print("\n" + "=" * 60)
+    print("Answer cache testing completed!")
+
+
+if __name__ == "__main__":
+    main()
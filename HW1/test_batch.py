@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for the Batch API mode.
+Runs question sets through the mock batch endpoints of mock_server.py - no API keys or network access required.
+"""
+
+import json
+import os
+import tempfile
+
+from batch import BatchError, BatchJob, load_questions
+from mock_server import mock_environment, start_mock_server
+
+QUESTIONS = [
+    {"id": "aapl", "question": "What's the stock price of Apple (AAPL)?"},
+    {"id": "london", "question": "What's the weather like in London?"},
+    {"id": "ko", "question": "When is the next dividend of Coca-Cola (KO)?"},
+    {"id": "hello", "question": "Hello there!"},
+]
+
+
+def write_questions(directory, questions):
+    path = os.path.join(directory, "questions.jsonl")
+    with open(path, "w", encoding="utf-8") as questions_file:
+        for question in questions:
+            questions_file.write(json.dumps(question) + "\n")
+    return path
+
+
+def test_load_questions():
+    """
+    Test question parsing, default IDs and duplicate detection.
+    """
+    print("Testing question loading")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_questions(directory, [
+            {"question": "MSFT price?"},
+            {"id": "custom", "messages": [{"role": "user", "content": "Weather in Oslo?"}]},
+        ])
+        questions = load_questions(path, system_prompt="Be brief.")
+        assert questions[0] == ("1", [{"role": "system", "content": "Be brief."},
+                                      {"role": "user", "content": "MSFT price?"}])
+        assert questions[1][0] == "custom" and len(questions[1][1]) == 1
+
+        duplicate = write_questions(directory, [{"id": "a", "question": "x"}, {"id": "a", "question": "y"}])
+        try:
+            load_questions(duplicate)
+            raise AssertionError("expected a duplicate id error")
+        except BatchError as e:
+            print(f"Result: {len(questions)} questions loaded; duplicate rejected ({e})")
+
+
+class InterruptedJob(BatchJob):
+    """
+    Job that stops after submitting its first batch, like a killed process.
+    """
+
+    def _wait(self, batch_id, stage):
+        raise KeyboardInterrupt
+
+
+def test_batch_run_and_resume(server):
+    """
+    Test both stages with the local tool round, and resuming without resubmitting.
+    """
+    print("\n\nTesting a batch run with resume")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        questions = load_questions(write_questions(directory, QUESTIONS))
+        work_dir = os.path.join(directory, "job")
+        try:
+            InterruptedJob(work_dir, poll_interval=0.05).run(questions)
+            raise AssertionError("expected the interruption")
+        except KeyboardInterrupt:
+            pass
+        assert len(server.state.batches) == 1
+
+        job = BatchJob(work_dir, poll_interval=0.05, max_poll_interval=0.1)
+        results = {result["id"]: result for result in job.run(questions)}
+        for question_id, result in results.items():
+            print(f"{question_id}: {result['status']} {result['tool_call']} {str(result['answer'])[:70]}")
+
+        # The plan batch was polled after the restart, not submitted again; one answer batch followed
+        assert len(server.state.batches) == 2
+        assert all(result["status"] == "done" for result in results.values())
+        assert results["aapl"]["tool_call"] == {"name": "get_stock_price", "arguments": {"ticker": "AAPL"}}
+        assert "current_price" in results["aapl"]["answer"]
+        assert results["hello"]["tool_call"] is None
+        assert sorted(os.listdir(work_dir)) == ["answer-input.jsonl", "answer-output.jsonl", "plan-input.jsonl",
+                                                "plan-output.jsonl", "state.json"]
+        usage = job.usage()
+        # Three plan completions with a tool call plus three answers, and one plain plan completion
+        assert usage["requests"] == 7 and usage["estimated_cost_usd"] > 0
+
+        # A finished job only reports its results
+        assert BatchJob(work_dir).run(questions) == job.results()
+        try:
+            BatchJob(work_dir).run(questions[:2])
+            raise AssertionError("expected a fingerprint mismatch")
+        except BatchError:
+            pass
+    print(f"Result: {len(results)} answers, usage {usage}")
+
+
+def test_failed_requests():
+    """
+    Test that per-request batch errors mark the questions as failed.
+    """
+    print("\n\nTesting failed batch requests")
+    print("=" * 50)
+    server = start_mock_server(config={"*": {"latency_ms": 0}, "batch": {"processing_seconds": 0, "error_rate": 1.0}})
+    base_url = mock_environment(server)["OPENAI_BASE_URL"]
+    try:
+        from openai import OpenAI
+
+        with tempfile.TemporaryDirectory() as directory:
+            questions = load_questions(write_questions(directory, QUESTIONS[:2]))
+            job = BatchJob(os.path.join(directory, "job"), client=OpenAI(base_url=base_url, api_key="mock"),
+                           poll_interval=0.01)
+            results = job.run(questions)
+            assert os.path.exists(os.path.join(directory, "job", "plan-errors.jsonl"))
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"Result: {results}")
+    assert [result["status"] for result in results] == ["failed", "failed"]
+    assert results[0]["error"] == "Injected mock failure"
+
+
+def main():
+    """
+    Main function to run all batch mode tests.
+    """
+    print("Batch Mode Testing Suite")
+    print("=" * 60)
+
+    test_load_questions()
+    server = start_mock_server(config={"*": {"latency_ms": 0}, "batch": {"processing_seconds": 0.2}})
+    os.environ.update(mock_environment(server))
+    try:
+        test_batch_run_and_resume(server)
+    finally:
+        server.shutdown()
+        server.server_close()
+    test_failed_requests()
+
+    print("\n" + "=" * 60)
+    print("Batch mode testing completed!")
+
+
+if __name__ == "__main__":
+    main()
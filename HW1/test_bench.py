@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the benchmark harness.
+Checks percentiles, workload runs and baseline comparison - no API keys or network access required.
+"""
+
+import time
+
+from bench import best_of, compare, percentile, run_workload
+
+
+def test_percentile():
+    """
+    Test percentile interpolation.
+    """
+    print("Testing percentiles")
+    print("=" * 50)
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50.5
+    assert abs(percentile(values, 99) - 99.01) < 1e-9
+    assert percentile([7], 95) == 7
+    assert percentile([], 50) == 0.0
+    print(f"Result: p50={percentile(values, 50)}, p99={percentile(values, 99):.2f}")
+
+
+def test_run_workload():
+    """
+    Test that a workload run counts calls and errors and measures throughput.
+    """
+    print("\n\nTesting a workload run")
+    print("=" * 50)
+
+    def call(index):
+        time.sleep(0.01)
+        if index % 10 == 0:
+            raise RuntimeError("injected")
+        return index % 5 != 1
+
+    summary = run_workload(call, 40, concurrency=4, warmup=0)
+    print(f"Result: {summary}")
+    assert summary["count"] == 40
+    assert summary["errors"] == 4 + 8
+    assert summary["p50_ms"] >= 10
+    # Four workers sleeping 10 ms each cannot exceed 400 calls/s
+    assert 100 < summary["throughput_rps"] <= 400
+
+
+def test_compare():
+    """
+    Test regression detection against a baseline.
+    """
+    print("\n\nTesting baseline comparison")
+    print("=" * 50)
+    reference = {"workload": "turn", "concurrency": 4, "p95_ms": 100.0, "throughput_rps": 50.0, "errors": 0}
+    baseline = {"results": [reference]}
+
+    unchanged = {"results": [dict(reference, p95_ms=110.0, throughput_rps=45.0)]}
+    slower = {"results": [dict(reference, p95_ms=200.0)]}
+    failing = {"results": [dict(reference, throughput_rps=20.0, errors=3)]}
+    new_level = {"results": [dict(reference, concurrency=64, p95_ms=900.0)]}
+
+    assert compare(unchanged, baseline) == []
+    assert len(compare(slower, baseline)) == 1
+    assert len(compare(failing, baseline)) == 2
+    assert compare(new_level, baseline) == []
+    # Tiny absolute changes are noise even if they are large relative ones
+    tiny = {"results": [dict(reference, p95_ms=1.0)]}
+    assert compare({"results": [dict(reference, p95_ms=1.8)]}, tiny) == []
+    print(f"Result: {compare(slower, baseline) + compare(failing, baseline)}")
+
+
+def test_best_of():
+    """
+    Test that repeated runs keep the best value of every statistic.
+    """
+    print("\n\nTesting repeated runs")
+    print("=" * 50)
+    runs = [{"count": 40, "errors": 1, "p50_ms": 10.0, "p95_ms": 30.0, "p99_ms": 40.0, "mean_ms": 12.0,
+             "throughput_rps": 90.0},
+            {"count": 40, "errors": 0, "p50_ms": 11.0, "p95_ms": 19.0, "p99_ms": 60.0, "mean_ms": 13.0,
+             "throughput_rps": 80.0}]
+    best = best_of(runs)
+    print(f"Result: {best}")
+    assert best == {"count": 40, "errors": 0, "p50_ms": 10.0, "p95_ms": 19.0, "p99_ms": 40.0, "mean_ms": 12.0,
+                    "throughput_rps": 90.0, "runs": 2}
+    # One noisy run among quiet ones is not a regression
+    baseline = {"results": [dict(runs[1], workload="turn", concurrency=4)]}
+    noisy = dict(runs[1], p95_ms=60.0)
+    assert compare({"results": [dict(best_of([noisy, runs[1]]), workload="turn", concurrency=4)]}, baseline) == []
+
+
+def main():
+    """
+    Main function to run all benchmark harness tests.
+    """
+    print("Benchmark Harness Testing Suite")
+    print("=" * 60)
+
+    test_percentile()
+    test_run_workload()
+    test_compare()
+    test_best_of()
+
+    print("\n" + "=" * 60)
+    print("Benchmark harness testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-tool bulkheads.
+Checks slot limits, the bounded queue, fast rejection, the isolation of a fast tool
+from a slow one and of interactive calls from bulk work, also behind a bounded tool
+scheduler - no API keys or network access required.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Tool slots of these tests; must be set before the first call creates the scheduler
+os.environ["SCHEDULER_TOOL"] = "8"
+
+import metrics
+from bulkhead import Bulkhead, BulkheadFull, bulkhead_limits
+from deadline import deadline_scope
+from registry import ToolRegistry
+from scheduler import caller_scope
+
+WORKERS = 8
+
+
+def test_limits_and_queue():
+    """
+    Test that calls beyond the slots wait in the queue and calls beyond the queue are rejected at once.
+    """
+    print("Testing slots, queue and fast rejection")
+    print("=" * 50)
+    bulkhead = Bulkhead("slow_tool", max_concurrency=2, max_queue=1, queue_timeout=1.0)
+    assert bulkhead.acquire() == 0.0 and bulkhead.acquire() == 0.0
+
+    waited = []
+    waiter = threading.Thread(target=lambda: waited.append(bulkhead.acquire()))
+    waiter.start()
+    while bulkhead.stats()["queued"] < 1:
+        time.sleep(0.001)
+
+    started = time.perf_counter()
+    try:
+        bulkhead.acquire()
+        raise AssertionError("a call beyond the queue was admitted")
+    except BulkheadFull as e:
+        rejected_in = time.perf_counter() - started
+        assert e.reason == "queue full" and "slow_tool is overloaded" in str(e)
+    assert rejected_in < 0.01
+
+    time.sleep(0.05)
+    bulkhead.release()
+    waiter.join()
+    assert waited and waited[0] >= 0.05
+    print(f"Result: rejected in {rejected_in * 1e6:.0f} us, queued call waited {waited[0] * 1000:.0f} ms, "
+          f"stats {bulkhead.stats()}")
+    assert bulkhead.stats() == {"max_concurrency": 2, "max_queue": 1, "active": 2, "queued": 0, "rejected": 1}
+
+
+def test_queue_timeout_and_deadline():
+    """
+    Test that a queued call gives up after the queue timeout, or earlier at the request deadline.
+    """
+    print("\n\nTesting the queue timeout and the deadline")
+    print("=" * 50)
+    bulkhead = Bulkhead("slow_tool", max_concurrency=1, max_queue=4, queue_timeout=0.1)
+    bulkhead.acquire()
+    cases = ((None, "queue timeout", 0.3), (0.06, "queue timeout", 0.09), (0.02, "deadline exceeded", 0.01))
+    for budget, reason, longest in cases:
+        started = time.perf_counter()
+        try:
+            with deadline_scope(budget):
+                bulkhead.acquire()
+            raise AssertionError("no slot should have freed up")
+        except BulkheadFull as e:
+            assert e.reason == reason
+        elapsed = time.perf_counter() - started
+        print(f"Deadline {budget}: {reason} after {elapsed * 1000:.0f} ms")
+        assert elapsed < longest
+    assert bulkhead.stats()["queued"] == 0
+    print(f"Result: stats {bulkhead.stats()}")
+
+
+def test_env_override():
+    """
+    Test the BULKHEAD_<TOOL> override of the configured limits.
+    """
+    print("\n\nTesting the environment override")
+    print("=" * 50)
+    os.environ["BULKHEAD_SEARCH_WEB"] = "1:3"
+    try:
+        assert bulkhead_limits("search_web", 4, 4) == (1, 3)
+        assert bulkhead_limits("get_weather", 4, 2) == (4, 2)
+        registry = ToolRegistry()
+
+        @registry.tool(max_concurrency=4)
+        def search_web(query: str):
+            """Search the web."""
+            return {"query": query}
+
+        stats = registry.bulkhead_stats()["search_web"]
+    finally:
+        del os.environ["BULKHEAD_SEARCH_WEB"]
+    assert (stats["max_concurrency"], stats["max_queue"]) == (1, 3)
+    print(f"Result: {stats}")
+
+
+def make_registry(bulkheads):
+    """
+    Build a registry with a slow tool (a stalled provider) and a fast one, uncached.
+    """
+    registry = ToolRegistry()
+    limits = {"max_concurrency": 2, "max_queue": 2} if bulkheads else {}
+
+    @registry.tool(**limits)
+    def search_web(query: str):
+        """Search the web."""
+        time.sleep(0.3)
+        return {"query": query}
+
+    @registry.tool(**({"max_concurrency": 4} if bulkheads else {}))
+    def get_stock_price(ticker: str):
+        """Get a stock price."""
+        time.sleep(0.005)
+        return {"ticker": ticker, "current_price": 100.0}
+
+    return registry
+
+
+def run_mixed_load(registry):
+    """
+    Submit a burst of slow calls, then fast calls, to a pool shaped like the server's workers.
+
+    Returns:
+        tuple: (fast call latencies, slow call results)
+    """
+    def timed(name, arguments, submitted):
+        # Latency as seen by the turn, including the wait for a worker
+        result = registry.dispatch(name, arguments)
+        return time.perf_counter() - submitted, result
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        slow = [executor.submit(timed, "search_web", {"query": f"q{index}"}, time.perf_counter())
+                for index in range(12)]
+        time.sleep(0.02)
+        fast = [executor.submit(timed, "get_stock_price", {"ticker": "MSFT"}, time.perf_counter())
+                for _ in range(20)]
+        return [future.result()[0] for future in fast], [future.result()[1] for future in slow]
+
+
+def test_isolation():
+    """
+    Test that a slow tool cannot hold every worker and stall a fast tool.
+    """
+    print("\n\nTesting isolation of a fast tool from a slow one")
+    print("=" * 50)
+    shared_latencies, _ = run_mixed_load(make_registry(bulkheads=False))
+
+    registry = make_registry(bulkheads=True)
+    rejected_before = metrics.tool_calls.values().get(("search_web", "rejected"), 0)
+    isolated_latencies, slow_results = run_mixed_load(registry)
+    rejected = [result for result in slow_results if "error" in result]
+
+    print(f"Without bulkheads: fast p100 {max(shared_latencies) * 1000:.0f} ms")
+    print(f"With bulkheads:    fast p100 {max(isolated_latencies) * 1000:.0f} ms, "
+          f"{len(rejected)}/{len(slow_results)} slow calls rejected")
+    print(f"Result: {rejected[0]['error']}")
+    # Without bulkheads the fast calls wait for the slow ones to give up their workers
+    assert max(shared_latencies) >= 0.25
+    assert max(isolated_latencies) < 0.15
+    # 2 running and 2 queued; the rest were rejected at once instead of holding a worker
+    assert len(rejected) == 8
+    assert metrics.tool_calls.values()[("search_web", "rejected")] - rejected_before == 8
+
+
+def test_bulk_compartment():
+    """
+    Test that bulk work (warm-up, prefetch, bulk tenants) cannot take the slots of interactive calls.
+    """
+    print("\n\nTesting the bulk bulkhead")
+    print("=" * 50)
+    registry = ToolRegistry()
+
+    @registry.tool(max_concurrency=2, max_queue=2)
+    def search_web(query: str):
+        """Search the web."""
+        time.sleep(0.2)
+        return {"query": query}
+
+    def background(index):
+        with caller_scope("warmup", "bulk"):
+            return registry.dispatch("search_web", {"query": f"bulk{index}"})
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        bulk = [executor.submit(background, index) for index in range(8)]
+        refreshes = [executor.submit(registry.dispatch, "search_web", {"query": f"warm{index}"}, True)
+                     for index in range(2)]
+        time.sleep(0.02)
+        interactive = [executor.submit(registry.dispatch, "search_web", {"query": f"user{index}"})
+                       for index in range(2)]
+        interactive_results = [future.result() for future in interactive]
+        rejected = [result for result in (future.result() for future in bulk + refreshes) if "error" in result]
+
+    stats = registry.bulkhead_stats()["search_web"]
+    print(f"Result: interactive {interactive_results}, {len(rejected)}/10 bulk calls rejected, "
+          f"bulk limits {stats['bulk']['max_concurrency']}:{stats['bulk']['max_queue']}")
+    assert all("error" not in result for result in interactive_results)
+    # 1 running and 1 queued in the bulk bulkhead; the interactive one was never used by bulk calls
+    assert len(rejected) == 8 and "search_web (bulk) is overloaded" in rejected[0]["error"]
+    assert stats["rejected"] == 0 and stats["bulk"]["rejected"] == 8
+
+
+def test_scheduler_behind_bulkhead():
+    """
+    Test that calls queued or rejected by a bulkhead do not hold slots of the tool scheduler.
+    """
+    print("\n\nTesting a bulkhead in front of the tool scheduler")
+    print("=" * 50)
+    registry = ToolRegistry()
+
+    @registry.tool(max_concurrency=4, max_queue=4)
+    def get_stock_price(ticker: str):
+        """Get a stock price from a stalled provider."""
+        time.sleep(0.3)
+        return {"ticker": ticker, "current_price": 100.0}
+
+    @registry.tool(max_concurrency=4)
+    def get_weather(location: str):
+        """Get the weather, uncached."""
+        time.sleep(0.005)
+        return {"location": location, "temperature": 20.0}
+
+    def timed(name, arguments, submitted):
+        result = registry.dispatch(name, arguments)
+        return time.perf_counter() - submitted, result
+
+    # Enough threads that no call waits for a worker, like the server's executor
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        slow = [executor.submit(timed, "get_stock_price", {"ticker": f"T{index}"}, time.perf_counter())
+                for index in range(24)]
+        time.sleep(0.02)
+        fast = [executor.submit(timed, "get_weather", {"location": f"City{index}"}, time.perf_counter())
+                for index in range(8)]
+        latencies = [future.result()[0] for future in fast]
+        rejected = [result for _, result in (future.result() for future in slow) if "error" in result]
+
+    print(f"Result: fast p100 {max(latencies) * 1000:.0f} ms, {len(rejected)}/24 slow calls rejected")
+    # The 4 queued slow calls would fill the 8 scheduler slots with the 4 running ones
+    assert max(latencies) < 0.15
+    assert len(rejected) == 16
+
+
+def main():
+    """
+    Main function to run all bulkhead tests.
+    """
+    print("Bulkhead Testing Suite")
+    print("=" * 60)
+
+    test_limits_and_queue()
+    test_queue_timeout_and_deadline()
+    test_env_override()
+    test_isolation()
+    test_bulk_compartment()
+    test_scheduler_behind_bulkhead()
+
+    print("\n" + "=" * 60)
+    print("Bulkhead testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for the tool result caches.
+Checks the in-memory and the shared SQLite backend - no API keys or network access required.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+import codec
+from cache import MemoryCache, SQLiteCache, create_cache
+from results import CurrentWeather, Forecast, ForecastEntry
+
+
+def test_memory_cache():
+    """
+    Test expiry and the entry limit of the in-memory cache.
+    """
+    print("Testing the in-memory cache")
+    print("=" * 50)
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", {"value": 1}, ttl=60)
+    cache.set("b", {"value": 2}, ttl=0.05)
+    assert cache.get("a") == {"value": 1}
+    time.sleep(0.06)
+    assert cache.get("b") is None
+    cache.set("c", 3, ttl=60)
+    cache.set("d", 4, ttl=60)
+    assert cache.get("a") is None and cache.get("d") == 4
+    print("Result: expiry and eviction work")
+
+
+def _writer(path, key):
+    SQLiteCache(path).set(key, {"written_by": os.getpid()}, ttl=60)
+
+
+def test_sqlite_cache_shared_between_processes():
+    """
+    Test that entries written by one process are read by another.
+    """
+    print("\n\nTesting the SQLite cache across processes")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        cache = SQLiteCache(path)
+        # The parent uses the cache before forking; children must open their own connections
+        cache.set("parent", [1, 2, 3], ttl=60)
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=_writer, args=(path, f"quote:{index}")) for index in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert all(worker.exitcode == 0 for worker in workers)
+
+        values = [cache.get(f"quote:{index}") for index in range(4)]
+        print(f"Result: read {values}")
+        assert all(value and value["written_by"] != os.getpid() for value in values)
+        assert cache.get("parent") == [1, 2, 3]
+
+
+def test_sqlite_cache_expiry_and_pruning():
+    """
+    Test expiry, the entry limit and clearing of the SQLite cache.
+    """
+    print("\n\nTesting SQLite cache expiry and pruning")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SQLiteCache(os.path.join(directory, "cache.sqlite3"), max_entries=100)
+        cache.set("short", "gone soon", ttl=0.05)
+        time.sleep(0.06)
+        assert cache.get("short") is None
+
+        # Together with the write above, the last write triggers pruning
+        last = SQLiteCache.PRUNE_INTERVAL - 2
+        for index in range(last + 1):
+            cache.set(f"key:{index}", index, ttl=60 + index)
+        count = cache._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        # The entries closest to expiry were dropped
+        assert count == 100 and cache.get("key:0") is None and cache.get(f"key:{last}") == last
+
+        cache.clear()
+        assert cache.get(f"key:{last}") is None
+        print(f"Result: {count} entries kept after pruning")
+
+
+def test_sqlite_cache_records():
+    """
+    Test that result records come back from the SQLite cache as the same records.
+    """
+    print("\n\nTesting result records in the SQLite cache")
+    print("=" * 50)
+    weather = CurrentWeather("London", 21.34, 20.0, 65, "light rain", 4.1, "m/s", 1012.6,
+                             "2024-05-01T12:00:00Z", "OpenWeatherMap")
+    entries = [ForecastEntry(f"2024-05-01T{hour:02d}:00:00Z", 12.25 + hour, 11.0, 70, 3.33, "clouds")
+               for hour in range(0, 24, 3)]
+    forecast = Forecast("London", 3, {"temp": "°C", "wind_speed": "m/s"}, entries, "OpenWeatherMap")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SQLiteCache(os.path.join(directory, "cache.sqlite3"))
+        memory = MemoryCache()
+        for key, record in (("weather", weather), ("forecast", forecast)):
+            cache.set(key, record, ttl=60)
+            memory.set(key, record, ttl=60)
+            restored = cache.get(key)
+            # Both backends hand back the same type, serialized to the same JSON
+            assert type(restored) is type(memory.get(key)) is type(record)
+            assert codec.dumps(restored) == codec.dumps(record)
+        assert all(isinstance(entry, ForecastEntry) for entry in cache.get("forecast").entries)
+        assert cache.get("weather").temperature == 21.34
+    print(f"Result: read back {type(cache.get('weather')).__name__} with {cache.get('weather')['temperature']}")
+
+
+def test_backend_selection():
+    """
+    Test that AGENT_CACHE_BACKEND selects the cache implementation.
+    """
+    print("\n\nTesting backend selection")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["AGENT_CACHE_BACKEND"] = "sqlite"
+        os.environ["AGENT_CACHE_PATH"] = os.path.join(directory, "shared.sqlite3")
+        try:
+            shared = create_cache()
+        finally:
+            del os.environ["AGENT_CACHE_BACKEND"], os.environ["AGENT_CACHE_PATH"]
+        assert isinstance(shared, SQLiteCache) and shared.path.endswith("shared.sqlite3")
+    assert isinstance(create_cache(), MemoryCache)
+    print("Result: sqlite and memory backends selected from the environment")
+
+
+def main():
+    """
+    Main function to run all cache tests.
+    """
+    print("Cache Testing Suite")
+    print("=" * 60)
+
+    test_memory_cache()
+    test_sqlite_cache_shared_between_processes()
+    test_sqlite_cache_expiry_and_pruning()
+    test_sqlite_cache_records()
+    test_backend_selection()
+
+    print("\n" + "=" * 60)
+    print("Cache testing completed!")
+
+
+if __name__ == "__main__":
+    main()
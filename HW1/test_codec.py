@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test script for the JSON codec and the result records.
+Checks canonical output of both backends, record encoding and the per-turn serialization cost -
+no API keys or network access required.
+"""
+
+import importlib
+import json
+import os
+import time
+
+import codec
+from results import (
+    CurrentWeather,
+    DividendDate,
+    Forecast,
+    ForecastEntry,
+    PriceHistory,
+    SearchHit,
+    SearchResults,
+    StockPrice,
+    from_state,
+)
+
+SAMPLES = [
+    {"b": [1, 2.5, "é", None, True], "a": {"z": "°C", "y": -0.1}},
+    [{"ticker": "MSFT", "current_price": 420.45}],
+    "plain",
+    {"1": 2 ** 70},
+]
+
+
+def stdlib_canonical(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def current_weather():
+    return CurrentWeather(location="Berlin, DE", temperature=21.34, feels_like=20.96, humidity=65,
+                          description="clear sky", wind_speed=3.6, wind_unit="m/s", pressure=1013,
+                          observed_at="2025-08-25T21:00Z", source="OpenWeatherMap")
+
+
+def forecast(steps=40):
+    entries = [ForecastEntry(f"2025-08-26T{hour % 24:02d}:00Z", 18.25 + hour / 10, 17.04, 70, 2.449, "light rain")
+               for hour in range(0, steps * 3, 3)]
+    return Forecast("Berlin, DE", 3, {"temp": "°C", "feels_like": "°C", "humidity": "%", "wind_speed": "m/s"},
+                    entries, "OpenWeatherMap")
+
+
+def test_backends():
+    """
+    Test that both backends produce the same canonical JSON.
+    """
+    print("Testing the codec backends")
+    print("=" * 50)
+    backends = {}
+    previous = os.environ.get("AGENT_JSON_CODEC")
+    try:
+        for requested in ("json", "auto"):
+            os.environ["AGENT_JSON_CODEC"] = requested
+            module = importlib.reload(codec)
+            backends[module.BACKEND] = [module.dumps(sample) for sample in SAMPLES]
+            for sample in SAMPLES:
+                assert module.dumps(sample) == stdlib_canonical(sample)
+                assert module.dumps_bytes(sample) == stdlib_canonical(sample).encode("utf-8")
+                assert module.loads(module.dumps(sample)) == sample
+    finally:
+        if previous is None:
+            os.environ.pop("AGENT_JSON_CODEC", None)
+        else:
+            os.environ["AGENT_JSON_CODEC"] = previous
+        importlib.reload(codec)
+    print(f"Result: identical output from {sorted(backends)} (active: {codec.BACKEND})")
+
+
+def test_records():
+    """
+    Test that records encode to the same JSON as the dictionaries the tools built before.
+    """
+    print("\n\nTesting result records")
+    print("=" * 50)
+    weather = current_weather()
+    expected = {
+        "location": "Berlin, DE", "temperature": "21.3°C", "feels_like": "21.0°C", "humidity": "65%",
+        "description": "clear sky", "wind_speed": "3.6 m/s", "pressure": "1013 hPa",
+        "observed_at": "2025-08-25T21:00Z", "source": "OpenWeatherMap",
+    }
+    assert codec.dumps(weather) == stdlib_canonical(expected)
+    # Records read like the dictionaries they replace
+    assert weather == expected and weather["humidity"] == "65%" and "error" not in weather
+
+    steps = forecast(2)
+    assert codec.loads(codec.dumps(steps))["forecast"][1] == {
+        "time": "2025-08-26T03:00Z", "temp": 18.6, "feels_like": 17.0, "humidity": 70, "wind_speed": 2.4,
+        "description": "light rain",
+    }
+    # Records nested in plain values go through to_json() as well
+    assert codec.dumps({"result": weather}) == stdlib_canonical({"result": expected})
+    assert codec.dumps_bytes(weather) == codec.dumps(weather).encode("utf-8")
+    assert not hasattr(weather, "__dict__")
+    print(f"Result: {codec.dumps(weather)}")
+
+
+def test_tool_records():
+    """
+    Test that the records of the other tools encode like their dictionaries and survive a state round trip.
+    """
+    print("\n\nTesting the records of the other tools")
+    print("=" * 50)
+    summary = {"start": "2025-01-02", "end": "2025-08-25", "sessions": 160, "period_return_pct": 12.5,
+               "high": {"price": 450.1, "date": "2025-07-10"}, "moving_averages": {"sma_50": 430.2}}
+    hits = [SearchHit("Rust vs Go", "Both are fast.", "https://example.com/a", 0.9),
+            SearchHit("Go or Rust?", "It depends.", "https://example.com/b", 0.7)]
+    search = SearchResults("rust vs go", "basic", hits)
+    cases = [
+        (StockPrice("MSFT", 420.45), {"ticker": "MSFT", "current_price": 420.45}),
+        (DividendDate("KO", 1757894400), {"ticker": "KO", "dividend_date": 1757894400}),
+        (PriceHistory("MSFT", "1y", summary, "Yahoo Finance"),
+         dict({"ticker": "MSFT", "period": "1y"}, **summary, source="Yahoo Finance")),
+        (search, {"query": "rust vs go", "search_type": "basic", "results_count": 2, "results": [
+            {"title": "Rust vs Go", "content": "Both are fast.", "url": "https://example.com/a", "score": 0.9},
+            {"title": "Go or Rust?", "content": "It depends.", "url": "https://example.com/b", "score": 0.7}]}),
+    ]
+    for record, expected in cases:
+        assert codec.dumps(record) == stdlib_canonical(expected) and record == expected
+        # Raw state, as the SQLite cache stores it
+        restored = from_state(codec.loads(codec.dumps(record.to_state())))
+        assert type(restored) is type(record) and codec.dumps(restored) == codec.dumps(record)
+    assert all(isinstance(hit, SearchHit) for hit in from_state(search.to_state()).results)
+    print(f"Result: {', '.join(type(record).__name__ for record, _ in cases)} encode like their dictionaries")
+
+
+def test_serialization_cost():
+    """
+    Compare building and serializing a forecast as dictionaries and as records,
+    for a fresh result and for a cached one served again.
+    """
+    print("\n\nTesting the serialization cost per tool turn")
+    print("=" * 50)
+
+    def as_dict():
+        # How get_weather built a forecast before records
+        return {
+            "location": "Berlin, DE", "interval_hours": 3,
+            "units": {"temp": "°C", "feels_like": "°C", "humidity": "%", "wind_speed": "m/s"},
+            "forecast": [{"time": f"2025-08-26T{hour % 24:02d}:00Z", "temp": round(18.25 + hour / 10, 1),
+                          "feels_like": round(17.04, 1), "humidity": int(70), "wind_speed": round(2.449, 1),
+                          "description": "light rain"} for hour in range(0, 120, 3)],
+            "source": "OpenWeatherMap",
+        }
+
+    rounds = 300
+    cached_dict, cached_record = as_dict(), forecast()
+    timings = {}
+    for name, build, cached in (("dict", as_dict, cached_dict), ("record", forecast, cached_record)):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            codec.dumps(build())
+        fresh = (time.perf_counter() - started) / rounds
+        started = time.perf_counter()
+        for _ in range(rounds):
+            codec.dumps(cached)
+        timings[name] = (fresh, (time.perf_counter() - started) / rounds)
+        print(f"{name:6s}: fresh {fresh * 1e6:7.1f} us, cached {timings[name][1] * 1e6:7.1f} us")
+
+    assert codec.dumps(cached_record) == codec.dumps(cached_dict)
+    # A cached record is encoded once, not on every hit
+    assert timings["record"][1] * 5 < timings["dict"][1]
+    print(f"Result: cached forecast serialized {timings['dict'][1] / timings['record'][1]:.0f}x faster "
+          f"({codec.BACKEND} backend)")
+
+
+def main():
+    """
+    Main function to run all codec tests.
+    """
+    print("JSON Codec Testing Suite")
+    print("=" * 60)
+
+    test_backends()
+    test_records()
+    test_tool_records()
+    test_serialization_cost()
+
+    print("\n" + "=" * 60)
+    print("JSON codec testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for request deadline propagation.
+Runs offline - no API keys or network access required.
+"""
+
+import os
+import threading
+import time
+
+from deadline import (
+    DeadlineExceeded,
+    TooManyAbandonedCalls,
+    abandoned_workers,
+    call_with_timeout,
+    current_deadline,
+    deadline_scope,
+    remaining_timeout,
+)
+
+
+def test_remaining_timeout():
+    """
+    Test that hop timeouts are capped by the remaining budget.
+    """
+    print("Testing remaining timeout")
+    print("=" * 50)
+    assert remaining_timeout(10) == 10
+    with deadline_scope(0.5):
+        timeout = remaining_timeout(10)
+        assert 0.4 < timeout <= 0.5
+        assert remaining_timeout(0.1) == 0.1
+    assert current_deadline() is None
+    print(f"Result: 10 s hop capped to {timeout:.2f} s")
+
+
+def test_nested_scope_cannot_extend():
+    """
+    Test that an inner scope never extends the outer deadline.
+    """
+    print("\n\nTesting nested deadline scopes")
+    print("=" * 50)
+    with deadline_scope(0.2) as outer:
+        with deadline_scope(60) as inner:
+            assert inner is outer
+        with deadline_scope(0.1) as shorter:
+            assert shorter.expires_at < outer.expires_at
+    print("Result: inner scopes only shorten the deadline")
+
+
+def test_expired_deadline():
+    """
+    Test that hops fail fast once the deadline has passed.
+    """
+    print("\n\nTesting expired deadline")
+    print("=" * 50)
+    with deadline_scope(0.01):
+        time.sleep(0.02)
+        try:
+            remaining_timeout(5)
+            raise AssertionError("expected DeadlineExceeded")
+        except DeadlineExceeded:
+            pass
+    print("Result: DeadlineExceeded raised")
+
+
+def test_call_with_timeout():
+    """
+    Test that blocking calls are abandoned at the timeout and see the deadline.
+    """
+    print("\n\nTesting blocking call with timeout")
+    print("=" * 50)
+    start = time.monotonic()
+    try:
+        call_with_timeout(time.sleep, 0.05, 1)
+        raise AssertionError("expected DeadlineExceeded")
+    except DeadlineExceeded:
+        pass
+    elapsed = time.monotonic() - start
+    assert elapsed < 0.5
+    with deadline_scope(5):
+        assert call_with_timeout(current_deadline, 1) is current_deadline()
+    try:
+        call_with_timeout(int, 1, "not a number")
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+    print(f"Result: gave up after {elapsed * 1000:.0f} ms")
+
+
+def test_hung_calls_do_not_block():
+    """
+    Test that calls still running after their timeout do not delay later calls.
+    """
+    print("\n\nTesting hung blocking calls")
+    print("=" * 50)
+    release = threading.Event()
+    before = abandoned_workers()
+    for _ in range(20):
+        try:
+            call_with_timeout(release.wait, 0.01)
+            raise AssertionError("expected DeadlineExceeded")
+        except DeadlineExceeded:
+            pass
+    assert abandoned_workers() - before == 20
+
+    # A fixed pool of workers would be full of hung calls by now
+    start = time.monotonic()
+    assert call_with_timeout(lambda: "quote", 1) == "quote"
+    elapsed = time.monotonic() - start
+    release.set()
+    deadline = time.monotonic() + 2
+    while abandoned_workers() > before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    print(f"Call after 20 hung ones took {elapsed * 1000:.1f} ms, "
+          f"{abandoned_workers() - before} abandoned workers left after they finished")
+    assert elapsed < 0.1 and abandoned_workers() == before
+
+    # A provider that keeps hanging fails fast once the limit of abandoned calls is reached
+    release.clear()
+    os.environ["AGENT_MAX_ABANDONED_CALLS"] = str(before + 5)
+    try:
+        for _ in range(5):
+            try:
+                call_with_timeout(release.wait, 0.01)
+            except DeadlineExceeded:
+                pass
+        start = time.monotonic()
+        try:
+            call_with_timeout(release.wait, 1)
+            raise AssertionError("expected TooManyAbandonedCalls")
+        except TooManyAbandonedCalls as e:
+            print(f"Rejected after {(time.monotonic() - start) * 1000:.1f} ms: {e}")
+        release.set()
+        deadline = time.monotonic() + 2
+        while abandoned_workers() > before and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Calls start again once the hung ones have finished
+        assert call_with_timeout(lambda: "quote", 1) == "quote"
+    finally:
+        del os.environ["AGENT_MAX_ABANDONED_CALLS"]
+    print(f"Result: {abandoned_workers() - before} abandoned workers left")
+
+
+def main():
+    """
+    Main function to run all deadline tests.
+    """
+    print("Deadline Testing Suite")
+    print("=" * 60)
+
+    test_remaining_timeout()
+    test_nested_scope_cannot_extend()
+    test_expired_deadline()
+    test_call_with_timeout()
+    test_hung_calls_do_not_block()
+
+    print("\n" + "=" * 60)
+    print("Deadline testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for the conversation history compaction.
+Runs offline - no API keys or network access required.
+"""
+
+import json
+
+from history import (
+    SUMMARY_PREFIX,
+    TRUNCATION_REASON,
+    compact_history,
+    count_tokens,
+    evict_stale_tool_results,
+)
+
+
+def build_session(turns):
+    """
+    Build a long synthetic session with one stock lookup per turn.
+    """
+    messages = [{"role": "system", "content": "You are a helpful AI assistant."}]
+    for turn in range(turns):
+        tool_id = f"call_{turn}"
+        messages.append({"role": "user", "content": f"What is the price of MSFT now? (question {turn})"})
+        messages.append({
+            "role": "assistant",
+            "tool_calls": [{
+                "id": tool_id,
+                "type": "function",
+                "function": {"name": "get_stock_price", "arguments": json.dumps({"ticker": "MSFT"})},
+            }],
+        })
+        messages.append({
+            "role": "tool",
+            "tool_call_id": tool_id,
+            "name": "get_stock_price",
+            "content": json.dumps({"ticker": "MSFT", "current_price": 420.0 + turn, "padding": "x" * 400}),
+        })
+        messages.append({"role": "assistant", "content": f"Microsoft trades at {420.0 + turn} USD."})
+    return messages
+
+
+def test_small_history_untouched():
+    """
+    Test that a history under the ceiling is not modified.
+    """
+    print("Testing small history is left untouched")
+    print("=" * 50)
+    messages = build_session(2)
+    before = list(messages)
+    compact_history(messages, max_tokens=10000)
+    assert messages == before
+    print(f"Result: {len(messages)} messages kept")
+
+
+def test_ceiling_enforced():
+    """
+    Test that long sessions are compacted below the hard ceiling.
+    """
+    print("\n\nTesting hard token ceiling")
+    print("=" * 50)
+    max_tokens = 1500
+    messages = build_session(1)
+    for turn in range(1, 60):
+        messages.extend(build_session(turn + 1)[-4:])
+        compact_history(messages, max_tokens=max_tokens)
+        assert count_tokens(messages) <= max_tokens, count_tokens(messages)
+
+    summaries = [m for m in messages if m["role"] == "system" and m["content"].startswith(SUMMARY_PREFIX)]
+    assert len(summaries) == 1
+    assert messages[0]["content"] == "You are a helpful AI assistant."
+    assert messages[-1]["content"].startswith("Microsoft trades at 479.0")
+    print(f"Result: {len(messages)} messages, ~{count_tokens(messages)} tokens, one rolling summary")
+
+
+def test_oversized_tool_result():
+    """
+    Test that a single tool result larger than the ceiling is truncated to fit.
+    """
+    print("\n\nTesting an oversized tool result")
+    print("=" * 50)
+    max_tokens = 1500
+    messages = build_session(6)
+    # One search result of ~5000 tokens in the latest turn
+    messages.extend(build_session(7)[-4:-2])
+    messages.append({"role": "tool", "tool_call_id": "call_6", "name": "search_web",
+                     "content": json.dumps({"results": ["x" * 400] * 50})})
+    compact_history(messages, max_tokens=max_tokens)
+    assert count_tokens(messages) <= max_tokens, count_tokens(messages)
+    assert messages[0]["content"] == "You are a helpful AI assistant."
+    assert messages[-1]["tool_call_id"] == "call_6" and messages[-2]["tool_calls"][0]["id"] == "call_6"
+    # The model still receives valid JSON
+    stub = json.loads(messages[-1]["content"])
+    assert stub["reason"] == TRUNCATION_REASON and stub["preview"].startswith('{"results": ["xxx')
+    print(f"Truncated result: {len(messages)} messages, ~{count_tokens(messages)} tokens")
+
+    # Nothing left to truncate: the user message itself is too large and is sent as it is
+    messages = [{"role": "system", "content": "You are a helpful AI assistant."},
+                {"role": "user", "content": "x" * 10000}]
+    compact_history(messages, max_tokens=max_tokens)
+    assert len(messages) == 2 and messages[-1]["content"] == "x" * 10000
+    print(f"Result: an oversized user message is left for the API to judge (~{count_tokens(messages)} tokens)")
+
+
+def test_tool_pairs_kept_together():
+    """
+    Test that no tool message is left without its assistant tool call.
+    """
+    print("\n\nTesting tool call pairing after compaction")
+    print("=" * 50)
+    messages = build_session(30)
+    compact_history(messages, max_tokens=1200)
+    call_ids = {
+        call["id"]
+        for message in messages if message.get("tool_calls")
+        for call in message["tool_calls"]
+    }
+    for message in messages:
+        if message["role"] == "tool":
+            assert message["tool_call_id"] in call_ids
+    print(f"Result: {len(call_ids)} tool calls, all tool results paired")
+
+
+def test_stale_tool_results_evicted():
+    """
+    Test that only old tool results are replaced by a placeholder.
+    """
+    print("\n\nTesting eviction of stale tool results")
+    print("=" * 50)
+    messages = build_session(5)
+    evicted = evict_stale_tool_results(messages, keep_recent=4)
+    tool_messages = [m for m in messages if m["role"] == "tool"]
+    assert evicted == 4
+    assert "evicted" in tool_messages[0]["content"]
+    assert "current_price" in tool_messages[-1]["content"]
+    assert evict_stale_tool_results(messages, keep_recent=4) == 0
+    print(f"Result: {evicted} stale tool results evicted")
+
+
+def main():
+    """
+    Main function to run all history tests.
+    """
+    print("Conversation History Testing Suite")
+    print("=" * 60)
+
+    test_small_history_untouched()
+    test_ceiling_enforced()
+    test_oversized_tool_result()
+    test_tool_pairs_kept_together()
+    test_stale_tool_results_evicted()
+
+    print("\n" + "=" * 60)
+    print("History testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the startup import-time budget.
+Measures `python -X importtime` of the startup path in a fresh interpreter.
+Runs offline - no API keys or network access required.
+"""
+
+import os
+import subprocess
+import sys
+
+# Cumulative import time budget per module, in milliseconds
+IMPORT_BUDGET_MS = {
+    "tools": 100,
+    "main": 150,
+}
+
+# Heavy dependencies that must only be imported when a tool needs them
+LAZY_MODULES = {"yfinance", "pandas", "numpy", "requests", "tavily", "openai", "httpx"}
+
+
+def measure_import(module):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns:
+        tuple: (cumulative import time of the module in ms, set of imported top-level packages)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    cumulative_ms = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        imported.add(name.split(".")[0])
+        if name == module:
+            cumulative_ms = int(cumulative) / 1000
+    return cumulative_ms, imported
+
+
+def test_startup_budget():
+    """
+    Test that importing the startup modules stays within budget and lazy.
+    """
+    print("Testing import time budget")
+    print("=" * 50)
+    for module, budget_ms in IMPORT_BUDGET_MS.items():
+        # Best of three runs to smooth out noise from a cold disk cache
+        runs = [measure_import(module) for _ in range(3)]
+        cumulative_ms = min(run[0] for run in runs)
+        eager = LAZY_MODULES & runs[0][1]
+        print(f"  import {module}: {cumulative_ms:.1f} ms (budget {budget_ms} ms)")
+        assert not eager, f"{module} imports heavy dependencies eagerly: {sorted(eager)}"
+        assert cumulative_ms <= budget_ms, f"{module} import took {cumulative_ms:.1f} ms"
+    print("Result: startup path within budget")
+
+
+def main():
+    """
+    Main function to run the import time tests.
+    """
+    print("Import Time Testing Suite")
+    print("=" * 60)
+
+    test_startup_budget()
+
+    print("\n" + "=" * 60)
+    print("Import time testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test script for the rate-limit aware OpenAI client wrapper.
+Uses a fake client - no API keys or network access required.
+"""
+
+import threading
+
+import httpx
+import openai
+
+from llm_client import RateLimitedClient, parse_reset_duration
+
+
+class FakeRawResponse:
+    def __init__(self, headers, result):
+        self.headers = httpx.Headers(headers)
+        self._result = result
+
+    def parse(self):
+        return self._result
+
+
+class FakeCompletions:
+    """
+    Fake chat.completions endpoint failing with the given status codes first.
+    """
+
+    def __init__(self, failures, headers=None):
+        self.failures = list(failures)
+        self.headers = headers or {}
+        self.calls = 0
+        self.with_raw_response = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.failures:
+            status = self.failures.pop(0)
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            response = httpx.Response(status, request=request, headers={"retry-after-ms": "10"})
+            if status == 429:
+                raise openai.RateLimitError("rate limited", response=response, body=None)
+            raise openai.APIStatusError("server error", response=response, body=None)
+        return FakeRawResponse(self.headers, "completion")
+
+
+class FakeClient:
+    def __init__(self, completions):
+        self.chat = type("Chat", (), {"completions": completions})()
+
+
+def test_parse_reset_duration():
+    """
+    Test parsing of x-ratelimit-reset-* header values.
+    """
+    print("Testing reset duration parsing")
+    print("=" * 50)
+    assert parse_reset_duration("1s") == 1.0
+    assert parse_reset_duration("6m0s") == 360.0
+    assert abs(parse_reset_duration("250ms") - 0.25) < 1e-9
+    assert parse_reset_duration("1h2m3.5s") == 3723.5
+    assert parse_reset_duration("") is None
+    print("Result: all durations parsed")
+
+
+def test_retries_transient_errors():
+    """
+    Test that 429 and 5xx responses are retried until success.
+    """
+    print("\n\nTesting retries on 429 and 503")
+    print("=" * 50)
+    completions = FakeCompletions([429, 503])
+    client = RateLimitedClient(FakeClient(completions), base_delay=0.01, max_delay=0.05)
+    result = client.create_chat_completion(model="gpt-4o", messages=[])
+    assert result == "completion"
+    assert completions.calls == 3
+    assert client.stats["retries"] == 2
+    print(f"Result: succeeded after {client.stats['retries']} retries")
+
+
+def test_permanent_error_not_retried():
+    """
+    Test that client errors such as 400 are raised immediately.
+    """
+    print("\n\nTesting no retry on 400")
+    print("=" * 50)
+    completions = FakeCompletions([400])
+    client = RateLimitedClient(FakeClient(completions), base_delay=0.01)
+    try:
+        client.create_chat_completion(model="gpt-4o", messages=[])
+        raise AssertionError("expected APIStatusError")
+    except openai.APIStatusError as e:
+        assert e.status_code == 400
+    assert completions.calls == 1
+    print("Result: 400 raised without retry")
+
+
+def test_pacing_from_headers():
+    """
+    Test that an exhausted request budget delays the next request until reset.
+    """
+    print("\n\nTesting pacing from rate-limit headers")
+    print("=" * 50)
+    headers = {
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "50ms",
+        "x-ratelimit-remaining-tokens": "10000",
+        "x-ratelimit-reset-tokens": "1s",
+    }
+    client = RateLimitedClient(FakeClient(FakeCompletions([], headers)))
+    client.create_chat_completion(model="gpt-4o", messages=[])
+    delay = client.pacing_delay()
+    assert 0 < delay <= 0.05
+    print(f"Result: next request paced by {delay * 1000:.0f} ms")
+
+
+def test_malformed_headers_and_shared_stats():
+    """
+    Test that bad rate-limit headers are ignored and that concurrent requests are all counted.
+    """
+    print("\n\nTesting malformed headers and concurrent requests")
+    print("=" * 50)
+    headers = {"x-ratelimit-remaining-requests": "", "x-ratelimit-remaining-tokens": "lots",
+               "x-ratelimit-reset-tokens": "soon"}
+    client = RateLimitedClient(FakeClient(FakeCompletions([], headers)))
+    assert client.create_chat_completion(model="gpt-4o", messages=[]) == "completion"
+    assert client.remaining_requests is None and client.remaining_tokens is None
+    client.update_limits(httpx.Headers({"x-ratelimit-remaining-tokens": "900", "x-ratelimit-remaining-requests": "-"}))
+    assert client.remaining_tokens == 900 and client.remaining_requests is None
+
+    threads, calls = 8, 200
+    barrier = threading.Barrier(threads)
+
+    def send():
+        barrier.wait()
+        for _ in range(calls):
+            client.create_chat_completion(model="gpt-4o", messages=[])
+
+    workers = [threading.Thread(target=send) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(f"Result: {client.stats['requests']} requests counted")
+    assert client.stats["requests"] == 1 + threads * calls
+
+
+def main():
+    """
+    Main function to run all client wrapper tests.
+    """
+    print("OpenAI Client Wrapper Testing Suite")
+    print("=" * 60)
+
+    test_parse_reset_duration()
+    test_retries_transient_errors()
+    test_permanent_error_not_retried()
+    test_pacing_from_headers()
+    test_malformed_headers_and_shared_stats()
+
+    print("\n" + "=" * 60)
+    print("Client wrapper testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the load generator.
+Drives a simulated agent with a fixed capacity - no API keys or network access required.
+"""
+
+import random
+import threading
+import time
+
+from loadgen import run_closed_loop, run_open_loop, saturation
+
+CORPUS = [["first question", "follow-up"], ["single question"]]
+TURN_SECONDS = 0.02
+CAPACITY = 4
+
+
+class SimulatedAgent:
+    """
+    Agent stand-in serving at most CAPACITY turns at once; turns saying "fail" raise.
+    """
+
+    def __init__(self):
+        self.slots = threading.BoundedSemaphore(CAPACITY)
+        self.histories = []
+
+    def __call__(self, messages):
+        with self.slots:
+            time.sleep(TURN_SECONDS)
+        self.histories.append(len(messages))
+        if messages[-1]["content"] == "fail":
+            raise RuntimeError("injected")
+        return "answer"
+
+
+def test_closed_loop():
+    """
+    Test that closed-loop throughput is bounded by the agent capacity.
+    """
+    print("Testing closed-loop load")
+    print("=" * 50)
+    agent = SimulatedAgent()
+    low = run_closed_loop(agent, CORPUS, users=1, duration=0.5)
+    high = run_closed_loop(agent, CORPUS, users=16, duration=0.5)
+    print(f"Result: 1 user {low['throughput_tps']} turns/s, 16 users {high['throughput_tps']} turns/s")
+    assert low["errors"] == high["errors"] == 0
+    # Follow-up turns carry the history: system, user, assistant, user
+    assert max(agent.histories) == 4
+    assert 25 <= low["throughput_tps"] <= 55
+    assert high["throughput_tps"] <= CAPACITY / TURN_SECONDS * 1.1
+    assert high["latency_p95_ms"] > low["latency_p95_ms"]
+
+
+def test_open_loop_queueing():
+    """
+    Test that queueing delay grows once the arrival rate exceeds capacity.
+    """
+    print("\n\nTesting open-loop queueing delay")
+    print("=" * 50)
+    agent = SimulatedAgent()
+    light = run_open_loop(agent, CORPUS, rate=20, workers=CAPACITY, duration=0.6, rng=random.Random(1))
+    heavy = run_open_loop(agent, CORPUS, rate=300, workers=CAPACITY, duration=0.6, rng=random.Random(1))
+    print(f"Result: queue p95 {light['queue_p95_ms']} ms at 20/s, {heavy['queue_p95_ms']} ms at 300/s")
+    assert light["queue_p95_ms"] < 30
+    assert heavy["queue_p95_ms"] > 200
+    assert heavy["throughput_tps"] <= CAPACITY / TURN_SECONDS * 1.1
+
+
+def test_errors_and_saturation():
+    """
+    Test error accounting and the saturation point of a sweep.
+    """
+    print("\n\nTesting errors and saturation")
+    print("=" * 50)
+    summary = run_closed_loop(SimulatedAgent(), [["ok", "fail", "never sent"]], users=2, duration=0.2)
+    assert summary["errors"] == summary["turns"] // 2
+    assert summary["error_rate"] == 0.5
+
+    levels = [
+        {"level": 1, "throughput_tps": 10.0, "error_rate": 0.0},
+        {"level": 8, "throughput_tps": 60.0, "error_rate": 0.005},
+        {"level": 32, "throughput_tps": 80.0, "error_rate": 0.2},
+    ]
+    assert saturation(levels, 0.01)["level"] == 8
+    assert saturation(levels, 0.0)["level"] == 1
+    assert saturation(levels[2:], 0.01) is None
+    print(f"Result: error rate {summary['error_rate']}, saturation at level {saturation(levels, 0.01)['level']}")
+
+
+def main():
+    """
+    Main function to run all load generator tests.
+    """
+    print("Load Generator Testing Suite")
+    print("=" * 60)
+
+    test_closed_loop()
+    test_open_loop_queueing()
+    test_errors_and_saturation()
+
+    print("\n" + "=" * 60)
+    print("Load generator testing completed!")
+
+
+if __name__ == "__main__":
+    main()
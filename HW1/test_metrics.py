@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for the metrics registry and the Prometheus endpoint.
+Runs offline - no API keys or network access required.
+"""
+
+import threading
+import urllib.request
+
+import metrics
+from metrics import Counter, Histogram
+
+
+def test_counter_across_threads():
+    """
+    Test that per-thread shards add up to the exact total.
+    """
+    print("Testing counter shards across threads")
+    print("=" * 50)
+    counter = Counter("test_events_total", "Test events", ["kind"])
+
+    def work():
+        for _ in range(10000):
+            counter.inc(kind="a")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.values() == {("a",): 80000}
+    print("Result: 80000 increments from 8 threads counted")
+
+
+def test_finished_thread_shards_retired():
+    """
+    Test that the shards of finished threads are folded into the totals and dropped.
+    """
+    print("\n\nTesting shards of short-lived threads")
+    print("=" * 50)
+    counter = Counter("test_short_lived_total", "Test events", ["kind"])
+    histogram = Histogram("test_short_lived_seconds", "Test latency")
+
+    def record():
+        counter.inc(kind="a")
+        histogram.observe(0.02)
+
+    for round_ in range(3):
+        threads = [threading.Thread(target=record) for _ in range(200)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.values() == {("a",): 200 * (round_ + 1)}
+        assert histogram.values()[()][2] == 200 * (round_ + 1)
+    counter.inc(kind="b")
+    assert counter.values() == {("a",): 600, ("b",): 1}
+    # Only the shard of the main thread is left
+    assert len(counter._shards) == 1 and len(histogram._shards) == 0
+    print(f"Result: 600 increments from 600 threads counted, {len(counter._shards)} live shard kept")
+
+
+def test_histogram_rendering():
+    """
+    Test cumulative bucket rendering in the text format.
+    """
+    print("\n\nTesting histogram rendering")
+    print("=" * 50)
+    histogram = Histogram("test_latency_seconds", "Test latency", ["tool"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, tool="get_weather")
+    lines = histogram.render()
+    assert 'test_latency_seconds_bucket{tool="get_weather",le="0.1"} 2' in lines
+    assert 'test_latency_seconds_bucket{tool="get_weather",le="1.0"} 3' in lines
+    assert 'test_latency_seconds_bucket{tool="get_weather",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{tool="get_weather"} 4' in lines
+    print("\n".join(lines))
+
+
+def test_llm_cost_and_endpoint():
+    """
+    Test LLM cost accounting and scraping the /metrics endpoint.
+    """
+    print("\n\nTesting LLM metrics and /metrics endpoint")
+    print("=" * 50)
+    metrics.record_llm_call("gpt-4o", 0.8, {"prompt_tokens": 1000, "cached_tokens": 400, "completion_tokens": 100})
+    cost = metrics.llm_cost.values()[("gpt-4o",)]
+    assert abs(cost - (600 * 2.50 + 400 * 1.25 + 100 * 10.00) / 1_000_000) < 1e-12
+
+    server = metrics.start_server(port=0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+    assert "# TYPE agent_llm_tokens_total counter" in body
+    assert 'agent_llm_tokens_total{model="gpt-4o",type="cached"} 400' in body
+    print(f"Result: scraped {len(body.splitlines())} lines, cost ${cost:.6f}")
+
+
+def main():
+    """
+    Main function to run all metrics tests.
+    """
+    print("Metrics Testing Suite")
+    print("=" * 60)
+
+    test_counter_across_threads()
+    test_finished_thread_shards_retired()
+    test_histogram_rendering()
+    test_llm_cost_and_endpoint()
+
+    print("\n" + "=" * 60)
+    print("Metrics testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for the mock upstream server.
+Runs the tools and a full agent turn against mock_server.py - no API keys or network access required.
+"""
+
+import os
+
+import requests
+
+from mock_server import mock_environment, start_mock_server
+
+FAST = {"*": {"latency_ms": 0}}
+
+
+def test_tools_against_mock(server):
+    """
+    Test that every tool reaches its mock endpoint through the base-URL overrides.
+    """
+    from tools import get_dividend_date, get_stock_price, get_weather, search_web
+
+    print("Testing tools against the mock server")
+    print("=" * 50)
+    results = {
+        "get_stock_price": get_stock_price("MSFT"),
+        "get_dividend_date": get_dividend_date("MSFT"),
+        "get_weather (OpenWeatherMap)": get_weather("London,UK"),
+        "get_weather (IP location)": get_weather(),
+        "get_weather (forecast)": get_weather("London,UK", mode="forecast"),
+        "search_web": search_web("python release news"),
+    }
+    openweather_api_key = os.environ.pop("OPENWEATHER_API_KEY")
+    try:
+        results["get_weather (Open-Meteo)"] = get_weather("Oslo, Norway")
+    finally:
+        os.environ["OPENWEATHER_API_KEY"] = openweather_api_key
+    for name, result in results.items():
+        print(f"{name}: {str(result)[:120]}")
+        assert "error" not in result, result
+
+    assert isinstance(results["get_stock_price"]["current_price"], float)
+    assert results["get_weather (IP location)"]["location"].startswith("Prague")
+    assert results["search_web"]["results_count"] == 5
+    counts = server.state.requests
+    assert counts["yahoo"] == 2 and counts["ipapi"] == 1 and counts["tavily"] == 1, counts
+    assert counts["openweathermap"] == 3 and counts["open_meteo"] == 2, counts
+    forecast = results["get_weather (forecast)"]["forecast"]
+    assert len(forecast) == 40 and isinstance(forecast[0]["temp"], float)
+    print(f"Result: upstream requests {counts}")
+
+
+def test_full_turn(server):
+    """
+    Test a complete agent turn (completion, tool call, completion) against the mock.
+    """
+    from main import get_completion_from_messages
+
+    print("\n\nTesting a full agent turn")
+    print("=" * 50)
+    before = server.state.requests["openai"]
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": "What's the stock price of Apple (AAPL)?"},
+    ]
+    response = get_completion_from_messages(messages)
+    print(f"Response: {response.content}")
+    assert "current_price" in response.content
+    assert server.state.requests["openai"] - before == 2
+    print("Result: two completions and one tool call")
+
+
+def test_failure_injection():
+    """
+    Test injected errors and rate limiting.
+    """
+    print("\n\nTesting failure injection")
+    print("=" * 50)
+    server = start_mock_server(config={
+        "*": {"latency_ms": 0},
+        "yahoo": {"error_rate": 1.0},
+        "ipapi": {"rate_limit": 1, "burst": 2},
+    })
+    base_url = mock_environment(server)["YAHOO_BASE_URL"]
+    try:
+        failed = requests.get(f"{base_url}/v7/finance/quote", params={"symbols": "MSFT"}, timeout=5)
+        statuses = [requests.get(f"{base_url}/json/", timeout=5).status_code for _ in range(4)]
+        limited = requests.get(f"{base_url}/json/", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert failed.status_code == 500
+    assert statuses[:2] == [200, 200] and 429 in statuses, statuses
+    assert limited.status_code == 429 and int(limited.headers["retry-after-ms"]) > 0
+    print(f"Result: injected error {failed.status_code}, ipapi statuses {statuses + [limited.status_code]}")
+
+
+def main():
+    """
+    Main function to run all mock server tests.
+    """
+    print("Mock Server Testing Suite")
+    print("=" * 60)
+
+    server = start_mock_server(config=FAST)
+    os.environ.update(mock_environment(server))
+    try:
+        test_tools_against_mock(server)
+        test_full_turn(server)
+    finally:
+        server.shutdown()
+        server.server_close()
+    test_failure_injection()
+
+    print("\n" + "=" * 60)
+    print("Mock server testing completed!")
+
+
+if __name__ == "__main__":
+    main()
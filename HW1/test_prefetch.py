@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for speculative tool prefetch.
+Checks call prediction, result reuse and a full turn against mock_server.py - no API keys or network access required.
+"""
+
+import os
+import time
+
+from openai.types.chat import ChatCompletionMessage
+
+from cache import MemoryCache
+from mock_server import mock_environment, start_mock_server
+from prefetch import Prefetcher, get_prefetch_stats, predict_calls, reset_prefetch_stats
+from registry import ToolRegistry
+
+
+def test_predict_calls():
+    """
+    Test which calls are predicted from user messages.
+    """
+    print("Testing call prediction")
+    print("=" * 50)
+    cases = {
+        "What's the weather like in London?": [("get_weather", {"location": "London"})],
+        "Will it rain in new york tomorrow?": [("get_weather", {"location": "New York", "mode": "forecast"})],
+        "What's the stock price of Apple (AAPL)?": [("get_stock_price", {"ticker": "AAPL"})],
+        "How is Tesla stock doing?": [("get_stock_price", {"ticker": "TSLA"})],
+        "When is the next dividend of Coca-Cola (KO)?": [("get_dividend_date", {"ticker": "KO"})],
+        "Is MSFT trading higher today?": [("get_stock_price", {"ticker": "MSFT"})],
+        # Unknown city, ambiguous upper-case word, free-text search: nothing to predict
+        "What's the weather like in Smallville?": [],
+        "I need HELP with my stock portfolio": [],
+        "Search for the latest news about electric cars.": [],
+    }
+    for text, expected in cases.items():
+        predicted = predict_calls(text)
+        print(f"{text!r}: {predicted}")
+        assert predicted == expected, (text, predicted)
+    print("Result: predictions match")
+
+
+def test_prefetcher_reuse():
+    """
+    Test that a prefetched call is reused, overlaps the completion and unused calls are dropped.
+    """
+    print("\n\nTesting result reuse")
+    print("=" * 50)
+    registry = ToolRegistry(cache=MemoryCache())
+    calls = []
+
+    @registry.tool()
+    def get_stock_price(ticker: str):
+        """Get a stock price."""
+        calls.append(ticker)
+        time.sleep(0.2)
+        return {"ticker": ticker, "current_price": 1.0}
+
+    @registry.tool()
+    def get_weather(location: str = None, mode: str = "current"):
+        """Get the weather."""
+        calls.append(location)
+        return {"location": location}
+
+    reset_prefetch_stats()
+    messages = [{"role": "user", "content": "Price of Apple (AAPL) and the weather in Paris?"}]
+    prefetcher = Prefetcher(registry)
+    assert len(prefetcher.start(messages)) == 2
+    time.sleep(0.2)  # the first completion would be running here
+
+    started = time.perf_counter()
+    result = prefetcher.take("get_stock_price", {"ticker": "AAPL"})
+    waited = time.perf_counter() - started
+    assert result == {"ticker": "AAPL", "current_price": 1.0}
+    assert waited < 0.1, waited
+    # Arguments at their default value match the prediction without them
+    assert prefetcher.take("get_weather", {"location": "Paris", "mode": "current"}) == {"location": "Paris"}
+    assert prefetcher.take("get_stock_price", {"ticker": "MSFT"}) is None
+
+    # A later turn of a conversation that holds the assistant's message object
+    wasted = Prefetcher(registry)
+    conversation = [{"role": "user", "content": "Price of Apple (AAPL)?"},
+                    ChatCompletionMessage(role="assistant", content="Apple (AAPL) trades at 1.0."),
+                    {"role": "user", "content": "Weather in Oslo?"}]
+    assert wasted.start(conversation) == [("get_weather", {"location": "Oslo"})]
+    wasted.discard()
+
+    stats = get_prefetch_stats()
+    print(f"Result: waited {waited * 1000:.0f} ms for the prefetched call, stats {stats}")
+    assert calls.count("AAPL") == 1 and calls.count("MSFT") == 0
+    assert (stats["predicted"], stats["hits"], stats["misses"], stats["wasted"]) == (3, 2, 1, 1)
+    assert abs(stats["hit_rate"] - 2 / 3) < 1e-9
+
+
+def test_turn_with_prefetch():
+    """
+    Test that prefetching takes the tool call off the critical path of a full turn.
+    """
+    from main import get_completion_from_messages
+    from tools import registry
+
+    print("\n\nTesting a full turn with prefetch")
+    print("=" * 50)
+    server = start_mock_server(config={"*": {"latency_ms": 150, "latency_sigma": 0}})
+    os.environ.update(mock_environment(server))
+    try:
+        # Warm up imports, the client and connections outside the measurement
+        get_completion_from_messages([{"role": "user", "content": "Stock price of Tesla (TSLA)?"}], prefetch=False)
+        durations = {}
+        for prefetch in (False, True):
+            registry.cache.clear()
+            reset_prefetch_stats()
+            before = server.state.requests["yahoo"]
+            messages = [
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": "What's the stock price of Apple (AAPL)?"},
+            ]
+            started = time.perf_counter()
+            response = get_completion_from_messages(messages, prefetch=prefetch)
+            durations[prefetch] = time.perf_counter() - started
+            assert "current_price" in response.content
+            assert server.state.requests["yahoo"] - before == 1
+            print(f"prefetch={prefetch}: {durations[prefetch] * 1000:.0f} ms, stats {get_prefetch_stats()}")
+        assert get_prefetch_stats()["hits"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Two completions and one quote at 150 ms each; the quote overlaps the first completion
+    print(f"Result: {durations[False] * 1000:.0f} ms without, {durations[True] * 1000:.0f} ms with prefetch")
+    assert durations[False] - durations[True] > 0.08
+
+
+def main():
+    """
+    Main function to run all prefetch tests.
+    """
+    print("Prefetch Testing Suite")
+    print("=" * 60)
+
+    test_predict_calls()
+    test_prefetcher_reuse()
+    test_turn_with_prefetch()
+
+    print("\n" + "=" * 60)
+    print("Prefetch testing completed!")
+
+
+if __name__ == "__main__":
+    main()
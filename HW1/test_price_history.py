@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test script for the price history tool and its columnar cache.
+Checks the bar store, the analytics and incremental fetching, then runs the tool against
+mock_server.py - no API keys or network access required.
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+
+from mock_server import mock_environment, start_mock_server
+from prices import PriceStore, day_timestamp, load_history, normalize_bars, summarize
+
+
+def bars_for(days, closes):
+    """
+    Build fetched bars for the given days, like the fetch functions of tools.py return them.
+    """
+    return {
+        # Sessions at 14:30 UTC; normalize_bars() cuts them to midnight
+        "timestamp": [day_timestamp(day) + 52200 for day in days],
+        "open": list(closes),
+        "high": [close and close * 1.01 for close in closes],
+        "low": [close and close * 0.99 for close in closes],
+        "close": list(closes),
+        "volume": [1000.0] * len(closes),
+    }
+
+
+def weekdays(start, count):
+    days = []
+    day = start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def test_store():
+    """
+    Test replacing, appending, torn tails and normalization.
+    """
+    print("Testing the columnar bar store")
+    print("=" * 50)
+    days = weekdays(date(2024, 1, 1), 10)
+    with tempfile.TemporaryDirectory() as directory:
+        store = PriceStore(directory)
+        assert store.read("MSFT") is None
+
+        first = normalize_bars(bars_for(days[:6], [10, 11, 12, 13, 14, 15]), before=days[6])
+        with store.locked("MSFT"):
+            store.replace("MSFT", first, covered_from=days[0], checked_through=days[6])
+        columns = store.read("MSFT")
+        assert isinstance(columns["close"], np.memmap)
+        assert list(columns["close"]) == [10, 11, 12, 13, 14, 15]
+        assert columns["timestamp"][0] == day_timestamp(days[0])
+
+        # A torn append: bytes past the committed row count are cut off before the next append
+        close_path = os.path.join(directory, "MSFT", "close.1.f8")
+        with open(close_path, "ab") as close_file:
+            close_file.write(b"\x00" * 5)
+        # Overlapping rows and the unfinished session of `before` are skipped
+        second = normalize_bars(bars_for(days[4:], [14, 15, 16, 17, 18, 19]), before=days[9])
+        with store.locked("MSFT"):
+            appended = store.append("MSFT", second, checked_through=days[9])
+        assert appended == 3 and os.path.getsize(close_path) == 9 * 8
+        assert list(store.read("MSFT")["close"]) == [10, 11, 12, 13, 14, 15, 16, 17, 18]
+
+        # A replacement is a new generation; the old files are gone
+        with store.locked("MSFT"):
+            store.replace("MSFT", first, covered_from=days[0], checked_through=days[6])
+        assert store.meta("MSFT")["generation"] == 2 and not os.path.exists(close_path)
+
+        unsorted = bars_for([days[2], days[0], days[0], days[1]], [3, 1, 1, None])
+        normalized = normalize_bars(unsorted, before=days[9])
+        assert list(normalized["close"]) == [1, 3]
+        try:
+            store.read("../etc")
+            raise AssertionError("expected an invalid ticker error")
+        except ValueError:
+            pass
+    print(f"Result: {appended} sessions appended, torn tail removed")
+
+
+def test_summary():
+    """
+    Test the analytics against values computed by hand.
+    """
+    print("\n\nTesting the summary statistics")
+    print("=" * 50)
+    days = weekdays(date(2024, 1, 1), 6)
+    closes = [100.0, 110.0, 99.0, 88.0, 96.8, 121.0]
+    columns = normalize_bars(bars_for(days, closes), before=date(2024, 2, 1))
+    summary = summarize(columns, days[0])
+    print(f"Result: {summary}")
+
+    returns = np.diff(closes) / closes[:-1]
+    assert summary["sessions"] == 6
+    assert summary["period_return_pct"] == 21.0
+    assert summary["annualized_volatility_pct"] == round(returns.std(ddof=1) * np.sqrt(252) * 100, 2)
+    # Peak 110 on the second day, trough 88 on the fourth: -20%
+    assert summary["max_drawdown_pct"] == -20.0
+    assert summary["max_drawdown_period"] == [days[1].isoformat(), days[3].isoformat()]
+    assert summary["best_day"] == {"return_pct": 25.0, "date": days[5].isoformat()}
+    assert summary["worst_day"]["return_pct"] == -11.11
+    assert summary["high"] == {"price": 122.21, "date": days[5].isoformat()}
+    assert summary["low"]["price"] == 87.12
+    assert summary["average_daily_volume"] == 1000
+    # Too few sessions for any moving average
+    assert summary["moving_averages"] == {}
+
+    # The period starts later, the averages still use all sessions
+    many = normalize_bars(bars_for(weekdays(date(2023, 1, 2), 60), [float(n) for n in range(1, 61)]),
+                          before=date(2024, 1, 1))
+    later = summarize(many, date(2023, 3, 1))
+    assert later["moving_averages"] == {"sma_20": 50.5, "sma_50": 35.5}
+    assert later["last_close_vs_sma_50_pct"] == round((60 / 35.5 - 1) * 100, 2)
+    assert summarize(many, date(2023, 12, 1)) is None
+
+
+class FakeUpstream:
+    """
+    Fetch function over a fixed set of daily closes that can be adjusted like after a split.
+    """
+
+    def __init__(self, days, closes):
+        self.days = days
+        self.closes = list(closes)
+        self.calls = []
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((start, end))
+        selected = [(day, close) for day, close in zip(self.days, self.closes) if start <= day < end]
+        return bars_for([day for day, _ in selected], [close for _, close in selected])
+
+
+def test_incremental_fetch():
+    """
+    Test that only missing sessions are fetched and that adjusted history is fetched again.
+    """
+    print("\n\nTesting incremental fetching")
+    print("=" * 50)
+    days = weekdays(date(2024, 1, 1), 30)
+    upstream = FakeUpstream(days, [100.0 + n for n in range(30)])
+    with tempfile.TemporaryDirectory() as directory:
+        store = PriceStore(directory)
+        columns, fetched = load_history(store, "AAPL", days[0], days[20], upstream)
+        assert fetched == 20 and len(columns["close"]) == 20
+
+        # Same day again: no upstream call at all
+        columns, fetched = load_history(store, "AAPL", days[5], days[20], upstream)
+        assert fetched == 0 and len(upstream.calls) == 1
+
+        # Next days: only the range from the last cached session is fetched
+        columns, fetched = load_history(store, "AAPL", days[0], days[25], upstream)
+        assert fetched == 5 and upstream.calls[-1] == (days[19], days[25])
+        assert list(columns["close"][-3:]) == [122.0, 123.0, 124.0]
+
+        # A 2:1 split adjusts all past closes: the whole range is fetched again
+        upstream.closes = [close / 2 for close in upstream.closes]
+        columns, fetched = load_history(store, "AAPL", days[0], days[28], upstream)
+        assert fetched == 28 and upstream.calls[-1] == (days[0], days[28])
+        assert columns["close"][0] == 50.0 and store.meta("AAPL")["generation"] == 2
+
+        # An earlier start than cached refetches from that start
+        load_history(store, "AAPL", days[0] - timedelta(days=30), days[28], upstream)
+        assert upstream.calls[-1][0] == days[0] - timedelta(days=30)
+    print(f"Result: {len(upstream.calls)} upstream calls: {upstream.calls}")
+    assert len(upstream.calls) == 5
+
+
+def test_tool_against_mock():
+    """
+    Test get_price_history end to end, including the second call served from the local cache.
+    """
+    print("\n\nTesting get_price_history against the mock server")
+    print("=" * 50)
+    server = start_mock_server(config={"*": {"latency_ms": 0}})
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(mock_environment(server))
+        os.environ["AGENT_PRICE_CACHE_DIR"] = directory
+        try:
+            import tools
+            from registry import registry
+
+            registry.cache.clear()
+            result = tools.get_price_history("MSFT", "6mo")
+            print(f"Result: {result}")
+            assert result["ticker"] == "MSFT" and result["period"] == "6mo"
+            assert 120 <= result["sessions"] <= 131
+            assert set(result["moving_averages"]) == {"sma_20", "sma_50", "sma_200"}
+            assert result["max_drawdown_pct"] <= 0 and result["annualized_volatility_pct"] > 0
+            requests = server.state.requests["yahoo"]
+
+            # A longer period from the same local history: no further upstream request
+            registry.cache.clear()
+            longer = tools.get_price_history("msft", "1y")
+            assert longer["sessions"] > result["sessions"]
+            assert longer["last_close"] == result["last_close"]
+            assert server.state.requests["yahoo"] == requests
+
+            assert "error" in tools.get_price_history("MSFT", "10y")
+            assert "error" in tools.get_price_history(" ")
+        finally:
+            tools._price_store = None
+            os.environ.pop("AGENT_PRICE_CACHE_DIR", None)
+            server.shutdown()
+            server.server_close()
+    print(f"Result: {requests} upstream request(s) for two periods")
+
+
+def main():
+    """
+    Main function to run all price history tests.
+    """
+    print("Price History Testing Suite")
+    print("=" * 60)
+
+    test_store()
+    test_summary()
+    test_incremental_fetch()
+    test_tool_against_mock()
+
+    print("\n" + "=" * 60)
+    print("Price history testing completed!")
+
+
+if __name__ == "__main__":
+    main()
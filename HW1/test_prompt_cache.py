@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for prompt caching support.
+Checks that the request prefix does not depend on the order tools are registered in, and
+the accounting of token usage across threads - no API keys or network access required.
+"""
+
+import asyncio
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import requests
+
+from codec import dumps as dump_json
+from main import build_request, get_usage_stats, record_usage, request_tools
+from registry import ToolRegistry
+from server import AgentServer
+from tools import tools
+
+
+def build_registry(order):
+    """
+    Build a registry with three tools registered in the given order.
+    """
+    def get_weather(location: str, units: str = "metric"):
+        """Get the current weather."""
+        return {}
+
+    def get_stock_price(ticker: str):
+        """Get a stock price."""
+        return {}
+
+    def search_web(query: str, max_results: int = 5):
+        """Search the web."""
+        return {}
+
+    functions = {function.__name__: function for function in (get_weather, get_stock_price, search_web)}
+    registry = ToolRegistry()
+    for name in order:
+        registry.register(functions[name])
+    return registry
+
+
+def test_prefix_stability():
+    """
+    Test that the tool schemas serialize to the same bytes in any registration order.
+    """
+    print("Testing the stability of the request prefix")
+    print("=" * 50)
+    names = ["get_weather", "get_stock_price", "search_web"]
+    reference = build_registry(names).schemas_json()
+    for _ in range(5):
+        random.shuffle(names)
+        assert build_registry(names).schemas_json() == reference, names
+
+    messages = [{"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": "What's the weather like in London?"}]
+    assert dump_json(build_request(messages, "gpt-4o")) == dump_json(build_request(list(messages), "gpt-4o"))
+    names = [tool["function"]["name"] for tool in request_tools]
+    assert names == sorted(tool["function"]["name"] for tool in tools)
+    print(f"Result: {len(reference)} bytes of tool schemas, identical for every order")
+
+
+def fake_response(prompt, cached, completion):
+    details = SimpleNamespace(cached_tokens=cached)
+    usage = SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, prompt_tokens_details=details)
+    return SimpleNamespace(usage=usage)
+
+
+def test_record_usage():
+    """
+    Test usage accounting of single completions and of many concurrent ones.
+    """
+    print("\n\nTesting token usage accounting")
+    print("=" * 50)
+    before = get_usage_stats()
+    assert record_usage(SimpleNamespace(usage=None)) == {}
+    assert record_usage(fake_response(1000, 0, 50)) == \
+        {"prompt_tokens": 1000, "cached_tokens": 0, "completion_tokens": 50}
+    record_usage(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=200, completion_tokens=10,
+                                                       prompt_tokens_details=None)))
+
+    threads, calls = 8, 2000
+    barrier = threading.Barrier(threads)
+
+    def record():
+        barrier.wait()
+        for _ in range(calls):
+            record_usage(fake_response(100, 64, 5))
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(record) for _ in range(threads)]:
+            future.result()
+
+    after = get_usage_stats()
+    delta = {key: after[key] - before[key] for key in ("requests", "prompt_tokens", "cached_tokens",
+                                                       "completion_tokens")}
+    print(f"Recorded: {delta}, cached ratio {after['cached_ratio']:.2f}")
+    # No update was lost between the threads
+    assert delta == {"requests": 2 + threads * calls, "prompt_tokens": 1200 + threads * calls * 100,
+                     "cached_tokens": threads * calls * 64, "completion_tokens": 60 + threads * calls * 5}
+    assert after["cached_ratio"] == after["cached_tokens"] / after["prompt_tokens"]
+    print("Result: all concurrent updates were counted")
+
+
+def test_usage_endpoint():
+    """
+    Test that the HTTP service exports the usage counters.
+    """
+    print("\n\nTesting the usage endpoint")
+    print("=" * 50)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = AgentServer(port=0, workers=1, turn=lambda messages, model, on_event: "ok")
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    try:
+        response = requests.get(f"http://127.0.0.1:{server.port}/v1/usage", timeout=10)
+    finally:
+        asyncio.run_coroutine_threadsafe(server.drain(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+    print(f"Result: {response.status_code} {response.json()}")
+    assert response.status_code == 200 and response.json() == get_usage_stats()
+
+
+def main():
+    """
+    Main function to run all prompt caching tests.
+    """
+    print("Prompt Caching Testing Suite")
+    print("=" * 60)
+
+    test_prefix_stability()
+    test_record_usage()
+    test_usage_endpoint()
+
+    print("\n" + "=" * 60)
+    print("Prompt caching testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-provider token-bucket rate limiter.
+Runs offline - no API keys or network access required.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+from ratelimit import FileTokenBucket, TokenBucket, UnlimitedBucket, get_bucket
+
+
+def test_token_bucket_burst_and_refill():
+    """
+    Test that a bucket allows a burst and then refills at the configured rate.
+    """
+    print("Testing in-process token bucket")
+    print("=" * 50)
+    bucket = TokenBucket(rate=20.0, burst=3)
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.05
+    time.sleep(wait)
+    assert bucket.try_acquire() == 0.0
+    print(f"Result: burst of 3 allowed, 4th request waited {wait * 1000:.0f} ms")
+
+
+def _take_tokens(path, results):
+    bucket = FileTokenBucket(rate=0.001, burst=10, path=path)
+    results.put(sum(1 for _ in range(10) if bucket.try_acquire() == 0.0))
+
+
+def test_file_bucket_shared_between_processes():
+    """
+    Test that file-backed buckets share one quota across processes.
+    """
+    print("\n\nTesting cross-process file token bucket")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "yahoo.bucket")
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=_take_tokens, args=(path, results)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        granted = sum(results.get() for _ in workers)
+    assert granted == 10, granted
+    print(f"Result: 4 processes were granted {granted} tokens from a burst of 10")
+
+
+def test_overrides():
+    """
+    Test RATE_LIMIT_<PROVIDER> overrides, including 0 to disable a limit and invalid values.
+    """
+    print("\n\nTesting limit overrides")
+    print("=" * 50)
+    os.environ["RATE_LIMIT_OVERRIDE_DISABLED"] = "0"
+    os.environ["RATE_LIMIT_OVERRIDE_CUSTOM"] = "5:20"
+    try:
+        disabled = get_bucket("override_disabled")
+        assert isinstance(disabled, UnlimitedBucket)
+        assert all(disabled.try_acquire() == 0.0 for _ in range(1000))
+        custom = get_bucket("override_custom")
+        assert (custom.rate, custom.burst) == (5.0, 20.0)
+        for provider, value in (("override_negative", "-1:5"), ("override_burst", "1:0"), ("override_text", "fast")):
+            os.environ[f"RATE_LIMIT_{provider.upper()}"] = value
+            try:
+                get_bucket(provider)
+                raise AssertionError(f"{value!r} was accepted")
+            except ValueError as e:
+                print(f"Rejected: {e}")
+    finally:
+        for name in [name for name in os.environ if name.startswith("RATE_LIMIT_OVERRIDE_")]:
+            del os.environ[name]
+    print("Result: 0 disables the limit, invalid overrides are rejected")
+
+
+def main():
+    """
+    Main function to run all rate limiter tests.
+    """
+    print("Rate Limiter Testing Suite")
+    print("=" * 60)
+
+    test_token_bucket_burst_and_refill()
+    test_file_bucket_shared_between_processes()
+    test_overrides()
+
+    print("\n" + "=" * 60)
+    print("Rate limiter testing completed!")
+
+
+if __name__ == "__main__":
+    main()
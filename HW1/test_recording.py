@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Test script for the record/replay cassette layer.
+Uses a local HTTP server and a fake OpenAI client - no API keys or network access required.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai.types.chat import ChatCompletion
+
+import recording
+from deadline import DeadlineExceeded, deadline_scope
+from llm_client import RateLimitedClient
+from tools import _http_get
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 1700000000,
+    "model": "gpt-4o",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "It is sunny in Prague."},
+    }],
+    "usage": {"prompt_tokens": 12, "completion_tokens": 6, "total_tokens": 18},
+}
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(0.05)
+        body = json.dumps({"path": self.path.split("?")[0]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeRawResponse:
+    headers = {}
+
+    def parse(self):
+        return ChatCompletion.model_validate(COMPLETION)
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+        completions = type("Completions", (), {})()
+        completions.with_raw_response = self
+        self.chat = type("Chat", (), {"completions": completions})()
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return FakeRawResponse()
+
+
+def test_http_record_and_replay():
+    """
+    Test that HTTP hops are recorded without secrets and replayed offline.
+    """
+    print("Testing HTTP record and replay")
+    print("=" * 50)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/search"
+    params = {"name": "Prague", "appid": "secret-key"}
+
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            recording.configure("record", directory)
+            recorded = _http_get("open_meteo", url, params=params)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        with open(os.path.join(directory, "open_meteo.jsonl")) as cassette_file:
+            assert "secret-key" not in cassette_file.read()
+
+        recording.configure("replay", directory, latency_scale=0.5)
+        started = time.perf_counter()
+        replayed = _http_get("open_meteo", url, params=params)
+        elapsed = time.perf_counter() - started
+
+        recording.configure("replay", directory, latency_scale=0)
+        try:
+            _http_get("open_meteo", url, params={"name": "Brno"})
+            raise AssertionError("expected CassetteMiss")
+        except recording.CassetteMiss:
+            pass
+        recording.configure("off")
+
+    assert replayed.status_code == recorded.status_code == 200
+    assert replayed.json() == recorded.json()
+    assert 0.02 <= elapsed < 0.2, elapsed
+    print(f"Result: replayed {replayed.json()} in {elapsed * 1000:.0f} ms (scaled latency)")
+
+
+def test_completion_record_and_replay():
+    """
+    Test that chat completions are replayed as ChatCompletion objects.
+    """
+    print("\n\nTesting chat completion record and replay")
+    print("=" * 50)
+    request = {"model": "gpt-4o", "messages": [{"role": "user", "content": "Weather in Prague?"}]}
+    fake = FakeClient()
+    with tempfile.TemporaryDirectory() as directory:
+        recording.configure("record", directory)
+        recorded = RateLimitedClient(fake).create_chat_completion(**request)
+        recording.configure("replay", directory, latency_scale=0)
+        replayed = RateLimitedClient(FakeClient()).create_chat_completion(**request)
+        recording.configure("off")
+
+    assert fake.calls == 1
+    assert isinstance(replayed, ChatCompletion)
+    assert replayed.choices[0].message.content == recorded.choices[0].message.content
+    print(f"Result: {replayed.choices[0].message.content}")
+
+
+def test_append_and_deadline():
+    """
+    Test that recording appends one line per call and that replay stops at the request deadline.
+    """
+    print("\n\nTesting cassette appends and the replay deadline")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        # A cassette in the earlier single-document format is read and carried over
+        legacy = [{"key": recording._request_key("slow_api", {"id": -1}), "request": {"id": -1},
+                   "response": {"value": -1}, "latency": 1.0}]
+        with open(os.path.join(directory, "slow_api.json"), "w") as cassette_file:
+            json.dump(legacy, cassette_file)
+
+        recording.configure("record", directory)
+        for index in range(200):
+            recording.call("slow_api", {"id": index}, lambda: {"value": index})
+        with open(os.path.join(directory, "slow_api.jsonl")) as cassette_file:
+            lines = cassette_file.read().splitlines()
+        assert len(lines) == 201 and json.loads(lines[-1])["response"] == {"value": 199}
+
+        recording.configure("replay", directory, latency_scale=1.0)
+        assert recording.call("slow_api", {"id": 5}, None)["value"] == 5
+        started = time.perf_counter()
+        try:
+            with deadline_scope(0.1):
+                recording.call("slow_api", {"id": -1}, None)
+            raise AssertionError("expected DeadlineExceeded")
+        except DeadlineExceeded:
+            pass
+        elapsed = time.perf_counter() - started
+        recording.configure("off")
+
+    print(f"Result: {len(lines)} lines appended, 1 s recorded latency cut off after {elapsed * 1000:.0f} ms")
+    assert elapsed < 0.2
+
+
+def main():
+    """
+    Main function to run all record/replay tests.
+    """
+    print("Record/Replay Testing Suite")
+    print("=" * 60)
+
+    test_http_record_and_replay()
+    test_completion_record_and_replay()
+    test_append_and_deadline()
+
+    print("\n" + "=" * 60)
+    print("Record/replay testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the declarative tool registry.
+Runs offline - no API keys or network access required.
+"""
+
+import json
+from typing import Literal
+
+from registry import ToolRegistry, parse_docstring
+
+
+def make_registry():
+    """
+    Build a registry with a counting example tool.
+    """
+    registry = ToolRegistry()
+    calls = []
+
+    @registry.tool(cache_ttl=60, max_concurrency=2)
+    def convert_units(value: float, unit: Literal["c", "f"] = "c", label: str = None):
+        """
+        Convert a temperature between Celsius and Fahrenheit.
+
+        Args:
+            value (float): Temperature to convert
+            unit (str): Unit of the value: 'c' or 'f'.
+                Defaults to 'c'.
+            label (str, optional): Label added to the result
+
+        Returns:
+            dict: Converted temperature
+        """
+        calls.append(value)
+        if value < -273.15:
+            return {"error": "Below absolute zero"}
+        converted = value * 9 / 5 + 32 if unit == "c" else (value - 32) * 5 / 9
+        return {"value": converted, "label": label}
+
+    return registry, calls
+
+
+def test_schema_from_hints_and_docstring():
+    """
+    Test that the schema is generated from type hints and the docstring.
+    """
+    print("Testing schema generation")
+    print("=" * 50)
+    registry, _ = make_registry()
+    schema = registry.schemas()[0]["function"]
+    assert schema["name"] == "convert_units"
+    assert schema["description"] == "Convert a temperature between Celsius and Fahrenheit."
+    properties = schema["parameters"]["properties"]
+    assert properties["value"] == {"type": "number", "description": "Temperature to convert"}
+    assert properties["unit"]["enum"] == ["c", "f"]
+    assert properties["unit"]["description"] == "Unit of the value: 'c' or 'f'. Defaults to 'c'."
+    assert schema["parameters"]["required"] == ["value"]
+    assert json.loads(registry.schemas_json()) == registry.schemas()
+    print(f"Result: {json.dumps(schema)}")
+
+
+def test_dispatch_with_cache():
+    """
+    Test that dispatch caches successful results but not errors.
+    """
+    print("\n\nTesting dispatch and result caching")
+    print("=" * 50)
+    registry, calls = make_registry()
+    first = registry.dispatch("convert_units", {"value": 100})
+    second = registry.dispatch("convert_units", {"value": 100})
+    assert first == second == {"value": 212.0, "label": None}
+    assert calls == [100]
+    registry.dispatch("convert_units", {"value": -300})
+    registry.dispatch("convert_units", {"value": -300})
+    assert calls == [100, -300, -300]
+    print(f"Result: {len(calls)} calls for 4 dispatches")
+
+
+def test_dispatch_errors():
+    """
+    Test unknown tools and invalid arguments.
+    """
+    print("\n\nTesting dispatch errors")
+    print("=" * 50)
+    registry, calls = make_registry()
+    assert "Unknown tool" in registry.dispatch("missing", {})["error"]
+    assert "Invalid arguments" in registry.dispatch("convert_units", {"celsius": 1})["error"]
+    assert calls == []
+    print("Result: errors returned without calling the tool")
+
+
+def test_parse_docstring():
+    """
+    Test Google-style docstring parsing.
+    """
+    print("\n\nTesting docstring parsing")
+    print("=" * 50)
+    summary, arguments = parse_docstring("""
+        Get something.
+
+        Args:
+            name (str): The name
+            count (int, optional): How many
+                to fetch
+
+        Returns:
+            dict: Result
+    """)
+    assert summary == "Get something."
+    assert arguments == {"name": "The name", "count": "How many to fetch"}
+    print(f"Result: {arguments}")
+
+
+def main():
+    """
+    Main function to run all registry tests.
+    """
+    print("Tool Registry Testing Suite")
+    print("=" * 60)
+
+    test_schema_from_hints_and_docstring()
+    test_dispatch_with_cache()
+    test_dispatch_errors()
+    test_parse_docstring()
+
+    print("\n" + "=" * 60)
+    print("Registry testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Test script for the fair scheduler.
+Checks fair-queuing order, priority classes, the shared token budget under mixed load and the
+tenant headers of the HTTP service - no API keys or network access required.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from ratelimit import TokenBucket
+from scheduler import SCHEDULER_SLOTS, FairQueue, FairScheduler, caller_scope, current_caller, get_scheduler
+from server import AgentServer
+
+
+def test_fair_queue():
+    """
+    Test interleaving of tenants, weights and priority classes.
+    """
+    print("Testing the fair queue order")
+    print("=" * 50)
+    queue = FairQueue()
+    for index in range(6):
+        queue.push(f"flood{index}", tenant="flood")
+    queue.push("user0", tenant="user")
+    queue.push("user1", tenant="user")
+    order = [queue.pop() for _ in range(len(queue))]
+    print(f"Equal weights: {order}")
+    # The later tenant is not stuck behind the flood
+    assert order.index("user0") <= 1 and order.index("user1") <= 3
+
+    os.environ["AGENT_TENANT_WEIGHTS"] = "heavy=3"
+    try:
+        queue = FairQueue()
+        for index in range(8):
+            queue.push(f"heavy{index}", tenant="heavy")
+            queue.push(f"light{index}", tenant="light")
+        first = [queue.pop() for _ in range(8)]
+    finally:
+        del os.environ["AGENT_TENANT_WEIGHTS"]
+    print(f"Weights 3:1:    {first}")
+    assert sum(item.startswith("heavy") for item in first) == 6
+
+    queue = FairQueue()
+    queue.push("bulk0", tenant="flood", priority="bulk")
+    removed = queue.push("bulk1", tenant="flood", priority="bulk")
+    queue.push("interactive0", tenant="flood")
+    queue.remove(removed)
+    assert len(queue) == 2 and queue.count("bulk") == 1
+    assert [queue.pop(), queue.pop()] == ["interactive0", "bulk0"]
+    print("Result: tenants interleave by weight, interactive goes before bulk")
+
+
+def test_caller_scope():
+    """
+    Test nesting and validation of the caller context.
+    """
+    print("\n\nTesting the caller context")
+    print("=" * 50)
+    assert current_caller() == ("default", "interactive")
+    with caller_scope("acme", "bulk"):
+        with caller_scope(priority="interactive"):
+            assert current_caller() == ("acme", "interactive")
+        assert current_caller() == ("acme", "bulk")
+    try:
+        with caller_scope("acme", "urgent"):
+            raise AssertionError("an unknown priority class was accepted")
+    except ValueError:
+        pass
+    print(f"Result: {current_caller()} outside any scope")
+
+
+def test_pass_through():
+    """
+    Test that a scheduler without slots or budget admits every call at once.
+    """
+    print("\n\nTesting the unbounded scheduler")
+    print("=" * 50)
+    scheduler = FairScheduler("tool", slots=None)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        waits = list(executor.map(lambda _: scheduler.acquire(), range(16)))
+    assert waits == [0.0] * 16 and scheduler.stats()["active"] == 16
+    for _ in range(16):
+        scheduler.release()
+    assert scheduler.stats() == {"slots": None, "active": 0, "queued_interactive": 0, "queued_bulk": 0}
+    print(f"Result: 16 calls admitted without waiting, stats {scheduler.stats()}")
+
+
+def test_default_slots():
+    """
+    Test that the default tool scheduler queues interactive calls ahead of bulk ones once its slots are full.
+    """
+    print("\n\nTesting the default scheduler configuration")
+    print("=" * 50)
+    assert "SCHEDULER_TOOL" not in os.environ and "SCHEDULER_LLM" not in os.environ
+    assert get_scheduler("llm").slots == SCHEDULER_SLOTS["llm"] == 32
+    scheduler = get_scheduler("tool")
+    slots = scheduler.slots
+    assert slots == SCHEDULER_SLOTS["tool"] == 8
+
+    # A batch tenant fills every slot and queues more calls
+    with caller_scope("batch-script", "bulk"):
+        for _ in range(slots):
+            scheduler.acquire()
+    admitted = []
+
+    def call(tenant, priority):
+        with caller_scope(tenant, priority):
+            with scheduler.slot():
+                admitted.append(tenant)
+
+    threads = [threading.Thread(target=call, args=("batch-script", "bulk")) for _ in range(3)]
+    threads.append(threading.Thread(target=call, args=("user", "interactive")))
+    for queued, thread in enumerate(threads, start=1):
+        thread.start()
+        # The interactive call arrives last
+        while scheduler.stats()["queued_bulk"] + scheduler.stats()["queued_interactive"] < queued:
+            time.sleep(0.001)
+    assert scheduler.stats()["queued_interactive"] == 1 and scheduler.stats()["queued_bulk"] == 3
+
+    for _ in range(slots):
+        scheduler.release()
+    for thread in threads:
+        thread.join()
+    print(f"Result: {slots} tool slots, admitted in order {admitted}")
+    assert admitted[0] == "user" and scheduler.stats()["active"] == 0
+
+
+def run_mixed_load(fair):
+    """
+    Run a flood of large bulk completions and a trickle of small interactive ones
+    through one scheduler with a shared token budget.
+
+    Returns:
+        list: Seconds each interactive call waited for admission
+    """
+    # 2000 tokens/s: the bulk threads alone want about ten times that
+    scheduler = FairScheduler("llm", slots=4, budget=TokenBucket(2000, 400))
+    stop = threading.Event()
+
+    def bulk_client():
+        with caller_scope("batch-script", "bulk"):
+            while not stop.is_set():
+                with scheduler.slot(cost=400):
+                    time.sleep(0.02)
+
+    def interactive_client():
+        waits = []
+        # Without fair scheduling the user's calls are queued like the script's
+        tenant, priority = ("user", "interactive") if fair else ("batch-script", "bulk")
+        with caller_scope(tenant, priority):
+            for _ in range(15):
+                with scheduler.slot(cost=150) as waited:
+                    waits.append(waited)
+                    time.sleep(0.02)
+                time.sleep(0.05)
+        return waits
+
+    with ThreadPoolExecutor(max_workers=7) as executor:
+        for _ in range(6):
+            executor.submit(bulk_client)
+        time.sleep(0.3)
+        waits = executor.submit(interactive_client).result()
+        stop.set()
+    return waits
+
+
+def test_token_budget_under_mixed_load():
+    """
+    Test that interactive calls stay fast while a bulk tenant saturates the token budget.
+    """
+    print("\n\nTesting interactive latency under a bulk flood")
+    print("=" * 50)
+    fifo = sorted(run_mixed_load(fair=False))
+    fair = sorted(run_mixed_load(fair=True))
+    print(f"Shared queue: interactive wait p50 {fifo[len(fifo) // 2] * 1000:.0f} ms, max {fifo[-1] * 1000:.0f} ms")
+    print(f"Fair queue:   interactive wait p50 {fair[len(fair) // 2] * 1000:.0f} ms, max {fair[-1] * 1000:.0f} ms")
+    assert fifo[len(fifo) // 2] > 0.5
+    # At most the time the budget needs to refill one small call
+    assert fair[-1] < 0.25
+    print(f"Result: worst interactive wait {fifo[-1] / fair[-1]:.0f}x shorter")
+
+
+def recording_turn(served):
+    def turn(messages, model, on_event):
+        served.append((messages[-1]["content"], current_caller()))
+        time.sleep(0.1)
+        return "ok"
+    return turn
+
+
+def test_server_headers():
+    """
+    Test tenant headers, the order of the request queue and the bulk share of the queue.
+    """
+    print("\n\nTesting tenants in the HTTP service")
+    print("=" * 50)
+    served = []
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = AgentServer(port=0, workers=1, queue_size=4, turn=recording_turn(served))
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    url = f"http://127.0.0.1:{server.port}/v1/chat"
+
+    def post(message, tenant, priority):
+        return requests.post(url, json={"message": message}, timeout=10,
+                             headers={"X-Tenant": tenant, "X-Priority": priority}).status_code
+
+    try:
+        assert post("x", "acme", "urgent") == 400 and post("x", "bad tenant!", "bulk") == 400
+        served.clear()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            bulk = []
+            for index in range(4):
+                bulk.append(executor.submit(post, f"bulk{index}", "batch-script", "bulk"))
+                time.sleep(0.02)
+            interactive = executor.submit(post, "interactive", "user", "interactive")
+            statuses = sorted(future.result() for future in bulk)
+            assert interactive.result() == 200
+    finally:
+        asyncio.run_coroutine_threadsafe(server.drain(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    order = [message for message, _ in served]
+    print(f"Served: {order}, bulk statuses {statuses}")
+    # bulk0 was running; bulk1 and bulk2 filled the bulk half of the queue and bulk3 was turned away
+    assert statuses == [200, 200, 200, 503]
+    assert order == ["bulk0", "interactive", "bulk1", "bulk2"]
+    assert dict(served)["interactive"] == ("user", "interactive")
+    assert dict(served)["bulk1"] == ("batch-script", "bulk")
+    print("Result: the interactive request overtook the queued bulk requests")
+
+
+def main():
+    """
+    Main function to run all scheduler tests.
+    """
+    print("Fair Scheduler Testing Suite")
+    print("=" * 60)
+
+    test_fair_queue()
+    test_caller_scope()
+    test_pass_through()
+    test_default_slots()
+    test_token_budget_under_mixed_load()
+    test_server_headers()
+
+    print("\n" + "=" * 60)
+    print("Fair scheduler testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test script for the HTTP service.
+Serves a simulated agent turn - no API keys or network access required.
+"""
+
+import asyncio
+import json
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import server
+from server import AgentServer, restart_delay, run_prefork
+
+
+def slow_turn(messages, model, on_event):
+    """
+    Agent turn stand-in: one tool call and a reply after 200 ms.
+    """
+    on_event({"event": "tool_call", "name": "get_weather", "arguments": {"location": "Prague"}})
+    time.sleep(0.2)
+    on_event({"event": "tool_result", "name": "get_weather", "error": False})
+    if messages[-1]["content"] == "explode":
+        raise RuntimeError("injected")
+    return f"Echo: {messages[-1]['content']}"
+
+
+class RunningServer:
+    """
+    AgentServer running on its own event loop thread.
+    """
+
+    def __init__(self, **options):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.server = AgentServer(port=0, turn=slow_turn, **options)
+        self.run(self.server.start())
+        self.url = f"http://127.0.0.1:{self.server.port}"
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def stop(self):
+        result = self.run(self.server.drain())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        return result
+
+
+def raw_request(url, request):
+    """
+    Send raw request bytes and return the status line of the response.
+    """
+    host, port = url.rsplit("/", 1)[-1].split(":")
+    with socket.create_connection((host, int(port)), timeout=5) as connection:
+        connection.sendall(request)
+        return connection.makefile("rb").readline().decode("latin-1").strip()
+
+
+def test_chat_and_stream():
+    """
+    Test plain and streamed chat responses, bad requests and probes.
+    """
+    print("Testing chat responses")
+    print("=" * 50)
+    running = RunningServer(workers=2, queue_size=4)
+    try:
+        response = requests.post(f"{running.url}/v1/chat", json={"message": "hello"}, timeout=5)
+        body = response.json()
+        print(f"Plain: {response.status_code} {body}")
+        assert response.status_code == 200 and body["reply"] == "Echo: hello"
+        assert body["tool_calls"] == [{"name": "get_weather", "arguments": {"location": "Prague"}}]
+
+        with requests.post(f"{running.url}/v1/chat", json={"message": "hi", "stream": True},
+                           stream=True, timeout=5) as streamed:
+            events = [json.loads(line)["event"] for line in streamed.iter_lines() if line]
+        print(f"Streamed events: {events}")
+        assert events == ["queued", "started", "tool_call", "tool_result", "reply", "done"]
+
+        failed = requests.post(f"{running.url}/v1/chat", json={"message": "explode"}, timeout=5)
+        assert failed.status_code == 500 and "injected" in failed.json()["error"]
+        assert requests.post(f"{running.url}/v1/chat", data=b"not json", timeout=5).status_code == 400
+        for length in (b"abc", b"-5"):
+            status_line = raw_request(running.url, b"POST /v1/chat HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+            assert status_line.startswith("HTTP/1.1 400"), status_line
+        assert requests.get(f"{running.url}/v1/chat", timeout=5).status_code == 405
+        assert requests.get(f"{running.url}/healthz", timeout=5).status_code == 200
+        assert requests.get(f"{running.url}/readyz", timeout=5).status_code == 200
+        assert "agent_server_requests_total" in requests.get(f"{running.url}/metrics", timeout=5).text
+    finally:
+        running.stop()
+    print("Result: plain, streamed, error and probe responses are correct")
+
+
+def test_backpressure():
+    """
+    Test that requests beyond workers plus queue size are rejected with 503.
+    """
+    print("\n\nTesting backpressure")
+    print("=" * 50)
+    running = RunningServer(workers=1, queue_size=2)
+    try:
+        def post(index):
+            response = requests.post(f"{running.url}/v1/chat", json={"message": str(index)}, timeout=10)
+            return response.status_code, response.headers.get("Retry-After")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(post, range(8)))
+    finally:
+        running.stop()
+
+    statuses = sorted(status for status, _ in results)
+    print(f"Result: statuses {statuses}")
+    # One running, two queued; the queue slot of the running request frees only when it is taken
+    assert 3 <= statuses.count(200) <= 4
+    assert all(retry == "1" for status, retry in results if status == 503)
+    assert statuses.count(503) == 8 - statuses.count(200)
+
+
+def test_graceful_drain():
+    """
+    Test that draining finishes in-flight turns and refuses new ones.
+    """
+    print("\n\nTesting graceful drain")
+    print("=" * 50)
+    running = RunningServer(workers=1, queue_size=4)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        in_flight = [executor.submit(requests.post, f"{running.url}/v1/chat", json={"message": str(index)},
+                                     timeout=10) for index in range(3)]
+        time.sleep(0.1)
+        started = time.perf_counter()
+        drained = running.stop()
+        elapsed = time.perf_counter() - started
+        statuses = [future.result().status_code for future in in_flight]
+
+    print(f"Result: drained={drained} in {elapsed * 1000:.0f} ms, in-flight statuses {statuses}")
+    assert drained and statuses == [200, 200, 200]
+    # Three 200 ms turns on one worker, the first already running
+    assert 0.3 < elapsed < 1.5
+    try:
+        requests.post(f"{running.url}/v1/chat", json={"message": "late"}, timeout=2)
+        raise AssertionError("expected the listener to be closed")
+    except requests.exceptions.ConnectionError:
+        pass
+
+
+def test_supervisor_backoff():
+    """
+    Test that the pre-fork supervisor restarts crashing workers with growing delays and then gives up.
+    """
+    print("\n\nTesting restarts of crashing worker processes")
+    print("=" * 50)
+    assert [restart_delay(failures) for failures in range(4)] == [0.0, 0.5, 1.0, 2.0]
+    assert restart_delay(20) == server.RESTART_MAX_DELAY
+
+    async def crash(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    saved = server.serve, server.RESTART_BASE_DELAY, server.MAX_FAST_FAILURES
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+    server.serve, server.RESTART_BASE_DELAY, server.MAX_FAST_FAILURES = crash, 0.05, 4
+    try:
+        started = time.perf_counter()
+        status = run_prefork("127.0.0.1", 0, 2, workers=1, queue_size=1, drain_timeout=1)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.serve, server.RESTART_BASE_DELAY, server.MAX_FAST_FAILURES = saved
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+    print(f"Result: gave up with status {status} after {elapsed:.2f} s")
+    # Restarts after 0.05, 0.1 and 0.2 s, then the fourth fast failure stops the supervisor
+    assert status == 1 and 0.35 <= elapsed < 3
+
+
+def main():
+    """
+    Main function to run all HTTP service tests.
+    """
+    print("HTTP Service Testing Suite")
+    print("=" * 60)
+
+    test_chat_and_stream()
+    test_backpressure()
+    test_graceful_drain()
+    test_supervisor_backoff()
+
+    print("\n" + "=" * 60)
+    print("HTTP service testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ from pprint import pprint
 # Import the main functions
 from tools import get_stock_price, get_dividend_date
 from main import get_completion_from_messages
+from recording import replaying
 
 # Load environment variables
 load_dotenv()
@@ -235,7 +236,7 @@ def main():
     test_stock_functions_standalone()
     
     # Run OpenAI integration tests if API key is available
-    if os.environ.get("OPENAI_API_KEY"):
+    if os.environ.get("OPENAI_API_KEY") or replaying():
         test_stock_functions_with_openai()
     else:
         print("\nSkipping OpenAI integration tests due to missing API key.")
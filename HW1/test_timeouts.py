@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test script for the adaptive per-endpoint timeouts.
+Checks the rolling latency histogram, the timeout policy, the request deadline and a provider
+slowdown against the mock server - no API keys or network access required.
+"""
+
+import os
+import random
+import time
+
+# Upstream budget of these tests; must be set before the first request creates the bucket
+os.environ["RATE_LIMIT_YAHOO"] = "1000:1000"
+
+from deadline import DeadlineExceeded, deadline_scope
+from mock_server import mock_environment, start_mock_server
+from timeouts import CEILING_FACTOR, MIN_SAMPLES, AdaptiveTimeout, LatencyWindow, adaptive_timeout, get_policy
+
+
+def test_latency_window():
+    """
+    Test the quantiles of the rolling histogram and the expiry of old observations.
+    """
+    print("Testing the rolling latency histogram")
+    print("=" * 50)
+    window = LatencyWindow(window=60.0, slices=6)
+    samples = [random.lognormvariate(-3, 0.5) for _ in range(5000)]
+    for sample in samples:
+        window.observe(sample, now=0.0)
+    exact = sorted(samples)[int(0.99 * len(samples)) - 1]
+    estimate = window.quantile(0.99, now=0.0)
+    print(f"p99 exact {exact * 1000:.1f} ms, estimated {estimate * 1000:.1f} ms")
+    # Rounded up to the next bucket bound, 15% apart
+    assert exact <= estimate <= exact * 1.16
+
+    window.observe(2.0, now=35.0)
+    assert window.count(now=35.0) == 5001
+    # The first slice has left the window, the later one is still in it
+    assert window.count(now=65.0) == 1 and window.quantile(0.5, now=65.0) >= 2.0
+    assert window.count(now=100.0) == 0 and window.quantile(0.99, now=100.0) is None
+    print("Result: observations expire with their slice")
+
+
+def test_policy():
+    """
+    Test the cold start, the floor, and growth towards the ceiling during a slowdown.
+    """
+    print("\n\nTesting the timeout policy")
+    print("=" * 50)
+    policy = AdaptiveTimeout("example", factor=3.0, floor=0.5)
+    assert policy.limit(10.0, now=0.0) == 10.0
+    for _ in range(MIN_SAMPLES):
+        policy.latencies.observe(0.02, now=0.0)
+    # 3 x 20 ms is below the floor
+    assert policy.limit(10.0, now=0.0) == 0.5
+    for _ in range(200):
+        policy.latencies.observe(0.4, now=1.0)
+    healthy = policy.limit(10.0, now=1.0)
+    assert 1.2 <= healthy <= 1.4
+
+    # Calls timing out are recorded at their timeout, so the timeout grows
+    timeout, steps = healthy, [healthy]
+    while timeout < 10.0 * CEILING_FACTOR:
+        for _ in range(10):
+            policy.latencies.observe(timeout, now=2.0)
+        timeout = policy.limit(10.0, now=2.0)
+        steps.append(timeout)
+    print(f"Result: healthy {healthy:.2f} s, slowdown {' -> '.join(f'{step:.1f}' for step in steps)} s")
+    assert timeout == 20.0 and len(steps) <= 5
+
+    os.environ["AGENT_ADAPTIVE_TIMEOUTS"] = "0"
+    try:
+        assert policy.limit(10.0, now=2.0) == 10.0
+    finally:
+        del os.environ["AGENT_ADAPTIVE_TIMEOUTS"]
+
+
+def test_deadline():
+    """
+    Test that the timeout is shortened to the deadline and that cut-off calls are not recorded.
+    """
+    print("\n\nTesting the request deadline")
+    print("=" * 50)
+    policy = get_policy("deadline_example")
+    with deadline_scope(0.2):
+        with adaptive_timeout("deadline_example", 5.0) as timeout:
+            assert 0.15 < timeout <= 0.2
+        try:
+            with adaptive_timeout("deadline_example", 5.0) as timeout:
+                time.sleep(timeout)
+                raise DeadlineExceeded("cut off by the deadline")
+        except DeadlineExceeded:
+            pass
+    assert policy.latencies.count() == 1
+
+    try:
+        with deadline_scope(0.01):
+            with adaptive_timeout("deadline_example", 5.0):
+                raise AssertionError("a call was started past the deadline")
+    except DeadlineExceeded:
+        pass
+    print(f"Result: {policy.latencies.count()} call recorded, the cut-off and skipped calls were not")
+
+
+def test_slowdown_against_mock():
+    """
+    Test a healthy provider, a stalled request, and a slowdown against the mock server.
+    """
+    print("\n\nTesting a provider slowdown against the mock server")
+    print("=" * 50)
+    server = start_mock_server(config={"yahoo": {"latency_ms": 20, "latency_sigma": 0.2}})
+    os.environ.update(mock_environment(server))
+    from tools import _yahoo_quote
+
+    base_url = os.environ["YAHOO_BASE_URL"]
+    try:
+        for _ in range(30):
+            _yahoo_quote(base_url, "MSFT")
+        policy = get_policy("yahoo_quote")
+        healthy = policy.limit(10)
+        print(f"Healthy: p99 {policy.latencies.quantile(0.99) * 1000:.0f} ms, timeout {healthy:.2f} s "
+              f"instead of 10 s")
+        assert healthy == 0.5
+
+        # The provider stalls: the request is given up after the adaptive timeout
+        server.state.behaviours["yahoo"].latency_ms = 3000
+        started = time.perf_counter()
+        try:
+            _yahoo_quote(base_url, "MSFT")
+            raise AssertionError("the stalled request did not time out")
+        except Exception as e:
+            assert "timed out" in str(e).lower(), e
+        lost = time.perf_counter() - started
+        print(f"Stalled: gave up after {lost:.2f} s")
+        assert lost < 1.0
+
+        # A slower but answering provider: the timeout grows and calls succeed again
+        server.state.behaviours["yahoo"].latency_ms = 800
+        server.state.behaviours["yahoo"].latency_sigma = 0
+        slowed = policy.limit(10)
+        started = time.perf_counter()
+        quote = _yahoo_quote(base_url, "MSFT")
+        print(f"Slowed down: timeout {slowed:.2f} s, call took {time.perf_counter() - started:.2f} s")
+        assert slowed >= 1.0 and quote["currentPrice"]
+    finally:
+        server.shutdown()
+    print("Result: timeouts follow the provider's latency")
+
+
+def main():
+    """
+    Main function to run all adaptive timeout tests.
+    """
+    print("Adaptive Timeout Testing Suite")
+    print("=" * 60)
+
+    test_latency_window()
+    test_policy()
+    test_deadline()
+    test_slowdown_against_mock()
+
+    print("\n" + "=" * 60)
+    print("Adaptive timeout testing completed!")
+
+
+if __name__ == "__main__":
+    main()
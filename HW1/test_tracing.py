@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for span instrumentation and the OTLP/JSON file exporter.
+Runs offline - no API keys or network access required.
+"""
+
+import json
+import os
+import tempfile
+
+import tracing
+from registry import ToolRegistry
+from tracing import SPAN_KIND_CLIENT, span
+
+
+def test_disabled_is_noop():
+    """
+    Test that no spans are recorded while tracing is disabled.
+    """
+    print("Testing disabled tracing")
+    print("=" * 50)
+    tracing.configure(None)
+    with span("agent.turn") as current:
+        current.set_attribute("ignored", 1)
+    assert not tracing.enabled()
+    print("Result: no-op span used")
+
+
+def test_trace_exported_as_otlp_json():
+    """
+    Test that a trace with nested spans is written as one OTLP/JSON line.
+    """
+    print("\n\nTesting OTLP/JSON trace export")
+    print("=" * 50)
+    registry = ToolRegistry()
+
+    @registry.tool(cache_ttl=60)
+    def echo(text: str):
+        """
+        Echo the text back.
+
+        Args:
+            text (str): Text to echo
+        """
+        with span("http.get", kind=SPAN_KIND_CLIENT) as hop:
+            hop.add("http.response.body.size", len(text))
+        return {"text": text}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trace.jsonl")
+        tracing.configure(path)
+        try:
+            with span("agent.turn", **{"gen_ai.request.model": "gpt-4o"}):
+                registry.dispatch("echo", {"text": "hello"})
+                registry.dispatch("echo", {"text": "hello"})
+            try:
+                with span("failing"):
+                    raise ValueError("boom")
+            except ValueError:
+                pass
+        finally:
+            tracing.configure(None)
+        with open(path) as trace_file:
+            lines = [json.loads(line) for line in trace_file]
+
+    assert len(lines) == 2
+    spans = lines[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {}
+    for recorded in spans:
+        by_name.setdefault(recorded["name"], []).append(recorded)
+    root = by_name["agent.turn"][0]
+    assert len({recorded["traceId"] for recorded in spans}) == 1
+    assert len(by_name["tool.dispatch"]) == 2
+    assert len(by_name["http.get"]) == 1
+    assert by_name["http.get"][0]["kind"] == SPAN_KIND_CLIENT
+    assert all(recorded["parentSpanId"] == root["spanId"] for recorded in by_name["tool.dispatch"])
+    cache_hits = [
+        attribute["value"]["boolValue"]
+        for recorded in by_name["tool.dispatch"]
+        for attribute in recorded["attributes"] if attribute["key"] == "cache.hit"
+    ]
+    assert cache_hits == [False, True]
+    failing = lines[1]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert failing["status"]["code"] == tracing.STATUS_ERROR
+    print(f"Result: {len(spans)} spans exported, cache hits {cache_hits}")
+
+
+def main():
+    """
+    Main function to run all tracing tests.
+    """
+    print("Tracing Testing Suite")
+    print("=" * 60)
+
+    test_disabled_is_noop()
+    test_trace_exported_as_otlp_json()
+
+    print("\n" + "=" * 60)
+    print("Tracing testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the cache warm-up scheduler.
+Checks popularity tracking, refresh-ahead of hot calls and the QPS budget - no API keys or network access required.
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+# Refresh budget of these tests; must be set before the first refresh creates the bucket
+os.environ["RATE_LIMIT_WARMUP"] = "20:4"
+
+from cache import MemoryCache, SQLiteCache
+from registry import ToolRegistry
+from warmup import CacheWarmer, DecayingCounter
+
+TTL = 0.5
+
+
+def test_decaying_counter():
+    """
+    Test decay, ranking and the key limit.
+    """
+    print("Testing the decaying popularity counter")
+    print("=" * 50)
+    counter = DecayingCounter(half_life=10.0, max_keys=4)
+    for _ in range(4):
+        counter.add("old", now=0.0)
+    for _ in range(3):
+        counter.add("new", now=20.0)
+    # 4 requests two half-lives ago are worth 1 now
+    assert abs(counter.score("old", now=20.0) - 1.0) < 1e-9
+    assert [key for _, key in counter.top(2, now=20.0)] == ["new", "old"]
+    for key in ("a", "b", "c"):
+        counter.add(key, now=20.0)
+    assert len(counter) <= 4 and counter.score("new", now=20.0) == 3.0
+    print(f"Result: top {counter.top(2, now=20.0)}")
+
+
+def test_cache_ttl():
+    """
+    Test the remaining lifetime reported by both cache backends.
+    """
+    print("\n\nTesting remaining TTLs")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as directory:
+        for cache in (MemoryCache(), SQLiteCache(os.path.join(directory, "cache.sqlite3"))):
+            cache.set("a", 1, ttl=10)
+            cache.set("b", 1, ttl=0.01)
+            time.sleep(0.02)
+            assert 9 < cache.ttl("a") <= 10
+            assert cache.ttl("b") is None and cache.ttl("missing") is None
+    print("Result: both backends report remaining lifetimes")
+
+
+def make_registry():
+    registry = ToolRegistry(cache=MemoryCache())
+    upstream_calls = {}
+    lock = threading.Lock()
+
+    @registry.tool(cache_ttl=TTL)
+    def get_stock_price(ticker: str):
+        """Get a stock price."""
+        with lock:
+            upstream_calls[ticker] = upstream_calls.get(ticker, 0) + 1
+        time.sleep(0.02)
+        return {"ticker": ticker, "current_price": 100.0}
+
+    return registry, upstream_calls
+
+
+def run_traffic(registry, seconds, tickers=("MSFT",), rare=("XYZ",)):
+    """
+    Ask for the hot tickers every 20 ms and for the rare ones once.
+
+    Returns:
+        tuple: (hits, requests) of the hot tickers
+    """
+    hits = requests = 0
+    for ticker in rare:
+        registry.dispatch("get_stock_price", {"ticker": ticker})
+    stop_at = time.monotonic() + seconds
+    while time.monotonic() < stop_at:
+        for ticker in tickers:
+            key = registry.get("get_stock_price").cache_key({"ticker": ticker})
+            hits += registry.cache.get(key) is not None
+            requests += 1
+            registry.dispatch("get_stock_price", {"ticker": ticker})
+        time.sleep(0.02)
+    return hits, requests
+
+
+def test_refresh_ahead():
+    """
+    Test that hot calls stay cached across expiries and rare calls are not refreshed.
+    """
+    print("\n\nTesting refresh-ahead of hot calls")
+    print("=" * 50)
+    registry, _ = make_registry()
+    cold_hits, cold_requests = run_traffic(registry, 4 * TTL)
+
+    registry, upstream_calls = make_registry()
+    warmer = CacheWarmer(registry, top_n=5, interval=0.05)
+    warmer.start()
+    try:
+        warm_hits, warm_requests = run_traffic(registry, 4 * TTL)
+    finally:
+        warmer.stop()
+
+    print(f"Without warm-up: {cold_hits}/{cold_requests} hits")
+    print(f"With warm-up:    {warm_hits}/{warm_requests} hits, stats {warmer.stats}")
+    print(f"Result: hot hit rate {warmer.hot_hit_rate():.3f}, upstream calls {upstream_calls}")
+    assert cold_requests - cold_hits >= 4
+    # Only the very first request of the hot ticker misses
+    assert warm_requests - warm_hits <= 1
+    assert warmer.hot_hit_rate() >= 0.99
+    # The rare ticker was fetched once and never refreshed
+    assert upstream_calls["XYZ"] == 1
+    assert warmer.stats["refreshed"] >= 3 and warmer.stats["failed"] == 0
+
+
+def test_budget():
+    """
+    Test that refreshes stay within the QPS budget, most popular calls first.
+    """
+    print("\n\nTesting the refresh budget")
+    print("=" * 50)
+    registry, upstream_calls = make_registry()
+    warmer = CacheWarmer(registry, top_n=20, interval=0.05)
+    tickers = [f"T{index}" for index in range(12)]
+    for count, ticker in enumerate(tickers):
+        # Later tickers are more popular
+        for _ in range(count + 3):
+            registry.dispatch("get_stock_price", {"ticker": ticker})
+    registry.cache.clear()
+    # Let the bucket fill up to its burst of 4
+    time.sleep(0.25)
+    refreshed = warmer.run_once()
+    print(f"Result: {refreshed} refreshed, stats {warmer.stats}")
+    assert refreshed == 4 and warmer.stats["throttled"] == 8
+    assert all(upstream_calls[ticker] == 2 for ticker in tickers[-4:])
+    assert all(upstream_calls[ticker] == 1 for ticker in tickers[:-4])
+
+
+def main():
+    """
+    Main function to run all cache warm-up tests.
+    """
+    print("Cache Warm-Up Testing Suite")
+    print("=" * 60)
+
+    test_decaying_counter()
+    test_cache_ttl()
+    test_refresh_ahead()
+    test_budget()
+
+    print("\n" + "=" * 60)
+    print("Cache warm-up testing completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ from pprint import pprint
 # Import the main functions
 from tools import get_weather
 from main import get_completion_from_messages
+from recording import replaying
 
 # Load environment variables
 load_dotenv()
@@ -158,7 +159,7 @@ def main():
     test_weather_function_standalone()
     
     # Run OpenAI integration tests if API key is available
-    if os.environ.get("OPENAI_API_KEY"):
+    if os.environ.get("OPENAI_API_KEY") or replaying():
         test_weather_with_openai()
     else:
         print("\nSkipping OpenAI integration tests due to missing API key.")
@@ -11,6 +11,7 @@ from pprint import pprint
 # Import the main functions
 from tools import search_web
 from main import get_completion_from_messages
+from recording import replaying
 
 # Load environment variables
 load_dotenv()
@@ -217,7 +218,7 @@ def main():
         print("Set OPENAI_API_KEY in your .env file to test OpenAI integration.")
         print()
     
-    if not os.environ.get("TAVILY_API_KEY"):
+    if not os.environ.get("TAVILY_API_KEY") and not replaying():
         print("Error: TAVILY_API_KEY not set. Web search tests will fail.")
         print("Set TAVILY_API_KEY in your .env file to test web search functionality.")
         print("You can get a free API key from: https://tavily.com/")
@@ -227,7 +228,7 @@ def main():
     test_web_search_function_standalone()
     
     # Run OpenAI integration tests if API key is available
-    if os.environ.get("OPENAI_API_KEY"):
+    if os.environ.get("OPENAI_API_KEY") or replaying():
         test_web_search_with_openai()
     else:
         print("\nSkipping OpenAI integration tests due to missing API key.")
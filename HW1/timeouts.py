@@ -0,0 +1,249 @@
+"""
+Adaptive Timeout Module
+Per-endpoint timeouts derived from the latency the endpoint has shown recently.
+
+A fixed timeout is a guess: 10 s is far too long for an endpoint that answers
+in 80 ms (a lost request holds its worker for 10 s), and too short while the
+provider is slow but still answering. Instead, each endpoint keeps a rolling
+latency histogram of its last WINDOW seconds, and the timeout of the next
+call is
+
+    clamp(p99 * factor, floor, ceiling)
+
+A call that has taken `factor` times the p99 is almost certainly lost, so it
+is abandoned. Until an endpoint has MIN_SAMPLES observations, the fixed
+timeout of the call site is used; the ceiling is CEILING_FACTOR times that
+value. Calls that time out are recorded at their timeout, so during a
+slowdown the p99 and with it the timeout grow towards the ceiling instead
+of cutting off every call.
+
+The result is always shortened to what is left of the request deadline
+(see deadline.py). Calls cut short by the deadline say nothing about the
+endpoint and are not recorded.
+
+AGENT_ADAPTIVE_TIMEOUTS=0 switches back to the fixed timeouts, and
+ADAPTIVE_TIMEOUT_<ENDPOINT>="factor:floor" overrides the defaults of one
+endpoint, e.g. ADAPTIVE_TIMEOUT_TAVILY_ADVANCED=4:2.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+from deadline import remaining_timeout
+
+# Timeout as a multiple of the observed p99 latency
+DEFAULT_FACTOR = 3.0
+# Shortest adaptive timeout in seconds
+DEFAULT_FLOOR = 0.5
+# Longest adaptive timeout as a multiple of the fixed timeout of the call site
+CEILING_FACTOR = 2.0
+QUANTILE = 0.99
+# Observations needed before the timeout adapts
+MIN_SAMPLES = 20
+# Length of the rolling window in seconds, and the number of slices it rotates in
+WINDOW = 300.0
+SLICES = 10
+
+# Histogram bucket bounds: 1 ms to about 2 minutes, 15% apart
+_BOUNDS = tuple(0.001 * 1.15 ** index for index in range(85))
+
+
+def adaptive_enabled():
+    """
+    Returns:
+        bool: True unless AGENT_ADAPTIVE_TIMEOUTS is set to 0/false/off
+    """
+    return os.environ.get("AGENT_ADAPTIVE_TIMEOUTS", "1").lower() not in ("0", "false", "off", "no")
+
+
+class LatencyWindow:
+    """
+    Rolling latency histogram over the last `window` seconds.
+
+    The window is made of `slices` histograms; the oldest one is cleared when
+    the window moves on, so old observations fall out in steps of
+    window / slices seconds.
+    """
+
+    def __init__(self, window=WINDOW, slices=SLICES):
+        """
+        Args:
+            window (float): Length of the window in seconds
+            slices (int): Number of sub-histograms the window rotates through
+        """
+        self.slice_seconds = window / slices
+        self._counts = [[0] * (len(_BOUNDS) + 1) for _ in range(slices)]
+        self._epochs = [None] * slices
+        self._lock = threading.Lock()
+
+    def _slice(self, now):
+        epoch = int(now // self.slice_seconds)
+        index = epoch % len(self._counts)
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            self._counts[index] = [0] * (len(_BOUNDS) + 1)
+        return self._counts[index]
+
+    def observe(self, seconds, now=None):
+        """
+        Record a latency.
+
+        Args:
+            seconds (float): Latency in seconds
+            now (float, optional): Current monotonic time
+        """
+        now = time.monotonic() if now is None else now
+        # Bucket i holds latencies up to _BOUNDS[i]
+        index = max(0, math.ceil(math.log(max(seconds, 1e-9) / _BOUNDS[0], 1.15) - 1e-9))
+        with self._lock:
+            self._slice(now)[min(index, len(_BOUNDS))] += 1
+
+    def _merged(self, now):
+        oldest = int(now // self.slice_seconds) - len(self._counts) + 1
+        merged = [0] * (len(_BOUNDS) + 1)
+        for epoch, counts in zip(self._epochs, self._counts):
+            if epoch is not None and epoch >= oldest:
+                merged = [a + b for a, b in zip(merged, counts)]
+        return merged
+
+    def count(self, now=None):
+        """
+        Returns:
+            int: Observations in the window
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return sum(self._merged(now))
+
+    def quantile(self, q, now=None):
+        """
+        Get a latency quantile of the window, rounded up to the bucket bound.
+
+        Args:
+            q (float): Quantile between 0 and 1, e.g. 0.99
+            now (float, optional): Current monotonic time
+
+        Returns:
+            float: Latency in seconds, or None if the window is empty
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            merged = self._merged(now)
+        total = sum(merged)
+        if not total:
+            return None
+        rank = math.ceil(q * total)
+        seen = 0
+        for index, bucket_count in enumerate(merged):
+            seen += bucket_count
+            if seen >= rank:
+                return _BOUNDS[min(index, len(_BOUNDS) - 1)]
+        return _BOUNDS[-1]
+
+
+class AdaptiveTimeout:
+    """
+    Timeout policy of one endpoint.
+    """
+
+    def __init__(self, endpoint, factor=DEFAULT_FACTOR, floor=DEFAULT_FLOOR, window=WINDOW):
+        """
+        Args:
+            endpoint (str): Endpoint name
+            factor (float): Timeout as a multiple of the p99 latency
+            floor (float): Shortest timeout in seconds
+            window (float): Length of the rolling window in seconds
+        """
+        self.endpoint = endpoint
+        self.factor = factor
+        self.floor = floor
+        self.latencies = LatencyWindow(window)
+
+    def limit(self, default, now=None):
+        """
+        Get the timeout of the next call, before the request deadline is applied.
+
+        Args:
+            default (float): Fixed timeout of the call site, used until enough
+                latencies are known; CEILING_FACTOR times it is the ceiling
+            now (float, optional): Current monotonic time
+
+        Returns:
+            float: Timeout in seconds
+        """
+        if not adaptive_enabled() or self.latencies.count(now) < MIN_SAMPLES:
+            return default
+        p99 = self.latencies.quantile(QUANTILE, now)
+        return min(max(p99 * self.factor, self.floor), default * CEILING_FACTOR)
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(endpoint):
+    """
+    Get (and create on first use) the timeout policy of an endpoint,
+    applying an ADAPTIVE_TIMEOUT_<ENDPOINT>="factor:floor" override.
+
+    Args:
+        endpoint (str): Endpoint name, e.g. "openweathermap" or "tavily_basic"
+
+    Returns:
+        AdaptiveTimeout: Policy of the endpoint
+    """
+    policy = _policies.get(endpoint)
+    if policy is not None:
+        return policy
+
+    with _policies_lock:
+        if endpoint not in _policies:
+            factor, floor = DEFAULT_FACTOR, DEFAULT_FLOOR
+            override = os.environ.get(f"ADAPTIVE_TIMEOUT_{endpoint.upper()}")
+            if override:
+                factor, _, floor = override.partition(":")
+                factor, floor = float(factor), float(floor) if floor else DEFAULT_FLOOR
+            _policies[endpoint] = AdaptiveTimeout(endpoint, factor, floor)
+        return _policies[endpoint]
+
+
+@contextmanager
+def adaptive_timeout(endpoint, default):
+    """
+    Time a call to an endpoint with an adaptive timeout.
+
+    The block receives the timeout to use, already shortened to the current
+    deadline, and its latency is recorded when it finishes. A block that
+    fails after using its whole timeout is recorded as having taken the
+    timeout, unless the deadline had shortened it.
+
+        with adaptive_timeout("ipapi", 5) as timeout:
+            response = requests.get(url, timeout=timeout)
+
+    Args:
+        endpoint (str): Endpoint name
+        default (float): Fixed timeout of the call site in seconds
+
+    Yields:
+        float: Timeout in seconds
+
+    Raises:
+        DeadlineExceeded: If the current deadline has (almost) passed
+    """
+    policy = get_policy(endpoint)
+    limit = policy.limit(default)
+    timeout = remaining_timeout(limit)
+    metrics.hop_timeout.observe(timeout, endpoint=endpoint)
+    started = time.monotonic()
+    try:
+        yield timeout
+    except Exception:
+        elapsed = time.monotonic() - started
+        if elapsed >= 0.95 * timeout and timeout >= limit:
+            policy.latencies.observe(limit)
+        raise
+    policy.latencies.observe(time.monotonic() - started)
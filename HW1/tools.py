@@ -1,86 +1,438 @@
-
 """
 OpenAI Tools Module
 Contains all the custom tool functions for OpenAI function calling.
+
+Heavy dependencies (yfinance with pandas/numpy, requests, the Tavily client)
+are imported on first use of the tool that needs them, so importing this
+module stays cheap.
 """
 
 import os
-import yfinance as yf
-import requests
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Literal
 from dotenv import load_dotenv
 
+import metrics
+import recording
+from deadline import DeadlineExceeded, call_with_timeout, remaining_timeout
+from ratelimit import DEFAULT_MAX_WAIT, RateLimitExceeded, acquire
+from registry import registry, tool
+from results import (
+    CurrentWeather,
+    DividendDate,
+    Forecast,
+    ForecastEntry,
+    PriceHistory,
+    SearchHit,
+    SearchResults,
+    StockPrice,
+)
+from timeouts import adaptive_timeout
+from tracing import SPAN_KIND_CLIENT, current_span, span
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize Tavily client only if API key is available
+# Tavily client, created on first search if the API key is available
 tavily_client = None
-try:
-    from tavily import TavilyClient
-    if os.environ.get("TAVILY_API_KEY"):
-        tavily_client = TavilyClient(
-            api_key=os.environ.get("TAVILY_API_KEY"),
+_tavily_lock = threading.Lock()
+
+# Upper bounds for single upstream calls; the request deadline can shorten them
+YAHOO_TIMEOUT = 10
+TAVILY_TIMEOUT = 15
+
+# Upstream base URLs; each can be overridden with <NAME>_BASE_URL, e.g. to
+# point the agent at mock_server.py
+DEFAULT_BASE_URLS = {
+    "IPAPI": "https://ipapi.co",
+    "OPENWEATHER": "https://api.openweathermap.org",
+    "OPEN_METEO": "https://api.open-meteo.com",
+    "OPEN_METEO_GEOCODING": "https://geocoding-api.open-meteo.com",
+}
+
+
+def _base_url(name):
+    """
+    Get the base URL of an upstream API, honouring <NAME>_BASE_URL overrides.
+
+    Args:
+        name (str): Key of DEFAULT_BASE_URLS
+
+    Returns:
+        str: Base URL without a trailing slash
+    """
+    return os.environ.get(f"{name}_BASE_URL", DEFAULT_BASE_URLS[name]).rstrip("/")
+
+
+def _get_tavily_client():
+    """
+    Get the Tavily client, creating it on first use.
+
+    Returns:
+        TavilyClient: Client instance, or None if the API key or package is missing
+    """
+    global tavily_client
+    if tavily_client is None and os.environ.get("TAVILY_API_KEY"):
+        with _tavily_lock:
+            if tavily_client is None:
+                try:
+                    from tavily import TavilyClient
+                    tavily_client = TavilyClient(
+                        api_key=os.environ.get("TAVILY_API_KEY"),
+                        api_base_url=os.environ.get("TAVILY_BASE_URL"),
+                    )
+                except ImportError:
+                    pass
+    return tavily_client
+
+
+def _throttle(provider):
+    """
+    Wait for the rate limiter of an upstream provider.
+
+    Args:
+        provider (str): Provider name as configured in ratelimit.PROVIDER_LIMITS
+
+    Raises:
+        RateLimitExceeded: If no request token becomes available in time
+    """
+    if not acquire(provider, max_wait=remaining_timeout(DEFAULT_MAX_WAIT)):
+        raise RateLimitExceeded(provider)
+
+
+def _send_get(provider, url, params, timeout, endpoint):
+    """
+    Send a rate-limited GET request with the adaptive timeout of its endpoint.
+    """
+    import requests
+
+    _throttle(provider)
+    started = time.perf_counter()
+    try:
+        with adaptive_timeout(endpoint, timeout) as request_timeout:
+            current_span().set_attribute("http.timeout", request_timeout)
+            response = requests.get(url, params=params, timeout=request_timeout)
+    except requests.exceptions.RequestException:
+        metrics.http_requests.inc(provider=provider, status="error")
+        raise
+    finally:
+        metrics.http_latency.observe(time.perf_counter() - started, provider=provider)
+    metrics.http_requests.inc(provider=provider, status=response.status_code)
+    return response
+
+
+def _http_get(provider, url, params=None, timeout=10, endpoint=None):
+    """
+    Send a rate-limited GET request to an upstream API.
+
+    In record/replay mode the request goes through the active cassette
+    (see recording.py); API keys are never part of the recorded request.
+
+    Args:
+        provider (str): Provider name used for rate limiting
+        url (str): Request URL
+        params (dict, optional): Query parameters
+        timeout (float): Fixed request timeout in seconds; the endpoint's
+            adaptive timeout replaces it once its latencies are known (see
+            timeouts.py), shortened to what is left of the request deadline
+        endpoint (str, optional): Endpoint name for the adaptive timeout
+            (default: the provider)
+
+    Returns:
+        requests.Response: HTTP response
+    """
+    with span("http.get", kind=SPAN_KIND_CLIENT, provider=provider, **{"http.url": url}) as current:
+        response = recording.call(
+            provider,
+            {"url": url, "params": recording.redact(params)},
+            lambda: _send_get(provider, url, params, timeout, endpoint or provider),
+            encode=recording.encode_http_response,
+            decode=recording.decode_http_response,
         )
-except ImportError:
-    pass
+        current.set_attribute("http.status_code", response.status_code)
+        current.set_attribute("http.response.body.size", len(response.content))
+        return response
+
+
+def _yahoo_quote(base_url, ticker):
+    """
+    Fetch a ticker from a Yahoo-compatible v7 quote endpoint.
+
+    Used instead of yfinance when YAHOO_BASE_URL is set (e.g. mock_server.py).
+
+    Args:
+        base_url (str): Base URL of the quote service
+        ticker (str): The stock ticker symbol
+
+    Returns:
+        dict: The subset of the yfinance info dictionary used by the tools
+    """
+    response = _http_get("yahoo", f"{base_url.rstrip('/')}/v7/finance/quote",
+                         params={"symbols": ticker}, timeout=YAHOO_TIMEOUT, endpoint="yahoo_quote")
+    if response.status_code != 200:
+        raise RuntimeError(f"Yahoo quote API failed. Status: {response.status_code}")
+    results = response.json().get("quoteResponse", {}).get("result") or []
+    if not results:
+        return {}
+    quote = results[0]
+    return {"symbol": quote.get("symbol"), "currentPrice": quote.get("regularMarketPrice"),
+            "dividendDate": quote.get("dividendDate")}
 
+
+def _yahoo_info(ticker):
+    """
+    Fetch the Yahoo Finance info dictionary of a ticker within the deadline.
+
+    Args:
+        ticker (str): The stock ticker symbol
+
+    Returns:
+        dict: Ticker info from yfinance
+    """
+    base_url = os.environ.get("YAHOO_BASE_URL")
+    if base_url:
+        return _yahoo_quote(base_url, ticker)
+
+    def fetch():
+        import yfinance as yf
+
+        _throttle("yahoo")
+        with adaptive_timeout("yahoo_quote", YAHOO_TIMEOUT) as timeout:
+            return call_with_timeout(lambda: yf.Ticker(ticker).info, timeout)
+
+    with span("yahoo.info", kind=SPAN_KIND_CLIENT, provider="yahoo", ticker=ticker):
+        return recording.call("yahoo", {"ticker": ticker}, fetch)
+
+
+@tool(cache_ttl=60, timeout=10, max_concurrency=4, max_queue=4)
 def get_stock_price(ticker: str):
     """
-    Get current stock price using Yahoo Finance API.
+    Use this function to get the current price of a stock.
+    
+    Uses the Yahoo Finance API.
     
     Args:
-        ticker (str): The stock ticker symbol (e.g., 'MSFT', 'GOOG')
+        ticker (str): The ticker symbol for the stock, e.g. GOOG
     
     Returns:
-        dict: Dictionary containing ticker and current price
+        StockPrice: Result record (see results.py), or a dictionary with an "error" key
     """
     if not ticker or not ticker.strip():
         return {"error": "Ticker symbol cannot be empty"}
     
     try:
-        ticker_info = yf.Ticker(ticker).info
+        ticker_info = _yahoo_info(ticker)
         current_price = ticker_info.get("currentPrice")
-        return {"ticker": ticker, "current_price": current_price}
+        return StockPrice(ticker=ticker, current_price=current_price)
     except Exception as e:
         return {"error": f"Failed to get stock price for {ticker}: {str(e)}"}
 
 
+@tool(cache_ttl=3600, timeout=10, max_concurrency=2, max_queue=2)
 def get_dividend_date(ticker: str):
     """
-    Get next dividend payment date for a stock using Yahoo Finance API.
+    Use this function to get the next dividend payment date of a stock.
+    
+    Uses the Yahoo Finance API.
     
     Args:
-        ticker (str): The stock ticker symbol (e.g., 'MSFT', 'GOOG')
+        ticker (str): The ticker symbol for the stock, e.g. GOOG
     
     Returns:
-        dict: Dictionary containing ticker and dividend date
+        DividendDate: Result record (see results.py), or a dictionary with an "error" key
     """
     if not ticker or not ticker.strip():
         return {"error": "Ticker symbol cannot be empty"}
     
     try:
-        ticker_info = yf.Ticker(ticker).info
+        ticker_info = _yahoo_info(ticker)
         dividend_date = ticker_info.get("dividendDate")
-        return {"ticker": ticker, "dividend_date": dividend_date}
+        return DividendDate(ticker=ticker, dividend_date=dividend_date)
     except Exception as e:
         return {"error": f"Failed to get dividend date for {ticker}: {str(e)}"}
 
 
-def get_weather(location: str = None):
+# Look-back of get_price_history periods, in calendar days
+PRICE_HISTORY_PERIODS = {"1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827}
+
+# Shortest history kept per ticker, so the 200-day moving average is always available
+MIN_PRICE_HISTORY_DAYS = 366
+
+# Columnar bar cache, created on first use (importing NumPy is slow)
+_price_store = None
+_price_store_lock = threading.Lock()
+
+
+def _get_price_store():
+    global _price_store
+    if _price_store is None:
+        with _price_store_lock:
+            if _price_store is None:
+                from prices import PriceStore
+
+                _price_store = PriceStore()
+    return _price_store
+
+
+def _yahoo_chart(base_url, ticker, start, end):
+    """
+    Fetch daily bars from a Yahoo-compatible v8 chart endpoint.
+
+    Used instead of yfinance when YAHOO_BASE_URL is set (e.g. mock_server.py).
+
+    Returns:
+        dict: Column name to list of values
+    """
+    from prices import day_timestamp
+
+    response = _http_get("yahoo", f"{base_url.rstrip('/')}/v8/finance/chart/{ticker}",
+                         params={"period1": day_timestamp(start), "period2": day_timestamp(end), "interval": "1d"},
+                         timeout=YAHOO_TIMEOUT, endpoint="yahoo_chart")
+    if response.status_code != 200:
+        raise RuntimeError(f"Yahoo chart API failed. Status: {response.status_code}")
+    results = response.json().get("chart", {}).get("result") or []
+    if not results:
+        return {}
+    quote = results[0]["indicators"]["quote"][0]
+    bars = {name: quote.get(name) or [] for name in ("open", "high", "low", "close", "volume")}
+    bars["timestamp"] = results[0].get("timestamp") or []
+    return bars
+
+
+def _yahoo_history(ticker, start, end):
+    """
+    Fetch split- and dividend-adjusted daily bars of a ticker within the deadline.
+
+    Args:
+        ticker (str): The stock ticker symbol
+        start (date): First day
+        end (date): Day after the last day
+
+    Returns:
+        dict: Column name to list of values ("timestamp", "open", "high", "low", "close", "volume")
+    """
+    base_url = os.environ.get("YAHOO_BASE_URL")
+    if base_url:
+        return _yahoo_chart(base_url, ticker, start, end)
+
+    def fetch():
+        import yfinance as yf
+
+        _throttle("yahoo")
+        with adaptive_timeout("yahoo_chart", YAHOO_TIMEOUT) as timeout:
+            frame = call_with_timeout(
+                lambda: yf.Ticker(ticker).history(start=start.isoformat(), end=end.isoformat(), interval="1d",
+                                                  auto_adjust=True),
+                timeout,
+            )
+        if frame.empty:
+            return {}
+        # Session dates in exchange time; naive timestamps convert as UTC
+        index = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+        bars = {name.lower(): frame[name].astype(float).tolist() for name in ("Open", "High", "Low", "Close", "Volume")}
+        bars["timestamp"] = [int(day.timestamp()) for day in index.normalize()]
+        return bars
+
+    with span("yahoo.history", kind=SPAN_KIND_CLIENT, provider="yahoo", ticker=ticker):
+        return recording.call("yahoo_history", {"ticker": ticker, "start": start.isoformat(), "end": end.isoformat()},
+                              fetch)
+
+
+@tool(cache_ttl=900, timeout=20, max_concurrency=2, max_queue=2)
+def get_price_history(ticker: str, period: Literal["1mo", "3mo", "6mo", "1y", "2y", "5y"] = "1y"):
+    """
+    Use this function to analyze the price trend of a stock over a period: return, volatility, drawdown, moving averages and price range.
+    
+    Uses daily Yahoo Finance bars, cached locally and summarized instead of returned row by row.
+    
+    Args:
+        ticker (str): The ticker symbol for the stock, e.g. GOOG
+        period (str): Look-back period, one of 1mo, 3mo, 6mo, 1y, 2y, 5y (default 1y)
+    
+    Returns:
+        PriceHistory: Result record (see results.py), or a dictionary with an "error" key
+    """
+    if not ticker or not ticker.strip():
+        return {"error": "Ticker symbol cannot be empty"}
+    if period not in PRICE_HISTORY_PERIODS:
+        return {"error": f"Invalid period: {period}. Use one of {', '.join(PRICE_HISTORY_PERIODS)}"}
+
+    try:
+        from prices import load_history, summarize
+
+        ticker = ticker.strip().upper()
+        today = datetime.now(timezone.utc).date()
+        start = today - timedelta(days=PRICE_HISTORY_PERIODS[period])
+        fetch_start = min(start, today - timedelta(days=MIN_PRICE_HISTORY_DAYS))
+        columns, fetched = load_history(_get_price_store(), ticker, fetch_start, today, _yahoo_history)
+        current_span().set_attribute("prices.fetched_sessions", fetched)
+        summary = summarize(columns, start)
+        if summary is None:
+            return {"error": f"No price history found for {ticker}"}
+        return PriceHistory(ticker=ticker, period=period, summary=summary, source="Yahoo Finance")
+    except Exception as e:
+        return {"error": f"Failed to get price history for {ticker}: {str(e)}"}
+
+
+# WMO weather interpretation codes used by Open-Meteo
+WEATHER_CODES = {
+    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
+    45: "Foggy", 48: "Depositing rime fog", 51: "Light drizzle", 53: "Moderate drizzle",
+    55: "Dense drizzle", 56: "Light freezing drizzle", 57: "Dense freezing drizzle",
+    61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
+    66: "Light freezing rain", 67: "Heavy freezing rain", 71: "Slight snow fall",
+    73: "Moderate snow fall", 75: "Heavy snow fall", 77: "Snow grains",
+    80: "Slight rain showers", 81: "Moderate rain showers", 82: "Violent rain showers",
+    85: "Slight snow showers", 86: "Heavy snow showers", 95: "Thunderstorm",
+    96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
+}
+
+# Units of the numeric fields of forecast entries
+FORECAST_UNITS = {"temp": "°C", "feels_like": "°C", "humidity": "%", "wind_speed": "m/s"}
+
+
+def _utc_time(timestamp):
+    """
+    Format a Unix timestamp as a compact ISO 8601 UTC time, e.g. 2025-08-25T21:00Z.
     """
-    Get current weather for a location. If no location is provided, 
-    uses IP-based geolocation to determine the caller's location.
+    return time.strftime("%Y-%m-%dT%H:%MZ", time.gmtime(timestamp))
+
+
+def _forecast_entry(when, temperature, feels_like, humidity, wind_speed, description):
+    """
+    Build one compact forecast entry with numeric fields (see FORECAST_UNITS).
+    """
+    return ForecastEntry(when, float(temperature), float(feels_like), int(humidity), float(wind_speed), description)
+
+
+@tool(cache_ttl=600, timeout=20, max_concurrency=4, max_queue=4)
+def get_weather(location: str = None, mode: Literal["current", "forecast"] = "current"):
+    """
+    Get current weather information or a 5-day forecast for a specific location. If no location
+    is provided, automatically detects the caller's location based on IP address.
+    
     Uses OpenWeatherMap API with Open-Meteo API as fallback (no key required).
     
     Args:
-        location (str, optional): The city and country for weather information
+        location (str, optional): The city and country for weather information (e.g., 'London,UK').
+            If not provided, will use IP-based geolocation.
+        mode (str): 'current' for the current conditions (default) or 'forecast' for a
+            5-day forecast in 3-hour steps. Only request the forecast when the user asks about upcoming weather.
     
     Returns:
-        dict: Dictionary containing weather information
+        CurrentWeather or Forecast: Result record (see results.py), or a dictionary with an "error" key
     """
+    import requests
+
+    if mode not in ("current", "forecast"):
+        return {"error": f"Invalid mode: {mode}. Use 'current' or 'forecast'."}
+
     try:
         # If no location provided, get location from IP
         if not location:
-            ip_response = requests.get('https://ipapi.co/json/', timeout=5)
+            ip_response = _http_get("ipapi", f"{_base_url('IPAPI')}/json/", timeout=5)
             if ip_response.status_code == 200:
                 ip_data = ip_response.json()
                 location = f"{ip_data.get('city', 'Unknown')}, {ip_data.get('country_name', 'Unknown')}"
@@ -91,35 +443,54 @@ def get_weather(location: str = None):
         openweather_api_key = os.environ.get("OPENWEATHER_API_KEY")
         if openweather_api_key:
             try:
-                weather_url = "https://api.openweathermap.org/data/2.5/forecast"
+                # The current-conditions endpoint returns one small record; the
+                # forecast endpoint (40 entries) is only fetched in forecast mode
+                endpoint = "weather" if mode == "current" else "forecast"
+                weather_url = f"{_base_url('OPENWEATHER')}/data/2.5/{endpoint}"
                 params = {
                     'q': location,
                     'units': 'metric',  # Use Celsius
                     'appid': openweather_api_key
                 }
                 
-                weather_response = requests.get(weather_url, params=params, timeout=10)
+                weather_response = _http_get("openweathermap", weather_url, params=params, timeout=10,
+                                             endpoint=f"openweathermap_{endpoint}")
                 
                 if weather_response.status_code == 200:
                     weather_data = weather_response.json()
-                    
-                    # Get current weather (first entry in the list)
-                    current_weather = weather_data['list'][0]
-                    
-                    return {
-                        "location": f"{weather_data['city']['name']}, {weather_data['city']['country']}",
-                        "temperature": f"{current_weather['main']['temp']:.1f}°C",
-                        "feels_like": f"{current_weather['main']['feels_like']:.1f}°C",
-                        "humidity": f"{current_weather['main']['humidity']}%",
-                        "description": current_weather['weather'][0]['description'],
-                        "wind_speed": f"{current_weather['wind']['speed']} m/s",
-                        "pressure": f"{current_weather['main']['pressure']} hPa",
-                        "forecast_count": weather_data['cnt'],
-                        "next_update": current_weather['dt_txt'],
-                        "source": "OpenWeatherMap"
-                    }
+                    metrics.weather_source.inc(source="OpenWeatherMap")
+
+                    if mode == "forecast":
+                        return Forecast(
+                            location=f"{weather_data['city']['name']}, {weather_data['city']['country']}",
+                            interval_hours=3,
+                            units=FORECAST_UNITS,
+                            entries=[_forecast_entry(
+                                when=_utc_time(entry['dt']),
+                                temperature=entry['main']['temp'],
+                                feels_like=entry['main']['feels_like'],
+                                humidity=entry['main']['humidity'],
+                                wind_speed=entry['wind']['speed'],
+                                description=entry['weather'][0]['description'],
+                            ) for entry in weather_data['list']],
+                            source="OpenWeatherMap",
+                        )
+
+                    return CurrentWeather(
+                        location=f"{weather_data['name']}, {weather_data['sys']['country']}",
+                        temperature=weather_data['main']['temp'],
+                        feels_like=weather_data['main']['feels_like'],
+                        humidity=weather_data['main']['humidity'],
+                        description=weather_data['weather'][0]['description'],
+                        wind_speed=weather_data['wind']['speed'],
+                        wind_unit="m/s",
+                        pressure=weather_data['main']['pressure'],
+                        observed_at=_utc_time(weather_data['dt']),
+                        source="OpenWeatherMap",
+                    )
             except Exception as e:
                 print(f"OpenWeatherMap API failed, trying Open-Meteo fallback: {str(e)}")
+            metrics.weather_fallbacks.inc()
 
         # Fallback to Open-Meteo API (no key required)
         try:
@@ -127,7 +498,7 @@ def get_weather(location: str = None):
             # Clean the location name by removing country suffix for better geocoding
             search_location = location.split(',')[0].strip() if ',' in location else location
 
-            geocoding_url = "https://geocoding-api.open-meteo.com/v1/search"
+            geocoding_url = f"{_base_url('OPEN_METEO_GEOCODING')}/v1/search"
             geocoding_params = {
                 'name': search_location,
                 'count': 1,
@@ -135,7 +506,8 @@ def get_weather(location: str = None):
                 'format': 'json'
             }
 
-            geocoding_response = requests.get(geocoding_url, params=geocoding_params, timeout=10)
+            geocoding_response = _http_get("open_meteo", geocoding_url, params=geocoding_params, timeout=10,
+                                           endpoint="open_meteo_geocoding")
             
             if geocoding_response.status_code == 200:
                 geocoding_data = geocoding_response.json()
@@ -144,54 +516,64 @@ def get_weather(location: str = None):
                     result = geocoding_data['results'][0]
                     lat = result['latitude']
                     lon = result['longitude']
-                    location_name = result['name']
-                    country = result.get('country', 'Unknown')
                     
-                    # Get weather data using coordinates
-                    weather_url = "https://api.open-meteo.com/v1/forecast"
-                    weather_params = {
-                        'latitude': lat,
-                        'longitude': lon,
-                        'current': 'temperature_2m,relative_humidity_2m,apparent_temperature,pressure_msl,wind_speed_10m,weather_code',
-                        'hourly': 'temperature_2m,relative_humidity_2m,apparent_temperature,pressure_msl,wind_speed_10m,weather_code',
-                        'timezone': 'auto'
-                    }
+                    # Get weather data using coordinates; hourly data is only requested for forecasts
+                    weather_url = f"{_base_url('OPEN_METEO')}/v1/forecast"
+                    if mode == "forecast":
+                        weather_params = {
+                            'latitude': lat,
+                            'longitude': lon,
+                            'hourly': 'temperature_2m,apparent_temperature,relative_humidity_2m,wind_speed_10m,weather_code',
+                            'forecast_days': 5,
+                            'wind_speed_unit': 'ms',
+                            'timezone': 'UTC'
+                        }
+                    else:
+                        weather_params = {
+                            'latitude': lat,
+                            'longitude': lon,
+                            'current': 'temperature_2m,relative_humidity_2m,apparent_temperature,pressure_msl,wind_speed_10m,weather_code',
+                            'timezone': 'auto'
+                        }
                     
-                    weather_response = requests.get(weather_url, params=weather_params, timeout=10)
+                    weather_response = _http_get("open_meteo", weather_url, params=weather_params, timeout=10)
                     
                     if weather_response.status_code == 200:
                         weather_data = weather_response.json()
-                        
+                        metrics.weather_source.inc(source="Open-Meteo")
+
+                        if mode == "forecast":
+                            hourly = weather_data['hourly']
+                            # Every third hour, matching the OpenWeatherMap forecast steps
+                            return Forecast(
+                                location=location,  # Use original location format
+                                interval_hours=3,
+                                units=FORECAST_UNITS,
+                                entries=[_forecast_entry(
+                                    when=f"{hourly['time'][index]}Z",
+                                    temperature=hourly['temperature_2m'][index],
+                                    feels_like=hourly['apparent_temperature'][index],
+                                    humidity=hourly['relative_humidity_2m'][index],
+                                    wind_speed=hourly['wind_speed_10m'][index],
+                                    description=WEATHER_CODES.get(hourly['weather_code'][index], "Unknown"),
+                                ) for index in range(0, len(hourly['time']), 3)],
+                                source="Open-Meteo",
+                            )
+
                         # Get current weather
                         current = weather_data['current']
-                        
-                        # Convert weather code to description
-                        weather_codes = {
-                            0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
-                            45: "Foggy", 48: "Depositing rime fog", 51: "Light drizzle", 53: "Moderate drizzle",
-                            55: "Dense drizzle", 56: "Light freezing drizzle", 57: "Dense freezing drizzle",
-                            61: "Slight rain", 63: "Moderate rain", 65: "Heavy rain",
-                            66: "Light freezing rain", 67: "Heavy freezing rain", 71: "Slight snow fall",
-                            73: "Moderate snow fall", 75: "Heavy snow fall", 77: "Snow grains",
-                            80: "Slight rain showers", 81: "Moderate rain showers", 82: "Violent rain showers",
-                            85: "Slight snow showers", 86: "Heavy snow showers", 95: "Thunderstorm",
-                            96: "Thunderstorm with slight hail", 99: "Thunderstorm with heavy hail"
-                        }
-                        
-                        weather_description = weather_codes.get(current['weather_code'], "Unknown")
-
-                        return {
-                            "location": location,  # Use original location format
-                            "temperature": f"{current['temperature_2m']:.1f}°C",
-                            "feels_like": f"{current['apparent_temperature']:.1f}°C",
-                            "humidity": f"{current['relative_humidity_2m']}%",
-                            "description": weather_description,
-                            "wind_speed": f"{current['wind_speed_10m']} km/h",
-                            "pressure": f"{current['pressure_msl']:.0f} hPa",
-                            "forecast_count": len(weather_data.get('hourly', {}).get('time', [])),
-                            "next_update": weather_data['current']['time'],
-                            "source": "Open-Meteo"
-                        }
+                        return CurrentWeather(
+                            location=location,  # Use original location format
+                            temperature=current['temperature_2m'],
+                            feels_like=current['apparent_temperature'],
+                            humidity=current['relative_humidity_2m'],
+                            description=WEATHER_CODES.get(current['weather_code'], "Unknown"),
+                            wind_speed=current['wind_speed_10m'],
+                            wind_unit="km/h",
+                            pressure=current['pressure_msl'],
+                            observed_at=current['time'],
+                            source="Open-Meteo",
+                        )
                     else:
                         return {"error": f"Open-Meteo weather API failed. Status: {weather_response.status_code}"}
                 else:
@@ -204,22 +586,28 @@ def get_weather(location: str = None):
             
     except requests.exceptions.RequestException as e:
         return {"error": f"Network error: {str(e)}"}
+    except (RateLimitExceeded, DeadlineExceeded) as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"Unexpected error: {str(e)}"}
 
 
-def search_web(query: str, search_type: str = "basic"):
+@tool(cache_ttl=900, timeout=20, max_concurrency=2, max_queue=2)
+def search_web(query: str, search_type: Literal["basic", "advanced"] = "basic"):
     """
-    Search the web using Tavily search API.
+    Search the web for information using Tavily search API. Supports basic (fast) and advanced
+    (comprehensive) search types. News and research queries are automatically optimized.
     
     Args:
-        query (str): The search query
-        search_type (str): Type of search - "basic" (fast) or "advanced" (comprehensive)
+        query (str): The search query to look up on the web
+        search_type (str): Type of search: 'basic' (fast) or 'advanced' (comprehensive).
+            News and research queries are automatically handled. Defaults to 'basic'.
     
     Returns:
-        dict: Search results with title, content, and URL
+        SearchResults: Result record (see results.py), or a dictionary with an "error" key
     """
-    if not tavily_client:
+    tavily_client = _get_tavily_client()
+    if not tavily_client and not recording.replaying():
         return {"error": "Tavily API key not configured. Please set TAVILY_API_KEY environment variable."}
     
     try:
@@ -238,31 +626,36 @@ def search_web(query: str, search_type: str = "basic"):
             search_type = "advanced"
         
         # Perform the search
-        search_result = tavily_client.search(
-            query=query,
-            search_depth=search_type,
-            include_domains=[],
-            exclude_domains=[],
-            max_results=5
-        )
+        with span("tavily.search", kind=SPAN_KIND_CLIENT, provider="tavily", search_depth=search_type) as current:
+            def fetch():
+                _throttle("tavily")
+                # Advanced searches take several times longer; they adapt separately
+                with adaptive_timeout(f"tavily_{search_type}", TAVILY_TIMEOUT) as timeout:
+                    return tavily_client.search(
+                        query=query,
+                        search_depth=search_type,
+                        include_domains=[],
+                        exclude_domains=[],
+                        max_results=5,
+                        timeout=timeout
+                    )
+
+            request = {"query": query, "search_depth": search_type, "max_results": 5}
+            search_result = recording.call("tavily", request, fetch)
+            current.set_attribute("search.results", len((search_result or {}).get("results", [])))
         
         if search_result and 'results' in search_result:
             # Format the results
             formatted_results = []
             for result in search_result['results'][:5]:  # Limit to 5 results
-                formatted_results.append({
-                    "title": result.get('title', 'No title'),
-                    "content": result.get('content', 'No content')[:300] + "..." if len(result.get('content', '')) > 300 else result.get('content', 'No content'),
-                    "url": result.get('url', 'No URL'),
-                    "score": result.get('score', 0)
-                })
+                formatted_results.append(SearchHit(
+                    title=result.get('title', 'No title'),
+                    content=result.get('content', 'No content')[:300] + "..." if len(result.get('content', '')) > 300 else result.get('content', 'No content'),
+                    url=result.get('url', 'No URL'),
+                    score=result.get('score', 0)
+                ))
             
-            return {
-                "query": query,
-                "search_type": search_type,
-                "results_count": len(formatted_results),
-                "results": formatted_results
-            }
+            return SearchResults(query=query, search_type=search_type, results=formatted_results)
         else:
             return {"error": "No search results found"}
             
@@ -270,87 +663,6 @@ def search_web(query: str, search_type: str = "basic"):
         return {"error": f"Search failed: {str(e)}"}
 
 
-# Define custom tools
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "get_stock_price",
-            "description": "Use this function to get the current price of a stock.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "ticker": {
-                        "type": "string",
-                        "description": "The ticker symbol for the stock, e.g. GOOG",
-                    }
-                },
-                "required": ["ticker"],
-            },
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_dividend_date",
-            "description": "Use this function to get the next dividend payment date of a stock.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "ticker": {
-                        "type": "string",
-                        "description": "The ticker symbol for the stock, e.g. GOOG",
-                    }
-                },
-                "required": ["ticker"],
-            },
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_weather",
-            "description": "Get current weather information for a specific location. If no location is provided, automatically detects the caller's location based on IP address.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "location": {
-                        "type": "string",
-                        "description": "The city and country for weather information (e.g., 'London,UK'). If not provided, will use IP-based geolocation.",
-                    }
-                },
-                "required": [],
-            },
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_web",
-            "description": "Search the web for information using Tavily search API. Supports basic (fast) and advanced (comprehensive) search types. News and research queries are automatically optimized.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "The search query to look up on the web",
-                    },
-                    "search_type": {
-                        "type": "string",
-                        "description": "Type of search: 'basic' (fast) or 'advanced' (comprehensive). News and research queries are automatically handled. Defaults to 'basic'.",
-                        "enum": ["basic", "advanced"]
-                    }
-                },
-                "required": ["query"],
-            },
-        }
-    },
-]
-
-
-available_functions = {
-    "get_stock_price": get_stock_price,
-    "get_dividend_date": get_dividend_date,
-    "get_weather": get_weather,
-    "search_web": search_web,
-}
+# Tool schemas and dispatch table, generated from the @tool registrations above
+tools = registry.schemas()
+available_functions = registry.functions()
@@ -0,0 +1,239 @@
+"""
+Tracing Module
+Lightweight span instrumentation with an OTLP-compatible JSON file exporter.
+
+Spans are recorded around LLM calls, tool dispatch and outbound HTTP hops.
+When a root span ends, the whole trace is appended to the trace file as one
+line of OTLP/JSON (an ExportTraceServiceRequest), which can be loaded by
+OpenTelemetry tooling later - no running collector is needed.
+
+Tracing is enabled by setting AGENT_TRACE_FILE or calling configure(); when
+disabled, span() returns a shared no-op object.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+
+SERVICE_NAME = "hw1-agent"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar("span", default=None)
+_trace_file = os.environ.get("AGENT_TRACE_FILE")
+_write_lock = threading.Lock()
+_pending = {}
+
+
+def configure(path):
+    """
+    Enable tracing to a file, or disable it.
+
+    Args:
+        path (str): Trace file path (JSON lines), or None to disable tracing
+    """
+    global _trace_file
+    _trace_file = path
+
+
+def enabled():
+    """
+    Returns:
+        bool: True if spans are being recorded
+    """
+    return _trace_file is not None
+
+
+def _attribute(key, value):
+    """
+    Encode an attribute as an OTLP KeyValue.
+    """
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+class Span:
+    """
+    A timed operation with attributes, part of a trace.
+    """
+
+    def __init__(self, name, kind, attributes, parent):
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        """
+        Set an attribute; None values are ignored.
+
+        Args:
+            key (str): Attribute name, e.g. "http.status_code"
+            value: Attribute value (str, int, float or bool)
+        """
+        if value is not None:
+            self.attributes[key] = value
+
+    def add(self, key, amount):
+        """
+        Add to a numeric attribute, e.g. bytes received.
+
+        Args:
+            key (str): Attribute name
+            amount (int): Amount to add
+        """
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    @property
+    def duration_ms(self):
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.status = {"code": STATUS_ERROR, "message": f"{exc_type.__name__}: {exc}"}
+        _finish(self)
+        return False
+
+    def to_otlp(self):
+        """
+        Returns:
+            dict: Span in OTLP/JSON encoding
+        """
+        encoded = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+        }
+        if self.parent is not None:
+            encoded["parentSpanId"] = self.parent.span_id
+        if self.status is not None:
+            encoded["status"] = self.status
+        return encoded
+
+
+class _NoopSpan:
+    """
+    Span stand-in used while tracing is disabled.
+    """
+
+    duration_ms = 0.0
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add(self, key, amount):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+    """
+    Create a span for a block of code.
+
+    Usage:
+        with span("http.get", kind=SPAN_KIND_CLIENT, provider="yahoo") as current:
+            response = ...
+            current.set_attribute("http.status_code", response.status_code)
+
+    Args:
+        name (str): Span name
+        kind (int): OTLP span kind
+        **attributes: Initial attributes (unpack a dict for dotted names)
+
+    Returns:
+        Span: Context manager recording the span (a no-op when tracing is disabled)
+    """
+    if _trace_file is None:
+        return _NOOP_SPAN
+    return Span(name, kind, attributes, _current_span.get())
+
+
+def current_span():
+    """
+    Returns:
+        Span: Innermost active span, or a no-op span
+    """
+    return _current_span.get() or _NOOP_SPAN
+
+
+def _finish(finished):
+    """
+    Collect a finished span and export the trace once its root span ends.
+    """
+    with _write_lock:
+        if finished.parent is not None and finished.parent.end_ns is not None \
+                and finished.trace_id not in _pending:
+            # Late span of an already exported trace (e.g. an abandoned timed-out call)
+            spans = [finished]
+        else:
+            _pending.setdefault(finished.trace_id, []).append(finished)
+            if finished.parent is not None:
+                return
+            spans = _pending.pop(finished.trace_id)
+    export(spans)
+
+
+def export(spans, path=None):
+    """
+    Append spans to the trace file as one OTLP/JSON ExportTraceServiceRequest line.
+
+    Args:
+        spans (list): Finished spans
+        path (str, optional): Trace file path (defaults to the configured file)
+    """
+    path = path or _trace_file
+    if not path or not spans:
+        return
+    request = {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "hw1.tracing"},
+                "spans": [finished.to_otlp() for finished in spans],
+            }],
+        }],
+    }
+    line = json.dumps(request, separators=(",", ":"))
+    with _write_lock, open(path, "a", encoding="utf-8") as trace_file:
+        trace_file.write(line + "\n")
@@ -0,0 +1,276 @@
+"""
+Cache Warm-Up Module
+Refresh-ahead of the most requested tool results.
+
+Cached tool results expire, and the first user asking for a hot key after
+the expiry (the top tickers of get_stock_price, the top cities of
+get_weather) pays the full upstream latency. The warmer tracks how often
+each cached call is made and refreshes the most popular ones shortly before
+they expire, so requests for hot keys keep hitting the cache.
+
+- Popularity is a decaying counter per call: every request adds 1, and the
+  scores halve every `half_life` seconds, so yesterday's hot key cools down.
+  Unlike a count-min sketch it can list its top keys, which is what the
+  warmer needs; it is bounded to `max_keys` calls.
+- Every `interval` seconds the `top_n` calls with a score of at least
+  `min_score` whose cache entry expires within the lead time (or has already
+  expired) are refreshed through ToolRegistry.dispatch(..., refresh=True),
+  with the tool's timeout and its bulk bulkhead (see registry.py), as bulk
+  work of the "warmup" tenant, so they queue behind interactive tool calls
+  (see scheduler.py) and never take their bulkhead slots.
+- Refreshes draw from the "warmup" token bucket of ratelimit.py, the upstream
+  QPS budget of the warmer (RATE_LIMIT_WARMUP="rate:burst", default 1/s).
+  With RATE_LIMIT_DIR set the budget is shared by all worker processes; with
+  the SQLite cache a key refreshed by one process is fresh for all of them.
+
+Enable with AGENT_WARMUP=1 (started by server.py); AGENT_WARMUP_TOP_N sets
+the number of warmed calls.
+"""
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from ratelimit import get_bucket
+from scheduler import caller_scope
+
+DEFAULT_TOP_N = 20
+
+# Tenant the refreshes are scheduled as
+WARMUP_TENANT = "warmup"
+
+# Refresh when less than this share of the tool's cache TTL is left
+LEAD_FRACTION = 0.2
+
+
+def warmup_enabled():
+    """
+    Returns:
+        bool: True if AGENT_WARMUP enables the cache warmer
+    """
+    return os.environ.get("AGENT_WARMUP", "").lower() in ("1", "true", "yes")
+
+
+class DecayingCounter:
+    """
+    Exponentially decaying popularity scores with a bounded number of keys.
+    """
+
+    def __init__(self, half_life=600.0, max_keys=1000):
+        """
+        Args:
+            half_life (float): Seconds after which a score has halved
+            max_keys (int): Maximum number of tracked keys; the least popular are dropped first
+        """
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, entry, now):
+        score, updated = entry
+        return score * math.pow(0.5, (now - updated) / self.half_life)
+
+    def add(self, key, now=None):
+        """
+        Count one request of a key.
+
+        Args:
+            key (hashable): Key
+            now (float, optional): Monotonic time of the request
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._scores.get(key)
+            self._scores[key] = (self._decayed(entry, now) + 1.0 if entry else 1.0, now)
+            if len(self._scores) > self.max_keys:
+                # Keep the more popular half
+                ranked = sorted(self._scores.items(), key=lambda item: self._decayed(item[1], now), reverse=True)
+                self._scores = dict(ranked[:self.max_keys // 2])
+
+    def score(self, key, now=None):
+        """
+        Returns:
+            float: Current score of a key (0 if not tracked)
+        """
+        entry = self._scores.get(key)
+        return self._decayed(entry, time.monotonic() if now is None else now) if entry else 0.0
+
+    def top(self, n, now=None):
+        """
+        Args:
+            n (int): Number of keys
+            now (float, optional): Monotonic time
+
+        Returns:
+            list: (score, key) tuples of the n most popular keys, best first
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            scored = [(self._decayed(entry, now), key) for key, entry in self._scores.items()]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:n]
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class CacheWarmer:
+    """
+    Background refresh-ahead of the most popular cached tool calls.
+    """
+
+    def __init__(self, registry, top_n=None, interval=1.0, half_life=600.0, min_score=2.0, workers=4):
+        """
+        Args:
+            registry (ToolRegistry): Registry whose cached calls are tracked and refreshed
+            top_n (int, optional): Number of calls kept warm (default AGENT_WARMUP_TOP_N or DEFAULT_TOP_N)
+            interval (float): Seconds between checks
+            half_life (float): Half-life of the popularity scores in seconds
+            min_score (float): Lowest popularity score that is warmed; one-off calls stay below it
+            workers (int): Maximum number of simultaneous refreshes
+        """
+        self.registry = registry
+        self.top_n = top_n if top_n is not None else int(os.environ.get("AGENT_WARMUP_TOP_N", DEFAULT_TOP_N))
+        self.interval = interval
+        self.min_score = min_score
+        self.workers = workers
+        self.popularity = DecayingCounter(half_life)
+        self.stats = {"refreshed": 0, "failed": 0, "throttled": 0, "hot_hits": 0, "hot_misses": 0}
+        self._calls = {}
+        self._hot = frozenset()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        registry.add_observer(self.record)
+
+    def record(self, name, arguments, cache_hit):
+        """
+        Count a dispatch of a cached tool (registered as a ToolRegistry observer).
+
+        Args:
+            name (str): Tool name
+            arguments (dict): Call arguments
+            cache_hit (bool): Whether the result came from the cache
+        """
+        key = self.registry.get(name).cache_key(arguments)
+        with self._lock:
+            self._calls.setdefault(key, (name, dict(arguments)))
+            if key in self._hot:
+                self.stats["hot_hits" if cache_hit else "hot_misses"] += 1
+        self.popularity.add(key)
+
+    def lead_time(self, name):
+        """
+        Args:
+            name (str): Tool name
+
+        Returns:
+            float: Seconds before expiry at which the tool's results are refreshed
+        """
+        cache_ttl = self.registry.get(name).cache_ttl
+        return min(max(LEAD_FRACTION * cache_ttl, 2 * self.interval), cache_ttl / 2)
+
+    def due(self):
+        """
+        Find the popular calls that need a refresh.
+
+        Returns:
+            list: (score, name, arguments) tuples, most popular first
+        """
+        due = []
+        hot = set()
+        for score, key in self.popularity.top(self.top_n):
+            if score < self.min_score:
+                break
+            with self._lock:
+                call = self._calls.get(key)
+            if call is None:
+                continue
+            hot.add(key)
+            name, arguments = call
+            remaining = self.registry.cache.ttl(key)
+            if remaining is None or remaining <= self.lead_time(name):
+                due.append((score, name, arguments))
+        with self._lock:
+            self._hot = frozenset(hot)
+            # Forget the arguments of calls the counter no longer tracks
+            if len(self._calls) > 2 * self.popularity.max_keys:
+                self._calls = {key: call for key, call in self._calls.items() if self.popularity.score(key)}
+        return due
+
+    def run_once(self):
+        """
+        Refresh the due calls within the QPS budget.
+
+        Returns:
+            int: Number of refreshes started
+        """
+        bucket = get_bucket("warmup")
+        refreshes = []
+        throttled = False
+        for _, name, arguments in self.due():
+            # Out of budget: the less popular calls wait for the next check
+            throttled = throttled or bucket.try_acquire() > 0
+            if throttled:
+                self._count("throttled", name)
+            else:
+                refreshes.append((name, arguments))
+        if not refreshes:
+            return 0
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(refreshes)),
+                                thread_name_prefix="cache-warmup") as executor:
+            results = list(executor.map(self._refresh, refreshes))
+        for (name, _), result in zip(refreshes, results):
+            failed = isinstance(result, dict) and "error" in result
+            self._count("failed" if failed else "refreshed", name)
+        return len(refreshes)
+
+    def _refresh(self, call):
+        name, arguments = call
+        with caller_scope(WARMUP_TENANT, "bulk"):
+            return self.registry.dispatch(name, arguments, refresh=True)
+
+    def _count(self, outcome, tool, amount=1):
+        if amount:
+            with self._lock:
+                self.stats[outcome] += amount
+            metrics.warmup_refreshes.inc(amount, tool=tool, outcome=outcome)
+
+    def hot_hit_rate(self):
+        """
+        Returns:
+            float: Share of requests for warmed calls that hit the cache, or None before any
+        """
+        with self._lock:
+            total = self.stats["hot_hits"] + self.stats["hot_misses"]
+            return self.stats["hot_hits"] / total if total else None
+
+    def start(self):
+        """
+        Start checking in a daemon thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread after the current check.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Cache warm-up failed: {e}")